@@ -0,0 +1,421 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import constants
+from utils import add_confidence, calculate_winrate, sort_winrates
+
+# "thread", "process" or None (run everything on the request thread)
+AGGREGATION_BACKEND = getattr(constants, "aggregation_backend", None)
+AGGREGATION_WORKERS = getattr(constants, "aggregation_workers", os.cpu_count() or 1)
+# Points per trace of the winrate trend; longer series are downsampled
+TREND_MAX_POINTS = getattr(constants, "trend_max_points", 1500)
+
+ATTACK_DEF_MODES = ["Attack", "Defense", "Attack Attack"]
+# Side axis of map_side_counts and the Mode label of each side
+MAP_SIDES = ATTACK_DEF_MODES + ["Other Modes"]
+SIDE_MODES = ["Attack", "Defense", "Overall"]
+
+# Columns the winrate/games tables of the dashboard are grouped by
+GROUP_COLUMNS = ["Hero", "Role", "Map", "Gamemode", "Attack Def"]
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None and AGGREGATION_BACKEND and AGGREGATION_WORKERS > 1:
+        if AGGREGATION_BACKEND == "process":
+            _executor = ProcessPoolExecutor(max_workers=AGGREGATION_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=AGGREGATION_WORKERS)
+    return _executor
+
+
+def _run_batch(calls):
+    return [func(*args) for func, args in calls]
+
+
+def run_tasks(tasks):
+    """
+    Runs independent aggregations given as {name: (func, args)} and returns
+    {name: result}. With an aggregation backend configured they run
+    concurrently on a shared pool, otherwise one after another.
+    The functions must not modify their inputs: thread workers all read the
+    same frames. Process workers get one job per input frame (the first
+    argument) holding all of its aggregations, so each frame is pickled
+    once per call and not once per task.
+    """
+    executor = _get_executor()
+    if executor is None or len(tasks) < 2:
+        return {name: func(*args) for name, (func, args) in tasks.items()}
+    if AGGREGATION_BACKEND != "process":
+        futures = {
+            name: executor.submit(func, *args) for name, (func, args) in tasks.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+    batches = {}
+    for name, (func, args) in tasks.items():
+        batches.setdefault(id(args[0]) if args else None, []).append((name, func, args))
+    futures = [
+        (batch, executor.submit(_run_batch, [(func, args) for _, func, args in batch]))
+        for batch in batches.values()
+    ]
+    results = {}
+    for batch, future in futures:
+        for (name, _, _), result in zip(batch, future.result()):
+            results[name] = result
+    return results
+
+
+def period_key(kind, player, season=None, month=None, year=None, *params, dates=None):
+    """
+    Cache key of a player's aggregate for a filter period. A season
+    overrides year/month, so they are left out of its keys. A (start, end)
+    date range overrides all three and takes the season's place.
+    """
+    if dates:
+        season, month, year = ("dates",) + tuple(dates), None, None
+    elif season:
+        month = year = None
+    return (kind, player, season, month, year) + params
+
+
+def stats_key(player, season, month, year, group_col, stat_type, rank_by, dates=None):
+    """
+    Cache key of a group_stats table with no minimum number of games applied.
+    """
+    if stat_type != "winrate":
+        stat_type, rank_by = "plays", None
+    return period_key(
+        "group_stats",
+        player,
+        season,
+        month,
+        year,
+        group_col,
+        stat_type,
+        rank_by,
+        dates=dates,
+    )
+
+
+def trend_key(player, season, month, year, hero_filter, mode, window, dates=None):
+    """
+    Cache key of a trend_series result.
+    """
+    window = rolling_window(window) if mode == "rolling" else None
+    return period_key(
+        "trend", player, season, month, year, hero_filter, mode, window, dates=dates
+    )
+
+
+def group_stats(data, group_col, stat_type, min_games, rank_by="winrate"):
+    """
+    Returns the winrate table (groups with at least min_games) or the number
+    of games per group, sorted like the bar charts show them.
+    """
+    if data.empty or group_col not in data.columns:
+        return pd.DataFrame(columns=[group_col, "Games"])
+    if stat_type == "winrate":
+        stats = calculate_winrate(data, group_col, rank_by)
+        return stats[stats["Games"] >= min_games]
+    return (
+        data.groupby(group_col)
+        .size()
+        .reset_index(name="Games")
+        .sort_values("Games", ascending=False)
+    )
+
+
+def map_side_counts(data):
+    """
+    Counts the filtered matches per (Map, Gamemode, Side, Win) in one pass.
+    Side is the Attack Def mode, every other value counts as "Other Modes".
+    The detailed map charts and the pies are all derived from these counts.
+    """
+    if data.empty:
+        return {
+            "maps": np.array([], dtype=object),
+            "gamemodes": np.array([], dtype=object),
+            "counts": np.zeros((0, 0, len(MAP_SIDES), 2), dtype=np.int64),
+        }
+    map_codes, maps = pd.factorize(data["Map"], sort=True, use_na_sentinel=False)
+    mode_codes, gamemodes = pd.factorize(
+        data["Gamemode"], sort=True, use_na_sentinel=False
+    )
+    side_codes = pd.Categorical(data["Attack Def"], categories=ATTACK_DEF_MODES).codes
+    side_codes = np.where(side_codes < 0, len(ATTACK_DEF_MODES), side_codes)
+    wins = (data["Win Lose"] == "Win").to_numpy(dtype=np.int64)
+
+    shape = (len(maps), len(gamemodes), len(MAP_SIDES), 2)
+    flat = np.ravel_multi_index((map_codes, mode_codes, side_codes, wins), shape)
+    return {
+        "maps": np.asarray(maps, dtype=object),
+        "gamemodes": np.asarray(gamemodes, dtype=object),
+        "counts": np.bincount(flat, minlength=np.prod(shape)).reshape(shape),
+    }
+
+
+def _labelled(labels, counts):
+    """Keeps the rows with games and a label (groupby drops NaN groups)."""
+    return (counts.reshape(len(labels), -1).sum(axis=1) > 0) & pd.notna(labels)
+
+
+def map_detail_winrate(map_sides, min_games, rank_by="winrate"):
+    """
+    Returns the map order and the per map Overall/Attack/Defense winrates
+    for the detailed map winrate chart.
+    """
+    maps, counts = map_sides["maps"], map_sides["counts"].sum(axis=1)
+    by_map = counts.sum(axis=1)
+    keep = _labelled(maps, by_map)
+    map_data = pd.DataFrame(
+        {"Map": maps[keep], "Lose": by_map[keep, 0], "Win": by_map[keep, 1]}
+    )
+    map_data["Games"] = map_data["Win"] + map_data["Lose"]
+    map_data["Winrate"] = map_data["Win"] / map_data["Games"]
+    map_data = sort_winrates(add_confidence(map_data), rank_by)
+    map_data = map_data[map_data["Games"] >= min_games]
+    if map_data.empty:
+        return [], pd.DataFrame()
+
+    # Sides in ATTACK_DEF_MODES order already sort like their Mode labels
+    by_side = counts[:, : len(ATTACK_DEF_MODES)]
+    m, side = np.nonzero((by_side.sum(axis=2) > 0) & pd.notna(maps)[:, None])
+    plot_data = pd.DataFrame(
+        {
+            "Map": maps[m],
+            "Mode": np.array(SIDE_MODES, dtype=object)[side],
+            "Lose": by_side[m, side, 0],
+            "Win": by_side[m, side, 1],
+        }
+    )
+    plot_data["Games"] = plot_data["Win"] + plot_data["Lose"]
+    plot_data["Winrate"] = plot_data["Win"] / plot_data["Games"]
+    plot_data = plot_data[plot_data["Map"].isin(map_data["Map"])]
+    return map_data["Map"].tolist(), plot_data
+
+
+def map_detail_plays(map_sides):
+    """
+    Returns the map order and the games per map and side for the detailed
+    games per map chart.
+    """
+    maps = map_sides["maps"]
+    games = map_sides["counts"].sum(axis=(1, 3))
+    if not len(maps):
+        return [], pd.DataFrame()
+    order = np.argsort(MAP_SIDES)
+    m, i = np.nonzero((games[:, order] > 0) & pd.notna(maps)[:, None])
+    plays_by_side = pd.DataFrame(
+        {
+            "Map": maps[m],
+            "Side": np.array(MAP_SIDES, dtype=object)[order[i]],
+            "Games": games[m, order[i]],
+        }
+    )
+    keep = _labelled(maps, games)
+    total_plays_map = pd.DataFrame(
+        {"Map": maps[keep], "TotalGames": games[keep].sum(axis=1)}
+    ).sort_values("TotalGames", ascending=False)
+    return list(total_plays_map["Map"]), plays_by_side
+
+
+def distribution(map_sides, col):
+    """
+    Returns the number of games per Gamemode or per Attack Def mode for the
+    pie charts.
+    """
+    counts = map_sides["counts"]
+    if col == "Attack Def":
+        order = np.argsort(ATTACK_DEF_MODES)
+        labels = np.array(ATTACK_DEF_MODES, dtype=object)[order]
+        games = counts.sum(axis=(0, 1, 3))[order]
+    else:
+        labels, games = map_sides["gamemodes"], counts.sum(axis=(0, 2, 3))
+    keep = (games > 0) & pd.notna(labels)
+    return pd.DataFrame({col: labels[keep], "Games": games[keep]})
+
+
+def heatmap_matrix(data):
+    """
+    Returns the Role x Map winrate matrix.
+    """
+    if data.empty:
+        return pd.DataFrame()
+    return data.pivot_table(
+        index="Role",
+        columns="Map",
+        values="Win Lose",
+        aggfunc=lambda x: (x == "Win").sum() / len(x) if len(x) > 0 else 0,
+    )
+
+
+def date_ordered_wins(data, hero_filter=None):
+    """
+    Returns the match dates and win flags (1/0) in date order.
+    """
+    if data.empty or "Date" not in data.columns:
+        return np.array([], dtype="datetime64[ns]"), np.array([], dtype=np.int64)
+    time_data = data.dropna(subset=["Date"])
+    # Games of the same day keep their Match ID order, so the streaks and
+    # rolling values do not depend on the sort algorithm
+    order = ["Date", "Match ID"] if "Match ID" in time_data.columns else ["Date"]
+    time_data = time_data.sort_values(order, ascending=True, kind="stable")
+    if hero_filter:
+        time_data = time_data[time_data["Hero"] == hero_filter]
+    wins = (time_data["Win Lose"] == "Win").to_numpy(dtype=np.int64)
+    return time_data["Date"].to_numpy(), wins
+
+
+def rolling_window(window):
+    """
+    Number of games of a rolling trend for the window input (at least one,
+    the input may be cleared).
+    """
+    return max(int(window or 1), 1)
+
+
+def cumulative_winrate(wins):
+    """
+    Winrate over all games so far at every game.
+    """
+    return np.cumsum(wins) / np.arange(1, len(wins) + 1)
+
+
+def rolling_winrate(wins, window):
+    """
+    Winrate over the last window games at every game (fewer at the start).
+    """
+    idx = np.arange(len(wins))
+    start = np.maximum(idx - window + 1, 0)
+    csum = np.concatenate([[0], np.cumsum(wins)])
+    return (csum[idx + 1] - csum[start]) / (idx + 1 - start)
+
+
+def streaks(wins):
+    """
+    Returns the longest win and loss streaks and the current streak
+    (positive = wins, negative = losses) using run-length encoding.
+    """
+    if len(wins) == 0:
+        return {"longest_win": 0, "longest_loss": 0, "current": 0}
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(wins)) + 1])
+    lengths = np.diff(np.concatenate([starts, [len(wins)]]))
+    values = wins[starts]
+    return {
+        "longest_win": int(lengths[values == 1].max(initial=0)),
+        "longest_loss": int(lengths[values == 0].max(initial=0)),
+        "current": int(lengths[-1] if values[-1] == 1 else -lengths[-1]),
+    }
+
+
+def session_winrate(dates, wins):
+    """
+    Returns one row per session (all games on the same day) with its games,
+    wins and winrate.
+    """
+    days = dates.astype("datetime64[D]")
+    session_days, inverse = np.unique(days, return_inverse=True)
+    games = np.bincount(inverse)
+    won = np.bincount(inverse, weights=wins).astype(int)
+    return pd.DataFrame(
+        {
+            "Date": pd.to_datetime(session_days),
+            "Games": games,
+            "Win": won,
+            "Winrate": won / games,
+        }
+    )
+
+
+def trend_series(data, hero_filter=None, mode="cumulative", window=20):
+    """
+    Returns the winrate trend (cumulative, rolling over the last window
+    games, or per session) and the streak summary of the filtered data.
+    """
+    dates, wins = date_ordered_wins(data, hero_filter)
+    if mode == "session":
+        series = session_winrate(dates, wins)
+    else:
+        if mode == "rolling":
+            winrate = rolling_winrate(wins, rolling_window(window))
+        else:
+            winrate = cumulative_winrate(wins)
+        series = pd.DataFrame(
+            {"GameNum": np.arange(1, len(wins) + 1), "Winrate": winrate}
+        )
+    return series, streaks(wins)
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Returns the positions of the points Largest-Triangle-Three-Buckets keeps
+    of a series: the first and the last one plus, for every bucket in
+    between, the point spanning the largest triangle with the point kept
+    before it and the mean of the next bucket.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    edges = np.append(edges, n)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end, next_end = edges[i], edges[i + 1], edges[i + 2]
+        mean_x = x[end:next_end].mean()
+        mean_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[a] - mean_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (mean_y - y[a])
+        )
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def downsample_trend(series, x_col, max_points=TREND_MAX_POINTS, x_range=None):
+    """
+    Returns the rows of a trend series worth drawing: the ones inside
+    x_range (plus one on either side, so the line reaches the edges),
+    reduced to max_points with LTTB.
+    """
+    if x_range is not None:
+        lo = series[x_col].searchsorted(x_range[0], side="left")
+        hi = series[x_col].searchsorted(x_range[1], side="right")
+        series = series.iloc[max(lo - 1, 0) : hi + 1]
+    if len(series) <= max_points:
+        return series
+    x = series[x_col].to_numpy()
+    if x.dtype.kind == "M":
+        x = x.astype("datetime64[ns]").astype(np.int64)
+    return series.iloc[lttb_indices(x, series["Winrate"].to_numpy(), max_points)]
+
+
+def precompute_period(data, player, season=None, month=None, year=None):
+    """
+    Computes the tables every dashboard view of a player's filter period
+    starts from, as {cache key: result}.
+    """
+    tables = {}
+    for col in GROUP_COLUMNS:
+        for stat_type, rank_by in [
+            ("winrate", "winrate"),
+            ("winrate", "lower_bound"),
+            ("plays", None),
+        ]:
+            key = stats_key(player, season, month, year, col, stat_type, rank_by)
+            tables[key] = group_stats(data, col, stat_type, 1, rank_by)
+    tables[period_key("heatmap", player, season, month, year)] = heatmap_matrix(data)
+    tables[period_key("map_sides", player, season, month, year)] = map_side_counts(
+        data
+    )
+    for mode in ["cumulative", "session"]:
+        key = trend_key(player, season, month, year, None, mode, None)
+        tables[key] = trend_series(data, None, mode)
+    return tables
@@ -0,0 +1,267 @@
+import hashlib
+import json
+import pandas as pd
+from flask import Response, abort, request, stream_with_context
+from aggregates import heatmap_matrix, period_key
+from data import (
+    get_source,
+    get_source_names,
+    get_update_event,
+    wait_for_new_version,
+)
+from export import csv_chunks
+from utils import calculate_winrate, summarize_matches
+
+# URL name -> column of the filtered data
+DIMENSIONS = {
+    "hero": "Hero",
+    "map": "Map",
+    "role": "Role",
+    "gamemode": "Gamemode",
+    "attackdef": "Attack Def",
+}
+
+# Seconds between keep-alive comments on an idle event stream
+EVENT_HEARTBEAT = 15
+
+
+def _abort(status, message):
+    abort(
+        Response(
+            json.dumps({"error": message}), status=status, mimetype="application/json"
+        )
+    )
+
+
+def _request_dates():
+    """(start, end) ISO days of the start/end query parameters, or None."""
+    start = request.args.get("start") or None
+    end = request.args.get("end") or None
+    if not (start or end):
+        return None
+    try:
+        return tuple(
+            pd.Timestamp(day).date().isoformat() if day else None
+            for day in (start, end)
+        )
+    except ValueError:
+        _abort(400, "start and end must be dates (YYYY-MM-DD)")
+
+
+def _request_filters():
+    """
+    Season, month, year and date range of the request. Like in the
+    dashboard, a date range overrides season, year and month.
+    """
+    dates = _request_dates()
+    if dates:
+        return None, None, None, dates
+    return (
+        request.args.get("season") or None,
+        request.args.get("month") or None,
+        request.args.get("year", type=int),
+        None,
+    )
+
+
+def _request_source():
+    team = request.args.get("team")
+    if team and team not in get_source_names():
+        _abort(404, f"Unknown team '{team}'")
+    return get_source(team)
+
+
+def _check_player(source, player):
+    if player not in source.players:
+        _abort(404, f"Unknown player '{player}'")
+
+
+def _frame_records(frame):
+    """JSON-ready records of a frame (NaN -> null, dates as ISO strings)."""
+    return json.loads(frame.to_json(orient="records", date_format="iso"))
+
+
+def _json_response(source, builder):
+    """
+    Serves the JSON payload of the current request from the source's
+    bounded response cache, built by builder(state) from the same state the
+    ETag is taken from. The ETag only depends on the data version and the
+    request, so clients polling with If-None-Match get a 304 without
+    anything being computed.
+    """
+    state = source.state
+    key = (request.path, tuple(sorted(request.args.items(multi=True))))
+    etag = hashlib.md5(
+        f"{source.name}|{state.version}|{key}".encode()
+    ).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        body = source.get_response(key, lambda: json.dumps(builder(state)), state)
+        response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "public, no-cache"
+    return response
+
+
+def register_api(server):
+    @server.route("/api/teams")
+    def api_teams():
+        return {
+            "teams": [
+                {"name": name, "players": get_source(name).players}
+                for name in get_source_names()
+            ]
+        }
+
+    @server.route("/api/quality")
+    def api_quality():
+        source = _request_source()
+        return _json_response(source, lambda state: state.quality)
+
+    @server.route("/api/players/<player>/summary")
+    def api_summary(player):
+        source = _request_source()
+        _check_player(source, player)
+        season, month, year, dates = _request_filters()
+        min_games = request.args.get("min_games", 1, type=int)
+        rank_by = request.args.get("rank_by", "winrate")
+
+        def build(state):
+            summary = source.get_cached(
+                period_key(
+                    "summary",
+                    player,
+                    season,
+                    month,
+                    year,
+                    min_games,
+                    rank_by,
+                    dates=dates,
+                ),
+                lambda: summarize_matches(
+                    source.filter_matches(player, season, month, year, dates, state),
+                    min_games,
+                    3,
+                    rank_by,
+                ),
+                season=season,
+                state=state,
+            )
+            return {"player": player, **summary}
+
+        return _json_response(source, build)
+
+    @server.route("/api/players/<player>/winrates/<dimension>")
+    def api_winrates(player, dimension):
+        source = _request_source()
+        _check_player(source, player)
+        if dimension not in DIMENSIONS:
+            _abort(400, f"Unknown dimension, use one of {', '.join(DIMENSIONS)}")
+        season, month, year, dates = _request_filters()
+        min_games = request.args.get("min_games", 1, type=int)
+        rank_by = request.args.get("rank_by", "winrate")
+
+        def build(state):
+            group_col = DIMENSIONS[dimension]
+            if state.store is not None:
+                stats = state.store.calculate_winrate(
+                    player, group_col, season, month, year, rank_by, dates
+                )
+            else:
+                stats = calculate_winrate(
+                    source.filter_matches(player, season, month, year, dates, state),
+                    group_col,
+                    rank_by,
+                )
+            stats = stats[stats["Games"] >= min_games]
+            return {
+                "player": player,
+                "dimension": group_col,
+                "rows": _frame_records(stats),
+            }
+
+        return _json_response(source, build)
+
+    @server.route("/api/players/<player>/heatmap")
+    def api_heatmap(player):
+        source = _request_source()
+        _check_player(source, player)
+        season, month, year, dates = _request_filters()
+
+        def build(state):
+            if state.store is not None:
+                pivot = state.store.heatmap_matrix(
+                    player, season, month, year, dates
+                )
+            else:
+                pivot = heatmap_matrix(
+                    source.filter_matches(player, season, month, year, dates, state)
+                )
+            return {
+                "player": player,
+                "roles": list(pivot.index),
+                "maps": list(pivot.columns),
+                "winrate": pivot.astype(object)
+                .where(pivot.notna(), None)
+                .values.tolist(),
+            }
+
+        return _json_response(source, build)
+
+    @server.route("/api/history")
+    def api_history():
+        source = _request_source()
+        player = request.args.get("player") or None
+        if player and player != "ALL":
+            _check_player(source, player)
+        hero = request.args.get("hero") or None
+        limit = min(max(request.args.get("limit", 10, type=int), 1), 500)
+        offset = max(request.args.get("offset", 0, type=int), 0)
+
+        def build(state):
+            page = source.history_page(player, hero, limit, offset, state)
+            return {"offset": offset, "limit": limit, "matches": _frame_records(page)}
+
+        return _json_response(source, build)
+
+    @server.route("/api/history.csv")
+    def api_history_csv():
+        """Streams the whole filtered match history as CSV, chunk by chunk."""
+        source = _request_source()
+        player = request.args.get("player") or None
+        if player and player != "ALL":
+            _check_player(source, player)
+        hero = request.args.get("hero") or None
+        return Response(
+            stream_with_context(csv_chunks(source.iter_history(player, hero))),
+            mimetype="text/csv",
+            headers={"Content-Disposition": "attachment; filename=match_history.csv"},
+        )
+
+    @server.route("/api/events")
+    def api_events():
+        """
+        Server-sent events: one "data-version" event per team on connect and
+        another one whenever a refresh produces a new data version.
+        """
+
+        def stream():
+            yield "retry: 5000\n\n"
+            versions = {}
+            while True:
+                current = wait_for_new_version(versions, EVENT_HEARTBEAT)
+                if current == versions:
+                    yield ": keep-alive\n\n"
+                    continue
+                for name, version in current.items():
+                    if versions.get(name) != version:
+                        event = json.dumps(get_update_event(name))
+                        yield f"event: data-version\ndata: {event}\n\n"
+                versions = current
+
+        return Response(
+            stream(),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
@@ -1,8 +1,15 @@
 from dash import Dash
+from flask import request
 import dash_bootstrap_components as dbc
 from layout import get_layout
 from callbacks import register_callbacks
-from data import load_data
+from api import register_api
+from data import (
+    load_data,
+    ingest_archives,
+    start_config_watcher,
+    start_refresh_scheduler,
+)
 
 # --- App Initialization ---
 app = Dash(
@@ -12,15 +19,34 @@ app = Dash(
 )
 server = app.server
 
+
+@server.after_request
+def cache_built_assets(response):
+    # Thumbnails from build_assets.py have content-hashed names, so browsers
+    # can keep them forever
+    if request.path.startswith("/assets/build/") and not request.path.endswith(
+        ".json"
+    ):
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
 # --- Data Loading ---
 load_data(use_local=True)
+ingest_archives()
+start_refresh_scheduler()
+start_config_watcher()
 
 # --- Layout ---
-app.layout = get_layout()
+# Built on every page load, so each browser session gets its own session key
+app.layout = get_layout
 
 # --- Callbacks ---
 register_callbacks(app)
 
+# --- REST API ---
+register_api(server)
+
 # --- Main ---
 if __name__ == "__main__":
     app.run(debug=False)
\ No newline at end of file
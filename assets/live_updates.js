@@ -0,0 +1,15 @@
+// Listens for new data versions pushed by /api/events and hands them to the
+// data-event store, whose callback re-renders the views that changed.
+(function () {
+    if (!window.EventSource) {
+        return;
+    }
+    var events = new EventSource("/api/events");
+    events.addEventListener("data-version", function (message) {
+        if (window.dash_clientside && window.dash_clientside.set_props) {
+            window.dash_clientside.set_props("data-event", {
+                data: JSON.parse(message.data),
+            });
+        }
+    });
+})();
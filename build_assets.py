@@ -0,0 +1,164 @@
+"""
+Builds size-specific, content-hashed thumbnails of the hero and map images
+plus a CSS sprite sheet of the hero dropdown icons.
+
+Usage: python build_assets.py
+
+Writes everything to assets/build/ together with a manifest.json that
+utils.get_hero_image_url / utils.get_map_image_url use to pick the right
+variant. Requires Pillow (pip install pillow).
+"""
+import hashlib
+import io
+import json
+import math
+import os
+import shutil
+
+from PIL import Image, features
+
+ASSETS_DIR = "assets"
+BUILD_DIR = os.path.join(ASSETS_DIR, "build")
+MANIFEST_PATH = os.path.join(BUILD_DIR, "manifest.json")
+
+# Rendered size in CSS pixels per context; thumbnails are built at 2x for HiDPI
+HERO_SIZES = {"icon": 25, "avatar": 40, "card": 60}
+MAP_SIZES = {"card": 60, "banner": 400}
+SPRITE_CONTEXT = "icon"
+
+
+def _image_format():
+    return ("WEBP", "webp") if features.check("webp") else ("PNG", "png")
+
+
+def _encode(image, fmt):
+    buffer = io.BytesIO()
+    if fmt == "WEBP":
+        image.save(buffer, fmt, quality=85, method=6)
+    else:
+        image.save(buffer, fmt, optimize=True)
+    return buffer.getvalue()
+
+
+def _write_hashed(data, directory, stem, ext):
+    digest = hashlib.md5(data).hexdigest()[:10]
+    filename = f"{stem}.{digest}.{ext}"
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, filename), "wb") as f:
+        f.write(data)
+    return "/" + "/".join([directory.replace(os.sep, "/"), filename])
+
+
+def _square(image, size):
+    """Center-crops to a square and resizes, like objectFit: cover."""
+    side = min(image.size)
+    left = (image.width - side) // 2
+    top = (image.height - side) // 2
+    return image.crop((left, top, left + side, top + side)).resize(
+        (size, size), Image.LANCZOS
+    )
+
+
+def _fit_width(image, width):
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def build_thumbnails(kind, sizes, fmt, ext):
+    """
+    Builds one thumbnail per context for every image in assets/<kind>/ and
+    returns {stem: {context: url}} plus the opened icon images for sprites.
+    """
+    source_dir = os.path.join(ASSETS_DIR, kind)
+    target_dir = os.path.join(BUILD_DIR, kind)
+    entries, icons = {}, {}
+    for filename in sorted(os.listdir(source_dir)):
+        stem, source_ext = os.path.splitext(filename)
+        if source_ext.lower() not in [".png", ".jpg", ".jpeg"]:
+            continue
+        with Image.open(os.path.join(source_dir, filename)) as image:
+            image = image.convert("RGBA")
+            entries[stem] = {}
+            for context, size in sizes.items():
+                pixels = size * 2
+                if kind == "heroes" or context == "card":
+                    thumb = _square(image, pixels)
+                else:
+                    thumb = _fit_width(image, pixels)
+                data = _encode(thumb, fmt)
+                entries[stem][context] = _write_hashed(
+                    data, target_dir, f"{stem}-{context}", ext
+                )
+                if context == SPRITE_CONTEXT:
+                    icons[stem] = thumb
+    return entries, icons
+
+
+def build_sprite(icons, display_size):
+    """
+    Packs the hero icons into one sprite sheet and writes the matching CSS.
+    Returns {stem: css_class} and the sheet/CSS urls.
+    """
+    if not icons:
+        return {}, None
+    cell = next(iter(icons.values())).width
+    columns = math.ceil(math.sqrt(len(icons)))
+    rows = math.ceil(len(icons) / columns)
+    sheet = Image.new("RGBA", (columns * cell, rows * cell), (0, 0, 0, 0))
+    classes, rules = {}, []
+    for i, (stem, icon) in enumerate(sorted(icons.items())):
+        col, row = i % columns, i // columns
+        sheet.paste(icon, (col * cell, row * cell))
+        css_class = f"hero-sprite-{stem}"
+        classes[stem] = css_class
+        rules.append(
+            f".{css_class}{{background-position:-{col * display_size}px -{row * display_size}px}}"
+        )
+
+    sheet_url = _write_hashed(
+        _encode(sheet, "PNG"), BUILD_DIR, "hero-sprites", "png"
+    )
+    base_rule = (
+        ".hero-sprite{display:inline-block;"
+        f"width:{display_size}px;height:{display_size}px;"
+        f"background-image:url({sheet_url});"
+        f"background-size:{columns * display_size}px {rows * display_size}px;"
+        "background-repeat:no-repeat}"
+    )
+    css = "\n".join([base_rule] + rules) + "\n"
+    # Dash automatically serves every .css file under assets/
+    css_url = _write_hashed(css.encode(), BUILD_DIR, "hero-sprites", "css")
+    return classes, {"image": sheet_url, "css": css_url}
+
+
+def main():
+    if os.path.isdir(BUILD_DIR):
+        shutil.rmtree(BUILD_DIR)
+    fmt, ext = _image_format()
+
+    heroes, icons = build_thumbnails("heroes", HERO_SIZES, fmt, ext)
+    maps, _ = build_thumbnails("maps", MAP_SIZES, fmt, ext)
+    sprite_classes, sprite = build_sprite(icons, HERO_SIZES[SPRITE_CONTEXT])
+
+    manifest = {
+        "heroes": heroes,
+        "maps": maps,
+        "hero_sprites": sprite_classes,
+        "sprite": sprite,
+    }
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    total = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(BUILD_DIR)
+        for name in names
+    )
+    print(
+        f"Built {len(heroes)} hero and {len(maps)} map thumbnail sets "
+        f"({total / 1024:.0f} KB) in {BUILD_DIR}"
+    )
+
+
+if __name__ == "__main__":
+    main()
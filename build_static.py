@@ -0,0 +1,183 @@
+"""
+Builds a static, read-only copy of the dashboard for a CDN or offline use.
+
+Usage: python build_static.py [--out static_build] [--min-games 5] [--cloud]
+
+Loads the current data (the local files unless --cloud is given) and
+precomputes every team x player x filter period (all time, every season,
+year and year/month) into one compact JSON bundle. A bundle holds the
+summary, the winrate/games tables of every stat type, the role x map
+heatmap and the winrate trend. The viewer from static_viewer/ and
+Plotly.js are copied next to the bundles, so the output can be served by
+any static file host and needs no Python per request.
+"""
+import argparse
+import calendar
+import json
+import os
+import shutil
+
+import numpy as np
+import plotly
+
+from aggregates import (
+    GROUP_COLUMNS,
+    downsample_trend,
+    group_stats,
+    heatmap_matrix,
+    trend_series,
+)
+from data import (
+    _slugify,
+    get_filter_options,
+    get_source,
+    get_source_names,
+    ingest_archives,
+    load_data,
+)
+from utils import summarize_matches
+
+VIEWER_DIR = "static_viewer"
+PLOTLY_JS = os.path.join(os.path.dirname(plotly.__file__), "package_data", "plotly.min.js")
+# Decimals kept of winrates, enough for one decimal of a percentage
+PRECISION = 4
+MONTH_ORDER = {name: i for i, name in enumerate(calendar.month_name) if name}
+
+
+def _numbers(values):
+    """Rounded JSON numbers of an array, NaN -> null."""
+    values = np.round(np.asarray(values, dtype=float), PRECISION)
+    return [None if np.isnan(v) else v for v in values.tolist()]
+
+
+def _periods(name):
+    """
+    Returns the (label, slug, season, month, year) of every filter period
+    of a source, in the order of the dashboard's dropdowns.
+    """
+    seasons, _, years = get_filter_options(name)
+    periods = [("All time", "all", None, None, None)]
+    for option in seasons:
+        season = option["value"]
+        periods.append((season, f"season-{_slugify(season)}", season, None, None))
+    for option in years:
+        year = option["value"]
+        periods.append((str(year), f"year-{year}", None, None, year))
+    timeline = get_source(name).timeline
+    year_months = [k[1:] for k in (timeline["periods"] if timeline else {}) if k[0] == "year_month"]
+    for year, month in sorted(
+        year_months, key=lambda k: (-k[0], -MONTH_ORDER.get(k[1], 0))
+    ):
+        periods.append(
+            (f"{month} {year}", f"month-{year}-{_slugify(month)}", None, month, year)
+        )
+    return periods
+
+
+def build_bundle(data, player, label, min_games):
+    """
+    Returns the JSON payload of one player and filter period.
+    """
+    summary = summarize_matches(data, min_games, 3, "winrate")
+    tables = {}
+    for col in GROUP_COLUMNS:
+        stats = group_stats(data, col, "winrate", 1)
+        tables[col] = {
+            "names": stats[col].astype(str).tolist(),
+            "games": stats["Games"].astype(int).tolist(),
+            "winrate": _numbers(stats["Winrate"]),
+            "low": _numbers(stats["WinrateLow"]),
+            "high": _numbers(stats["WinrateHigh"]),
+        }
+    pivot = heatmap_matrix(data)
+    series, streak = trend_series(data)
+    trend = downsample_trend(series, "GameNum")
+    return {
+        "player": player,
+        "period": label,
+        "min_games": min_games,
+        "summary": summary,
+        "tables": tables,
+        "heatmap": {
+            "roles": [str(r) for r in pivot.index],
+            "maps": [str(m) for m in pivot.columns],
+            "winrate": [_numbers(row) for row in pivot.to_numpy()],
+        },
+        "trend": {
+            "x": trend["GameNum"].astype(int).tolist(),
+            "y": _numbers(trend["Winrate"]),
+            "streaks": streak,
+        },
+    }
+
+
+def _write_json(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(payload, f, separators=(",", ":"), default=str)
+
+
+def build_team(name, out_dir, min_games):
+    """
+    Writes the bundles of a team and returns its entry of index.json.
+    """
+    source = get_source(name)
+    team_slug = _slugify(name) or "default"
+    periods = _periods(name)
+    entry = {
+        "name": name,
+        "slug": team_slug,
+        "version": source.version,
+        "periods": [{"label": p[0], "slug": p[1]} for p in periods],
+        "players": [],
+    }
+    for player in source.players:
+        player_slug = _slugify(player)
+        available = []
+        for label, slug, season, month, year in periods:
+            data = source.filter_matches(player, season, month, year)
+            if data.empty:
+                continue
+            _write_json(
+                os.path.join(out_dir, "data", team_slug, player_slug, f"{slug}.json"),
+                build_bundle(data, player, label, min_games),
+            )
+            available.append(slug)
+        entry["players"].append(
+            {"name": player, "slug": player_slug, "periods": available}
+        )
+    return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--out", default="static_build", help="output directory")
+    parser.add_argument(
+        "--min-games", type=int, default=5, help="minimum games of the best-of stats"
+    )
+    parser.add_argument(
+        "--cloud", action="store_true", help="download the sheets instead of the local files"
+    )
+    args = parser.parse_args()
+
+    load_data(use_local=not args.cloud)
+    ingest_archives()
+    if os.path.isdir(args.out):
+        shutil.rmtree(args.out)
+    shutil.copytree(VIEWER_DIR, args.out)
+    shutil.copy(PLOTLY_JS, os.path.join(args.out, "plotly.min.js"))
+
+    teams = [build_team(name, args.out, args.min_games) for name in get_source_names()]
+    _write_json(os.path.join(args.out, "data", "index.json"), {"teams": teams})
+
+    bundles = sum(len(p["periods"]) for t in teams for p in t["players"])
+    total = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(os.path.join(args.out, "data"))
+        for name in names
+    )
+    print(f"Built {bundles} view bundles ({total / 1024:.0f} KB) in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
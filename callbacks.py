@@ -1,60 +1,288 @@
+import re
+from urllib.parse import quote
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from dash import Input, Output, ctx, State, ALL, html, dcc
+from dash import Input, Output, ctx, State, ALL, Patch, html, dcc, no_update
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
-import constants
 from utils import (
     get_map_image_url,
     get_hero_image_url,
     create_stat_card,
-    filter_data,
-    calculate_winrate,
+    add_confidence,
+    summarize_matches,
 )
 from layout import generate_history_layout_simple
-from data import load_data, get_data
+from synergy import co_occurrence, duo_stats, composition_stats
+from model import predict_win
+from aggregates import (
+    run_tasks,
+    group_stats,
+    map_detail_winrate,
+    map_detail_plays,
+    map_side_counts,
+    distribution,
+    heatmap_matrix,
+    trend_series,
+    rolling_window,
+    downsample_trend,
+    TREND_MAX_POINTS,
+    period_key,
+    stats_key,
+    trend_key,
+)
+from data import (
+    load_data,
+    get_data,
+    get_players,
+    get_source,
+    record_view,
+    get_cached,
+    peek_cached,
+    get_filter_options,
+    get_player_heroes,
+    get_hero_options,
+    filter_matches,
+    get_period_matches,
+    get_win_model,
+    resolve_date_range,
+    get_history_page,
+    iter_history,
+    get_quality_report,
+)
+from validation import EXCLUDED_ISSUES, format_report
+from export import EXPORT_DATASETS, write_export
+
+
+def _ranking(min_games, rank_by_confidence):
+    """
+    Returns the minimum games and ranking the winrate charts use.
+    """
+    # The confidence bound already penalizes small samples
+    if rank_by_confidence:
+        return 1, "lower_bound"
+    return min_games, "winrate"
+
+
+# Input -> the only field of the graph-traces store it changes. These inputs
+# are patched into the current figures instead of rendering them again.
+PARTIAL_TRIGGERS = {
+    "compare-switch": "compare",
+    "min-games-slider": "min_games",
+    "hero-filter-dropdown": "hero_filter",
+}
+
+
+def _partial_change(previous, view):
+    """
+    Returns the field of the view a single partial trigger changed, or None
+    if the graphs have to be rendered in full.
+    """
+    if len(ctx.triggered) != 1 or not previous or previous["view"] != view["view"]:
+        return None
+    trigger = ctx.triggered_id
+    if isinstance(trigger, dict):
+        trigger = trigger.get("type")
+    field = PARTIAL_TRIGGERS.get(trigger)
+    changed = [k for k, v in view.items() if previous.get(k) != v]
+    return field if changed in ([field], []) else None
+
+
+def _patch_traces(data, old_names, names, traces):
+    """
+    Turns the trace list data (a Patch, one trace per name of old_names)
+    into the one of names by inserting or deleting a single trace and
+    replacing the other traces given. Returns False if it is no such change.
+    """
+    # An empty figure has a different layout, it is always rebuilt
+    if not old_names or not names:
+        return False
+    inserted = None
+    if len(names) == len(old_names) + 1:
+        for i, name in enumerate(names):
+            if names[:i] + names[i + 1 :] == old_names:
+                data.insert(i, traces[name])
+                inserted = name
+                break
+        else:
+            return False
+    elif len(old_names) == len(names) + 1:
+        for i in range(len(old_names)):
+            if old_names[:i] + old_names[i + 1 :] == names:
+                del data[i]
+                break
+        else:
+            return False
+    elif names != old_names:
+        return False
+    for i, name in enumerate(names):
+        if name in traces and name != inserted:
+            data[i] = traces[name]
+    return True
+
+
+def _trend_trace(name, time_data, trend_mode, x_range=None):
+    """
+    Returns the trace of a player's winrate trend, downsampled to the point
+    budget (inside x_range when zoomed in). Long series are drawn with WebGL.
+    """
+    scatter = go.Scattergl if len(time_data) > TREND_MAX_POINTS else go.Scatter
+    if trend_mode == "session":
+        points = downsample_trend(time_data, "Date", x_range=x_range)
+        return scatter(
+            x=points["Date"],
+            y=points["Winrate"],
+            customdata=points[["Games"]],
+            mode="lines+markers",
+            name=name,
+            hovertemplate="<b>%{x|%d.%m.%Y}</b><br><b>Winrate: %{y: .1%}</b><br>Games: %{customdata[0]}<extra></extra>",
+        )
+    points = downsample_trend(time_data, "GameNum", x_range=x_range)
+    return scatter(
+        x=points["GameNum"],
+        y=points["Winrate"],
+        mode="lines",
+        name=name,
+        hovertemplate="<b>Game Number: %{x}</b><br><b>Winrate: %{y: .1%}</b><extra></extra>",
+    )
+
+
+def _relayout_range(relayout, axis):
+    """
+    Returns the [start, end] an axis was zoomed to, "auto" if it was reset,
+    or None if the relayout event did not touch it.
+    """
+    if relayout.get(f"{axis}.autorange"):
+        return "auto"
+    if f"{axis}.range" in relayout:
+        return list(relayout[f"{axis}.range"])
+    if f"{axis}.range[0]" in relayout and f"{axis}.range[1]" in relayout:
+        return [relayout[f"{axis}.range[0]"], relayout[f"{axis}.range[1]"]]
+    return None
 
 
 def register_callbacks(app):
     @app.callback(
         Output("dummy-output", "children"),
         Input("update-data-button", "n_clicks"),
+        State("team-dropdown", "value"),
         prevent_initial_call=True,
     )
-    def update_data_callback(n_clicks):
+    def update_data_callback(n_clicks, team):
         if n_clicks > 0:
-            load_data(use_local=False)
+            load_data(use_local=False, source=team)
         return f"Data updated at {pd.Timestamp.now()}"
 
+    @app.callback(
+        Output("dummy-output", "children", allow_duplicate=True),
+        Output("live-refresh", "data"),
+        Output("graph-traces", "data", allow_duplicate=True),
+        Input("data-event", "data"),
+        State("team-dropdown", "value"),
+        State("season-dropdown", "value"),
+        State("date-range-dropdown", "value"),
+        State("date-range-picker", "start_date"),
+        State("date-range-picker", "end_date"),
+        State("graph-traces", "data"),
+        prevent_initial_call=True,
+    )
+    def apply_data_event(
+        event, team, season, date_preset, date_start, date_end, rendered
+    ):
+        """
+        Handles a data version pushed by /api/events. Every view is refreshed
+        if the version changed the matches of the selected season (or a date
+        range is selected, which overrides the season), otherwise only the
+        season independent ones (history, filter options) are, and nothing
+        at all if no match changed.
+        """
+        if (
+            not event
+            or not rendered
+            or event["team"] != get_source(team).name
+            or rendered["version"] >= event["version"]
+        ):
+            raise PreventUpdate
+        changed = event["seasons"]
+        # Versions missed in between may have changed anything
+        if changed is None or rendered["version"] != event.get("previous"):
+            return f"Data updated at {pd.Timestamp.now()}", no_update, no_update
+        # The graphs already show this version's data
+        graph_traces = Patch()
+        graph_traces["version"] = event["version"]
+        if not changed:
+            return no_update, no_update, graph_traces
+        dates = resolve_date_range(date_preset, date_start, date_end)
+        if season and not dates and season not in changed:
+            return no_update, event["version"], graph_traces
+        return f"Data updated at {pd.Timestamp.now()}", no_update, no_update
+
     @app.callback(
         Output("season-dropdown", "options"),
         Output("month-dropdown", "options"),
         Output("year-dropdown", "options"),
         Input("dummy-output", "children"),
+        Input("live-refresh", "data"),
+        Input("team-dropdown", "value"),
     )
-    def update_filter_options(_):
-        df = get_data()
-        if df.empty:
-            return [], [], []
-        season_options = [
-            {"label": s, "value": s}
-            for s in sorted(df["Season"].dropna().unique(), reverse=True)
-        ]
-        month_options = [
-            {"label": m, "value": m} for m in sorted(df["Month"].dropna().unique())
-        ]
-        year_options = [
-            {"label": str(int(y)), "value": int(y)}
-            for y in sorted(df["Year"].dropna().unique())
+    def update_filter_options(_, __, team):
+        return get_filter_options(team)
+
+    @app.callback(
+        Output("data-quality-alert", "children"),
+        Input("team-dropdown", "value"),
+        Input("dummy-output", "children"),
+    )
+    def update_quality_alert(team, _):
+        issues = get_quality_report(team).get("issues", {})
+        if not issues:
+            return None
+        excluded = {k: v for k, v in issues.items() if k in EXCLUDED_ISSUES}
+        flagged = {k: v for k, v in issues.items() if k not in EXCLUDED_ISSUES}
+        sections = [
+            ("Left out of the statistics:", excluded),
+            ("Flagged, still counted:", flagged),
         ]
-        return season_options, month_options, year_options
+        children = []
+        for title, report in sections:
+            if report:
+                children += [
+                    html.Strong(title),
+                    html.Ul([html.Li(line) for line in format_report(report)]),
+                ]
+        href = "/api/quality" + (f"?team={quote(team)}" if team else "")
+        children.append(html.Small(["Details: ", html.A(href, href=href)]))
+        return dbc.Alert(children, color="warning", dismissable=True)
+
+    @app.callback(
+        Output("player-dropdown", "options"),
+        Output("player-dropdown", "value"),
+        Output("player-dropdown-match-history", "options"),
+        Input("team-dropdown", "value"),
+        Input("dummy-output", "children"),
+        State("player-dropdown", "value"),
+        State("player-dropdown", "options"),
+        prevent_initial_call=True,
+    )
+    def update_player_options(team, _, current_player, current_options):
+        players = get_players(team)
+        options = [{"label": p, "value": p} for p in players]
+        if ctx.triggered_id == "dummy-output" and options == current_options:
+            # A data refresh that kept the roster, the switches stay as they are
+            return no_update, no_update, no_update
+        history_options = [{"label": "All Players", "value": "ALL"}] + options
+        player = current_player if current_player in players else players[0]
+        return options, player, history_options
 
     @app.callback(
         Output("compare-switches-container", "children"),
         Input("player-dropdown", "value"),
+        Input("player-dropdown", "options"),
+        State("team-dropdown", "value"),
     )
-    def generate_comparison_switches(selected_player):
-        other_players = [p for p in constants.players if p != selected_player]
+    def generate_comparison_switches(selected_player, _, team):
+        other_players = [p for p in get_players(team) if p != selected_player]
         if not other_players:
             return None
         switches = [html.Label("Compare with:", className="fw-bold")]
@@ -86,6 +314,23 @@ def register_callbacks(app):
             return {"display": "block"}
         return {"display": "none"}
 
+    @app.callback(
+        Output("trend-window-container", "style"), Input("trend-mode", "value")
+    )
+    def toggle_trend_window_visibility(trend_mode):
+        if trend_mode == "rolling":
+            return {"display": "block"}
+        return {"display": "none"}
+
+    @app.callback(
+        Output("date-range-picker-container", "style"),
+        Input("date-range-dropdown", "value"),
+    )
+    def toggle_date_picker_visibility(date_preset):
+        if date_preset == "custom":
+            return {"display": "block"}
+        return {"display": "none"}
+
     @app.callback(
         Output("min-games-slider", "disabled"),
         Output("slider-hint", "children"),
@@ -93,12 +338,16 @@ def register_callbacks(app):
         Input("hero-stat-type", "value"),
         Input("role-stat-type", "value"),
         Input("map-stat-type", "value"),
+        Input("rank-by-confidence", "value"),
     )
-    def toggle_slider(tab, hero_stat, role_stat, map_stat):
+    def toggle_slider(tab, hero_stat, role_stat, map_stat, rank_by_confidence):
+        if rank_by_confidence:
+            return True, "Not needed when ranking by confidence"
         if (
             (tab == "tab-hero" and hero_stat == "winrate")
             or (tab == "tab-role" and role_stat == "winrate")
             or (tab == "tab-map" and map_stat in ["winrate", "gamemode", "attackdef"])
+            or tab == "tab-synergy"
         ):
             return False, ""
         return True, "Only relevant for winrate statistics"
@@ -110,13 +359,25 @@ def register_callbacks(app):
         Input("player-dropdown-match-history", "value"),
         Input("hero-filter-dropdown-match", "value"),
         Input("dummy-output", "children"),
+        Input("live-refresh", "data"),
+        Input("team-dropdown", "value"),
         State("history-display-count-store", "data"),
         State("history-load-amount-dropdown", "value"),
+        State("session-key", "data"),
     )
     def update_history_display(
-        n_clicks, player_name, hero_name, _, current_store, load_amount
+        n_clicks,
+        player_name,
+        hero_name,
+        _,
+        __,
+        team,
+        current_store,
+        load_amount,
+        session,
     ):
-        df = get_data()
+        df = get_data(team)
+        players = get_players(team)
         if df.empty:
             return [
                 dbc.Alert("No match history available.", color="danger")
@@ -129,41 +390,19 @@ def register_callbacks(app):
             "player-dropdown-match-history",
             "hero-filter-dropdown-match",
             "dummy-output",
+            "team-dropdown",
         ]:
             new_count = 10
+        elif triggered_id == "live-refresh":
+            # Pushed data update, keep the matches the user already loaded
+            new_count = current_store.get("count", 10)
         else:  # triggered by "load-more-history-button"
             new_count = current_store.get("count", 10) + load_amount
 
-        filtered_df = df.copy()
-
-        # Filter by player
-        if player_name and player_name != "ALL":
-            player_hero_col = f"{player_name} Hero"
-            if player_hero_col in filtered_df.columns:
-                # Filter for games the player participated in
-                filtered_df = filtered_df[
-                    filtered_df[player_hero_col].notna()
-                    & (filtered_df[player_hero_col] != "not present")
-                ]
-
-                # Filter by hero for that specific player
-                if hero_name:
-                    filtered_df = filtered_df[filtered_df[player_hero_col] == hero_name]
-
-        # If a hero is selected but no specific player, filter for any player playing that hero
-        elif hero_name and (not player_name or player_name == "ALL"):
-            # Check all player hero columns
-            hero_cols = [
-                f"{p} Hero"
-                for p in constants.players
-                if f"{p} Hero" in filtered_df.columns
-            ]
-            # Create a boolean mask. True if any of the hero columns for a row equals the hero_name
-            mask = filtered_df[hero_cols].eq(hero_name).any(axis=1)
-            filtered_df = filtered_df[mask]
-
-        games_to_show = filtered_df.head(new_count)
-        history_layout = generate_history_layout_simple(games_to_show)
+        games_to_show = get_history_page(
+            player_name, hero_name, new_count, source=team, session=session
+        )
+        history_layout = generate_history_layout_simple(games_to_show, players)
 
         if games_to_show.empty:
             history_layout = [
@@ -180,65 +419,339 @@ def register_callbacks(app):
         Output("hero-filter-dropdown-match", "value"),
         Input("player-dropdown-match-history", "value"),
         Input("dummy-output", "children"),
+        Input("live-refresh", "data"),
+        Input("team-dropdown", "value"),
         State("hero-filter-dropdown-match", "value"),
     )
-    def update_match_history_hero_options(selected_player, _, current_hero):
-        df = get_data()
-        if df.empty:
+    def update_match_history_hero_options(
+        selected_player, _, __, team, current_hero
+    ):
+        if get_data(team).empty:
             return [], None
 
-        if not selected_player or selected_player == "ALL":
-            # Show all heroes from all players if no player is selected
-            all_heroes = set()
-            for p in constants.players:
-                hero_col = f"{p} Hero"
-                if hero_col in df.columns:
-                    all_heroes.update(
-                        df[
-                            df[hero_col].notna() & (df[hero_col] != "not present")
-                        ][hero_col].unique()
-                    )
-            heroes = sorted(list(all_heroes))
+        heroes = get_player_heroes(selected_player or "ALL", team)
+        hero_options = get_hero_options(heroes)
+
+        # Check if the current hero is still valid
+        if current_hero and current_hero in heroes:
+            return hero_options, current_hero
+
+        return hero_options, None
+
+    @app.callback(
+        Output("synergy-partner-dropdown", "options"),
+        Output("synergy-partner-dropdown", "value"),
+        Output("synergy-partner-dropdown", "style"),
+        Input("player-dropdown", "value"),
+        Input("player-dropdown", "options"),
+        Input("synergy-view", "value"),
+        State("team-dropdown", "value"),
+        State("synergy-partner-dropdown", "value"),
+    )
+    def update_synergy_partners(player, _, view, team, current_partner):
+        partners = [p for p in get_players(team) if p != player]
+        options = [{"label": p, "value": p} for p in partners]
+        partner = current_partner if current_partner in partners else None
+        if partner is None and partners:
+            partner = partners[0]
+        style = {"width": "100%", "margin-bottom": "20px"}
+        if view != "duo":
+            style["display"] = "none"
+        return options, partner, style
+
+    @app.callback(
+        Output("synergy-container", "children"),
+        Input("player-dropdown", "value"),
+        Input("synergy-partner-dropdown", "value"),
+        Input("synergy-view", "value"),
+        Input("min-games-slider", "value"),
+        Input("season-dropdown", "value"),
+        Input("month-dropdown", "value"),
+        Input("year-dropdown", "value"),
+        Input("date-range-dropdown", "value"),
+        Input("date-range-picker", "start_date"),
+        Input("date-range-picker", "end_date"),
+        Input("dummy-output", "children"),
+        Input("team-dropdown", "value"),
+        State("session-key", "data"),
+    )
+    def update_synergy(
+        player,
+        partner,
+        view,
+        min_games,
+        season,
+        month,
+        year,
+        date_preset,
+        date_start,
+        date_end,
+        _,
+        team,
+        session,
+    ):
+        df = get_data(team)
+        if df.empty:
+            return dbc.Alert("No data available for this selection.", color="info")
+        players = get_players(team)
+        dates = resolve_date_range(date_preset, date_start, date_end)
+        if dates:
+            season = month = year = None
+            period = (("dates",) + dates, None, None)
         else:
-            # Show heroes for the selected player
-            player_hero_col = f"{selected_player} Hero"
-            if player_hero_col in df.columns:
-                heroes = sorted(
-                    df[
-                        df[player_hero_col].notna()
-                        & (df[player_hero_col] != "not present")
-                    ][player_hero_col].unique()
+            period = (season, None, None) if season else (season, month, year)
+
+        def period_data():
+            return get_period_matches(
+                season, month, year, dates, source=team, session=session
+            )
+
+        if view == "composition":
+            stats = get_cached(
+                ("compositions",) + period,
+                lambda: composition_stats(period_data(), players),
+                source=team,
+                season=season,
+            )
+            stats = stats[stats["Games"] >= min_games].head(25)
+            if stats.empty:
+                return dbc.Alert(
+                    f"No team composition with at least {min_games} games.",
+                    color="info",
                 )
-            else:
-                heroes = []
+            table = stats[["Composition", "Games", "Win", "Winrate"]].copy()
+            table["Winrate"] = table["Winrate"].map("{:.0%}".format)
+            return dbc.Table.from_dataframe(
+                table, striped=True, bordered=False, hover=True, size="sm"
+            )
+
+        if not partner:
+            return dbc.Alert("Select a teammate to compare with.", color="info")
+        matrices = get_cached(
+            ("co_occurrence",) + period,
+            lambda: co_occurrence(period_data(), players),
+            source=team,
+            season=season,
+        )
+        stats = duo_stats(matrices, player, partner)
+        stats = stats[stats["Games"] >= min_games]
+        if stats.empty:
+            return dbc.Alert(
+                f"No hero pair of {player} and {partner} with at least {min_games} games.",
+                color="info",
+            )
+        a_col, b_col = f"{player} Hero", f"{partner} Hero"
+        winrates = stats.pivot(index=a_col, columns=b_col, values="Winrate")
+        games = stats.pivot(index=a_col, columns=b_col, values="Games")
+        fig = px.imshow(
+            winrates,
+            text_auto=".0%",
+            color_continuous_scale="RdYlGn",
+            zmin=0,
+            zmax=1,
+            aspect="auto",
+            title=f"Duo Winrates – {player} & {partner}",
+        )
+        fig.update_traces(
+            customdata=games.to_numpy(),
+            hovertemplate=f"<b>{player}: %{{y}}</b><br><b>{partner}: %{{x}}</b><br>Winrate: %{{z:.1%}}<br>Games: %{{customdata}}<extra></extra>",
+        )
+        return dcc.Graph(figure=fig)
 
-        hero_options = []
-        for hero in heroes:
-            hero_options.append(
-                {
-                    "label": html.Div(
+    @app.callback(
+        Output("whatif-map", "options"),
+        Output("whatif-side", "options"),
+        Output("whatif-hero-container", "children"),
+        Input("team-dropdown", "value"),
+        Input("dummy-output", "children"),
+    )
+    def update_whatif_inputs(team, _):
+        model = get_win_model(team)
+        values = {}
+        for col, value in model["labels"][1:]:
+            values.setdefault(col, []).append(value)
+        hero_dropdowns = []
+        for player in get_players(team):
+            heroes = sorted(h for p, h in model["roles"] if p == player)
+            hero_dropdowns.append(
+                dbc.Col(
+                    [
+                        dbc.Label(f"{player}:"),
+                        dcc.Dropdown(
+                            id={"type": "whatif-hero", "player": player},
+                            options=get_hero_options(heroes),
+                            placeholder="Not playing",
+                            className="mb-3",
+                        ),
+                    ],
+                    width=3,
+                )
+            )
+        return (
+            sorted(values.get("Map", [])),
+            sorted(values.get("Attack Def", [])),
+            hero_dropdowns,
+        )
+
+    @app.callback(
+        Output("whatif-result", "children"),
+        Input("whatif-map", "value"),
+        Input("whatif-side", "value"),
+        Input({"type": "whatif-hero", "player": ALL}, "value"),
+        State({"type": "whatif-hero", "player": ALL}, "id"),
+        State("team-dropdown", "value"),
+    )
+    def update_whatif(map_name, side, hero_values, hero_ids, team):
+        model = get_win_model(team)
+        if not model["matches"]:
+            return dbc.Alert("No data available for this selection.", color="info")
+        heroes = {i["player"]: hero for i, hero in zip(hero_ids, hero_values)}
+        if not (map_name or side or any(heroes.values())):
+            return dbc.Alert(
+                "Select a map and the heroes to estimate the winrate.", color="info"
+            )
+        result = predict_win(model, map_name, side, heroes)
+        winrate, overall = result["winrate"], model["winrate"]
+        cards = dbc.Row(
+            [
+                dbc.Col(
+                    dbc.Card(
                         [
-                            html.Img(
-                                src=get_hero_image_url(hero),
-                                style={
-                                    "height": "25px",
-                                    "marginRight": "10px",
-                                    "borderRadius": "50%",
-                                },
+                            dbc.CardHeader("Expected Winrate"),
+                            dbc.CardBody(
+                                html.H4(
+                                    f"{winrate:.0%}",
+                                    className="text-success"
+                                    if winrate >= overall
+                                    else "text-danger",
+                                )
                             ),
-                            html.Span(hero),
                         ],
-                        style={"display": "flex", "alignItems": "center"},
-                    ),
-                    "value": hero,
-                }
+                        className="text-center h-100",
+                    )
+                ),
+                dbc.Col(
+                    dbc.Card(
+                        [
+                            dbc.CardHeader("Overall Winrate"),
+                            dbc.CardBody(html.H4(f"{overall:.0%}")),
+                        ],
+                        className="text-center h-100",
+                    )
+                ),
+            ],
+            className="mb-3",
+        )
+        note = html.Small(
+            f"Logistic regression over map, mode, side and every player's hero "
+            f"and role, trained on {model['matches']} matches.",
+            className="text-muted",
+        )
+        if not result["contributions"]:
+            return [cards, note]
+        labels, weights = zip(*result["contributions"])
+        fig = go.Figure(
+            go.Bar(
+                x=list(weights),
+                y=list(labels),
+                orientation="h",
+                marker_color=["#198754" if w >= 0 else "#dc3545" for w in weights],
+                hovertemplate="<b>%{y}</b><br>Log-odds: %{x:+.2f}<extra></extra>",
             )
+        )
+        fig.update_layout(
+            title="Contribution to the Win Chance",
+            xaxis_title="Log-odds (positive = more likely to win)",
+            yaxis_autorange="reversed",
+            height=max(250, 60 + 30 * len(labels)),
+        )
+        return [cards, dcc.Graph(figure=fig), note]
 
-        # Check if the current hero is still valid
-        if current_hero and current_hero in heroes:
-            return hero_options, current_hero
+    @app.callback(
+        Output("export-download", "data"),
+        Input("export-button", "n_clicks"),
+        State("export-dataset", "value"),
+        State("export-format", "value"),
+        State("player-dropdown", "value"),
+        State("season-dropdown", "value"),
+        State("month-dropdown", "value"),
+        State("year-dropdown", "value"),
+        State("date-range-dropdown", "value"),
+        State("date-range-picker", "start_date"),
+        State("date-range-picker", "end_date"),
+        State("min-games-slider", "value"),
+        State("rank-by-confidence", "value"),
+        State("player-dropdown-match-history", "value"),
+        State("hero-filter-dropdown-match", "value"),
+        State("team-dropdown", "value"),
+        State("session-key", "data"),
+        prevent_initial_call=True,
+    )
+    def export_view(
+        n_clicks,
+        dataset,
+        fmt,
+        player,
+        season,
+        month,
+        year,
+        date_preset,
+        date_start,
+        date_end,
+        min_games,
+        rank_by_confidence,
+        history_player,
+        history_hero,
+        team,
+        session,
+    ):
+        if dataset == "history":
+            chunks = iter_history(history_player, history_hero, source=team)
+            parts = ["match_history", history_player, history_hero]
+        else:
+            dates = resolve_date_range(date_preset, date_start, date_end)
+            if dates:
+                season = month = year = None
+                period = [dates[0] or "start", dates[1] or "today"]
+            else:
+                period = [season] if season else [year, month]
+            parts = [EXPORT_DATASETS[dataset], player] + period
 
-        return hero_options, None
+            # Served from the per-filter cache the graphs fill
+            def matches():
+                return filter_matches(
+                    player,
+                    season,
+                    month,
+                    year,
+                    source=team,
+                    dates=dates,
+                    session=session,
+                )
+
+            if dataset == "heatmap":
+                pivot = get_cached(
+                    period_key("heatmap", player, season, month, year, dates=dates),
+                    lambda: heatmap_matrix(matches()),
+                    source=team,
+                    season=season,
+                )
+                chunks = [pivot.reset_index()]
+            else:
+                min_games, rank_by = _ranking(min_games, rank_by_confidence)
+                stats = get_cached(
+                    stats_key(
+                        player, season, month, year, dataset, "winrate", rank_by, dates
+                    ),
+                    lambda: group_stats(matches(), dataset, "winrate", 1, rank_by),
+                    source=team,
+                    season=season,
+                )
+                chunks = [stats[stats["Games"] >= min_games]]
+        filename = "_".join(
+            re.sub(r"[^A-Za-z0-9]+", "-", str(p)).strip("-") for p in parts if p
+        )
+        return dcc.send_bytes(write_export(chunks, fmt), f"{filename}.{fmt}")
 
     @app.callback(
         Output("map-stat-container", "children"),
@@ -249,6 +762,8 @@ def register_callbacks(app):
         Output("stats-container", "children"),
         Output("winrate-over-time", "figure"),
         Output("hero-filter-dropdown", "options"),
+        Output("trend-streaks", "children"),
+        Output("graph-traces", "data"),
         Input("player-dropdown", "value"),
         Input("min-games-slider", "value"),
         Input("season-dropdown", "value"),
@@ -262,6 +777,15 @@ def register_callbacks(app):
         Input({"type": "compare-switch", "player": ALL}, "value"),
         State({"type": "compare-switch", "player": ALL}, "id"),
         Input("dummy-output", "children"),
+        Input("team-dropdown", "value"),
+        Input("trend-mode", "value"),
+        Input("trend-window", "value"),
+        Input("rank-by-confidence", "value"),
+        Input("date-range-dropdown", "value"),
+        Input("date-range-picker", "start_date"),
+        Input("date-range-picker", "end_date"),
+        State("graph-traces", "data"),
+        State("session-key", "data"),
     )
     def update_all_graphs(
         player,
@@ -277,27 +801,281 @@ def register_callbacks(app):
         compare_values,
         compare_ids,
         _,
+        team,
+        trend_mode,
+        trend_window,
+        rank_by_confidence,
+        date_preset,
+        date_start,
+        date_end,
+        previous,
+        session,
     ):
-        df = get_data()
-        dataframes = {player: filter_data(df, player, season, month, year)}
+        min_games, rank_by = _ranking(min_games, rank_by_confidence)
+        # A date range overrides season, year and month
+        dates = resolve_date_range(date_preset, date_start, date_end)
+        if dates:
+            season = month = year = None
         active_compare_players = []
         if compare_ids:
             for i, is_on in enumerate(compare_values):
                 if is_on:
-                    p_name = compare_ids[i]["player"]
-                    active_compare_players.append(p_name)
-                    dataframes[p_name] = filter_data(df, p_name, season, month, year)
-        main_df = dataframes[player]
+                    active_compare_players.append(compare_ids[i]["player"])
+        players = [player] + active_compare_players
+        if not dates:
+            for name in players:
+                record_view(name, season, month, year, source=team)
         title_suffix = f"({player}{' vs ' + ', '.join(active_compare_players) if active_compare_players else ''})"
+
+        # A single compare toggle, slider move or hero filter change only
+        # patches the figures it affects, everything else stays as it is
+        view = {
+            "view": [
+                player, season, month, year, hero_stat_type, role_stat_type,
+                map_stat_type, map_view_type, team, trend_mode, trend_window,
+                rank_by_confidence, list(dates) if dates else None,
+            ],
+            "version": get_source(team).version,
+            "compare": active_compare_players,
+            "min_games": min_games,
+            "hero_filter": hero_filter,
+        }
+        change = _partial_change(previous, view)
+        if change and all(previous[k] == v for k, v in view.items()):
+            raise PreventUpdate
+        toggled = set()
+        if change == "compare":
+            toggled = set(active_compare_players) ^ set(previous["compare"])
+
+        def confidence_error(stats):
+            if not rank_by_confidence:
+                return None
+            return dict(
+                type="data",
+                array=(stats["WinrateHigh"] - stats["Winrate"]).to_numpy(),
+                arrayminus=(stats["Winrate"] - stats["WinrateLow"]).to_numpy(),
+            )
+
         empty_fig = go.Figure(
             layout={"title": "No data available for this selection"}
         )
         stats_header = f"Overall Statistics ({player})"
 
-        stats_container = html.Div("No data available for this selection.")
-        if not main_df.empty:
-            total, wins = len(main_df), len(main_df[main_df["Win Lose"] == "Win"])
-            losses, winrate = total - wins, wins / total if total > 0 else 0
+        # --- Aggregations (independent, may run concurrently) ---
+        detailed_map_view = (
+            map_view_type
+            and not active_compare_players
+            and map_stat_type in ["winrate", "plays"]
+        )
+        map_group_col = {
+            "winrate": "Map",
+            "plays": "Map",
+            "gamemode": "Gamemode",
+            "attackdef": "Attack Def",
+        }.get(map_stat_type)
+        map_y_col = (
+            "Winrate"
+            if map_stat_type in ["winrate", "gamemode", "attackdef"]
+            else "Games"
+        )
+        pie_data_col = {"gamemode": "Gamemode", "attackdef": "Attack Def"}.get(
+            map_stat_type
+        )
+        summary_key = period_key(
+            "summary", player, season, month, year, min_games, rank_by, dates=dates
+        )
+        stat_types = {
+            "hero": hero_stat_type,
+            "role": role_stat_type,
+            "map": map_y_col.lower(),
+        }
+        if change == "compare":
+            parts = {"hero", "role", "map", "trend"}
+        elif change == "min_games":
+            parts = {"stats"} | {k for k, s in stat_types.items() if s == "winrate"}
+        elif change == "hero_filter":
+            parts = {"trend"}
+        else:
+            parts = {"hero", "role", "map", "heatmap", "stats", "trend", "options"}
+
+        # Every table is cached per filter period (before the minimum number
+        # of games is applied), only the missing ones are computed. The
+        # matches of a player are only filtered if one of them is missing.
+        tasks, cache_keys, frames, results = {}, {}, {}, {}
+
+        def matches(name):
+            if name not in frames:
+                frames[name] = filter_matches(
+                    name,
+                    season,
+                    month,
+                    year,
+                    source=team,
+                    dates=dates,
+                    session=session,
+                )
+            return frames[name]
+
+        def add_task(name, key, data_player, func, *args):
+            # Cached tables are read right away, so a refresh in between
+            # can't drop them before they are used
+            cached = peek_cached(key, source=team, season=season)
+            if cached is not None:
+                results[name] = cached
+                return
+            cache_keys[name] = key
+            tasks[name] = (func, (matches(data_player),) + args)
+
+        for name in players:
+            for kind, group_col in [("hero", "Hero"), ("role", "Role"), ("map", map_group_col)]:
+                if kind not in parts or (kind == "map" and detailed_map_view):
+                    continue
+                add_task(
+                    (kind, name),
+                    stats_key(
+                        name,
+                        season,
+                        month,
+                        year,
+                        group_col,
+                        stat_types[kind],
+                        rank_by,
+                        dates,
+                    ),
+                    name,
+                    group_stats,
+                    group_col,
+                    stat_types[kind],
+                    1,
+                    rank_by,
+                )
+            if "trend" in parts:
+                add_task(
+                    ("trend", name),
+                    trend_key(
+                        name,
+                        season,
+                        month,
+                        year,
+                        hero_filter,
+                        trend_mode,
+                        trend_window,
+                        dates,
+                    ),
+                    name,
+                    trend_series,
+                    hero_filter,
+                    trend_mode,
+                    trend_window,
+                )
+        if "map" in parts and (detailed_map_view or pie_data_col):
+            add_task(
+                "map_sides",
+                period_key("map_sides", player, season, month, year, dates=dates),
+                player,
+                map_side_counts,
+            )
+        if "heatmap" in parts:
+            add_task(
+                "heatmap",
+                period_key("heatmap", player, season, month, year, dates=dates),
+                player,
+                heatmap_matrix,
+            )
+        main_df = matches(player) if parts & {"stats", "options"} else None
+        if "stats" in parts and not main_df.empty:
+            add_task(
+                "summary", summary_key, player, summarize_matches, min_games, 3, rank_by
+            )
+        computed = run_tasks(tasks)
+        for name, key in cache_keys.items():
+            results[name] = get_cached(
+                key, lambda name=name: computed[name], source=team, season=season
+            )
+        for name in results:
+            if name[0] in stat_types and stat_types[name[0]] == "winrate":
+                stats = results[name]
+                results[name] = stats[stats["Games"] >= min_games]
+
+        trace_names = dict(previous["traces"]) if change else {}
+
+        def patched_figure(kind, title, traces, location=()):
+            """
+            Returns a Patch of the output holding the previous figure of kind
+            (at location inside it) that only sends the changed traces, or
+            None if the figure has to be rebuilt.
+            """
+            output = Patch()
+            fig = output
+            for key in location:
+                fig = fig[key]
+            sent = traces
+            if change == "compare":
+                sent = {n: t for n, t in traces.items() if n in toggled}
+            # Encoded like in a full figure (typed arrays instead of lists)
+            sent = dict(zip(sent, go.Figure(list(sent.values())).to_dict()["data"]))
+            if not _patch_traces(
+                fig["data"], previous["traces"].get(kind), list(traces), sent
+            ):
+                return None
+            fig["layout"]["title"]["text"] = title
+            return output
+
+        def bar_traces(kind, group_col, y_col):
+            traces = {}
+            for name in players:
+                stats = results.get((kind, name))
+                if stats is None or stats.empty:
+                    continue
+                if y_col == "Winrate":
+                    traces[name] = go.Bar(
+                        x=stats[group_col],
+                        y=stats[y_col],
+                        name=name,
+                        customdata=stats[["Games"]],
+                        hovertemplate="<b>%{x}</b><br>Winrate: %{y:.1%}<br>Games: %{customdata[0]}<extra></extra>",
+                        error_y=confidence_error(stats),
+                    )
+                else:
+                    traces[name] = go.Bar(
+                        x=stats[group_col],
+                        y=stats[y_col],
+                        name=name,
+                        hovertemplate="<b>%{x}</b><br>Games: %{y}<extra></extra>",
+                    )
+            return traces
+
+        def create_comparison_fig(title, y_col, traces):
+            fig = go.Figure()
+            for trace in traces.values():
+                fig.add_trace(trace)
+            fig.update_layout(
+                title=title,
+                barmode="group",
+                yaxis_title=y_col,
+                legend_title="Player",
+            )
+            if y_col == "Winrate":
+                fig.update_layout(yaxis_tickformat=".0%")
+            return fig if fig.data else empty_fig
+
+        def comparison_output(kind, stat_type, group_col, y_col, location=()):
+            title = f"{stat_type.title().replace('def', 'Def')} by {group_col} {title_suffix}"
+            traces = bar_traces(kind, group_col, y_col)
+            trace_names[kind] = list(traces)
+            if change:
+                patch = patched_figure(kind, title, traces, location)
+                if patch is not None:
+                    return patch
+            return create_comparison_fig(title, y_col, traces)
+
+        stats_container = no_update
+        if "stats" in parts:
+            stats_container = html.Div("No data available for this selection.")
+        if "stats" in parts and not main_df.empty:
+            summary = results["summary"]
+            total, wins = summary["total"], summary["wins"]
+            losses, winrate = summary["losses"], summary["winrate"]
 
             # --- REVISED: Primary Stats Row ---
             primary_stats_row = dbc.Row(
@@ -350,153 +1128,110 @@ def register_callbacks(app):
 
             # --- Row 2: "Best Of" Stats ---
             secondary_stat_cards = []
-            try:
-                most_played_hero = main_df["Hero"].mode()[0]
-                hero_plays = main_df["Hero"].value_counts()[most_played_hero]
-                card = create_stat_card(
-                    "Most Played Hero",
-                    get_hero_image_url(most_played_hero),
-                    most_played_hero,
-                    f"{hero_plays} Games",
-                )
-            except (KeyError, IndexError):
-                card = create_stat_card(
-                    "Most Played Hero",
-                    get_hero_image_url(None),
-                    "N/A",
-                    "No data",
-                )
-            secondary_stat_cards.append(card)
-            try:
-                hero_wr = calculate_winrate(main_df, "Hero")
-                hero_wr_filtered = hero_wr[hero_wr["Games"] >= min_games]
-                best_hero = hero_wr_filtered.loc[hero_wr_filtered["Winrate"].idxmax()]
-                card = create_stat_card(
-                    "Best Winrate (Hero)",
-                    get_hero_image_url(best_hero["Hero"]),
-                    best_hero["Hero"],
-                    f"{best_hero['Winrate']:.0%} ({best_hero['Games']} Games)",
-                )
-            except (KeyError, IndexError, ValueError):
-                card = create_stat_card(
-                    "Best Winrate (Hero)",
-                    get_hero_image_url(None),
-                    "N/A",
-                    f"Min. {min_games} games",
-                )
-            secondary_stat_cards.append(card)
-            try:
-                most_played_map = main_df["Map"].mode()[0]
-                map_plays = main_df["Map"].value_counts()[most_played_map]
-                card = create_stat_card(
-                    "Most Played Map",
-                    get_map_image_url(most_played_map),
-                    most_played_map,
-                    f"{map_plays} Games",
-                )
-            except (KeyError, IndexError):
-                card = create_stat_card(
-                    "Most Played Map", get_map_image_url(None), "N/A", "No data"
-                )
-            secondary_stat_cards.append(card)
-            try:
-                map_wr = calculate_winrate(main_df, "Map")
-                map_wr_filtered = map_wr[map_wr["Games"] >= min_games]
-                best_map = map_wr_filtered.loc[map_wr_filtered["Winrate"].idxmax()]
-                card = create_stat_card(
-                    "Best Winrate (Map)",
-                    get_map_image_url(best_map["Map"]),
-                    best_map["Map"],
-                    f"{best_map['Winrate']:.0%} ({best_map['Games']} Games)",
-                )
-            except (KeyError, IndexError, ValueError):
-                card = create_stat_card(
-                    "Best Winrate (Map)",
-                    get_map_image_url(None),
-                    "N/A",
-                    f"Min. {min_games} games",
-                )
-            secondary_stat_cards.append(card)
+            for col, image_url in [
+                ("Hero", get_hero_image_url),
+                ("Map", get_map_image_url),
+            ]:
+                most_played = summary[col]["most_played"]
+                if most_played:
+                    top = most_played[0]
+                    card = create_stat_card(
+                        f"Most Played {col}",
+                        image_url(top["name"], "card"),
+                        top["name"],
+                        f"{top['games']} Games",
+                    )
+                else:
+                    card = create_stat_card(
+                        f"Most Played {col}",
+                        image_url(None, "card"),
+                        "N/A",
+                        "No data",
+                    )
+                secondary_stat_cards.append(card)
 
+                best_winrate = summary[col]["best_winrate"]
+                if best_winrate:
+                    best = best_winrate[0]
+                    card = create_stat_card(
+                        f"Best Winrate ({col})",
+                        image_url(best["name"], "card"),
+                        best["name"],
+                        (
+                            f"{best['winrate']:.0%} (≥{best['winrate_low']:.0%}, {best['games']} Games)"
+                            if rank_by_confidence
+                            else f"{best['winrate']:.0%} ({best['games']} Games)"
+                        ),
+                    )
+                else:
+                    card = create_stat_card(
+                        f"Best Winrate ({col})",
+                        image_url(None, "card"),
+                        "N/A",
+                        f"Min. {min_games} games",
+                    )
+                secondary_stat_cards.append(card)
             stats_container = html.Div(
                 [primary_stats_row, dbc.Row(secondary_stat_cards)]
             )
 
-        map_stat_output = None
-        attack_def_modes = ["Attack", "Defense", "Attack Attack"]
-        bar_fig = go.Figure()
-        if (
-            map_view_type
-            and not active_compare_players
-            and map_stat_type in ["winrate", "plays"]
-        ):
-            if map_stat_type == "winrate":
-                map_data = calculate_winrate(main_df, "Map")
-                map_data = map_data[map_data["Games"] >= min_games]
-                if not map_data.empty:
-                    plot_df = main_df[
-                        main_df["Attack Def"].isin(attack_def_modes)
-                    ].copy()
-                    plot_df["Mode"] = plot_df["Attack Def"].replace(
-                        {"Attack Attack": "Overall"}
+
+        map_stat_output = no_update
+        if "map" in parts:
+            bar_fig = go.Figure()
+            if detailed_map_view:
+                trace_names["map"] = None
+            else:
+                # The bar graph sits inside the container, the patch goes there
+                location = ["props", "children"]
+                if map_stat_type != "winrate":
+                    location.append(0)
+                bar_fig = comparison_output(
+                    "map",
+                    map_stat_type,
+                    map_group_col,
+                    map_y_col,
+                    location + ["props", "children", "props", "figure"],
+                )
+            if detailed_map_view and map_stat_type == "winrate":
+                map_order, plot_data = map_detail_winrate(
+                    results["map_sides"], min_games, rank_by
+                )
+                if not plot_data.empty:
+                    error_cols = {}
+                    if rank_by_confidence:
+                        plot_data = add_confidence(plot_data)
+                        plot_data["ErrorHigh"] = plot_data["WinrateHigh"] - plot_data["Winrate"]
+                        plot_data["ErrorLow"] = plot_data["Winrate"] - plot_data["WinrateLow"]
+                        error_cols = {"error_y": "ErrorHigh", "error_y_minus": "ErrorLow"}
+                    bar_fig = px.bar(
+                        plot_data,
+                        x="Map",
+                        y="Winrate",
+                        color="Mode",
+                        barmode="group",
+                        title=f"Map Winrates (Detailed) - {player}",
+                        category_orders={
+                            "Map": map_order,
+                            "Mode": ["Overall", "Attack", "Defense"],
+                        },
+                        custom_data=["Games"],
+                        color_discrete_map={
+                            "Overall": "lightslategrey",
+                            "Attack": "#EF553B",
+                            "Defense": "#636EFA",
+                        },
+                        **error_cols,
                     )
-                    grouped = (
-                        plot_df.groupby(["Map", "Mode", "Win Lose"])
-                        .size()
-                        .unstack(fill_value=0)
+                    bar_fig.update_traces(
+                        hovertemplate="Winrate: %{y:.1%}<br>Games: %{customdata[0]}<extra></extra>"
                     )
-                    if "Win" not in grouped:
-                        grouped["Win"] = 0
-                    if "Lose" not in grouped:
-                        grouped["Lose"] = 0
-                    grouped["Games"] = grouped["Win"] + grouped["Lose"]
-                    grouped["Winrate"] = grouped["Win"] / grouped["Games"]
-                    plot_data = grouped.reset_index()
-                    plot_data = plot_data[plot_data["Map"].isin(map_data["Map"])]
-                    if not plot_data.empty:
-                        bar_fig = px.bar(
-                            plot_data,
-                            x="Map",
-                            y="Winrate",
-                            color="Mode",
-                            barmode="group",
-                            title=f"Map Winrates (Detailed) - {player}",
-                            category_orders={
-                                "Map": map_data["Map"].tolist(),
-                                "Mode": ["Overall", "Attack", "Defense"],
-                            },
-                            custom_data=["Games"],
-                            color_discrete_map={
-                                "Overall": "lightslategrey",
-                                "Attack": "#EF553B",
-                                "Defense": "#636EFA",
-                            },
-                        )
-                        bar_fig.update_traces(
-                            hovertemplate="Winrate: %{y:.1%}<br>Games: %{customdata[0]}<extra></extra>"
-                        )
-                        bar_fig.update_layout(yaxis_tickformat=".0%")
-                    else:
-                        bar_fig = empty_fig
+                    bar_fig.update_layout(yaxis_tickformat=".0%")
                 else:
                     bar_fig = empty_fig
-            elif map_stat_type == "plays":
-                if not main_df.empty:
-                    plot_df = main_df.copy()
-                    plot_df["Side"] = plot_df["Attack Def"].apply(
-                        lambda x: x if x in attack_def_modes else "Other Modes"
-                    )
-                    plays_by_side = (
-                        plot_df.groupby(["Map", "Side"])
-                        .size()
-                        .reset_index(name="Games")
-                    )
-                    total_plays_map = (
-                        main_df.groupby("Map")
-                        .size()
-                        .reset_index(name="TotalGames")
-                        .sort_values("TotalGames", ascending=False)
-                    )
+            elif detailed_map_view and map_stat_type == "plays":
+                map_order, plays_by_side = map_detail_plays(results["map_sides"])
+                if not plays_by_side.empty:
                     bar_fig = px.bar(
                         plays_by_side,
                         x="Map",
@@ -505,7 +1240,7 @@ def register_callbacks(app):
                         barmode="stack",
                         title=f"Games per Map (Detailed) - {player}",
                         labels={"Games": "Number of Games", "Side": "Side"},
-                        category_orders={"Map": list(total_plays_map["Map"])},
+                        category_orders={"Map": map_order},
                         color_discrete_map={
                             "Attack": "#EF553B",
                             "Defense": "#00CC96",
@@ -517,161 +1252,61 @@ def register_callbacks(app):
                     )
                 else:
                     bar_fig = empty_fig
-        else:
-            group_col = {
-                "winrate": "Map",
-                "plays": "Map",
-                "gamemode": "Gamemode",
-                "attackdef": "Attack Def",
-            }.get(map_stat_type)
-            y_col = (
-                "Winrate"
-                if map_stat_type in ["winrate", "gamemode", "attackdef"]
-                else "Games"
-            )
-            for name, df_to_plot in dataframes.items():
-                if (
-                    not df_to_plot.empty
-                    and group_col
-                    and group_col in df_to_plot.columns
-                ):
-                    if y_col == "Winrate":
-                        stats = calculate_winrate(df_to_plot, group_col)
-                        stats = stats[stats["Games"] >= min_games]
-                        if not stats.empty:
-                            bar_fig.add_trace(
-                                go.Bar(
-                                    x=stats[group_col],
-                                    y=stats[y_col],
-                                    name=name,
-                                    customdata=stats[["Games"]],
-                                    hovertemplate="<b>%{x}</b><br>Winrate: %{y:.1%}<br>Games: %{customdata[0]}<extra></extra>",
-                                )
-                            )
-                    else:
-                        stats = (
-                            df_to_plot.groupby(group_col)
-                            .size()
-                            .reset_index(name="Games")
-                            .sort_values("Games", ascending=False)
+
+            if isinstance(bar_fig, Patch):
+                map_stat_output = bar_fig
+            elif map_stat_type == "winrate":
+                map_stat_output = dbc.Row(dbc.Col(dcc.Graph(figure=bar_fig), width=12))
+            else:
+                pie_fig = go.Figure()
+                if pie_data_col:
+                    pie_data = distribution(results["map_sides"], pie_data_col)
+                    if not pie_data.empty:
+                        pie_fig = px.pie(
+                            pie_data,
+                            names=pie_data_col,
+                            values="Games",
+                            title=f"Distribution {pie_data_col}",
                         )
-                        if not stats.empty:
-                            bar_fig.add_trace(
-                                go.Bar(
-                                    x=stats[group_col],
-                                    y=stats[y_col],
-                                    name=name,
-                                    hovertemplate="<b>%{x}</b><br>Games: %{y}<extra></extra>",
-                                )
-                            )
-            bar_fig.update_layout(
-                title=f"{map_stat_type.title().replace('def', 'Def')} by {group_col} {title_suffix}",
-                barmode="group",
-                yaxis_title=y_col,
-                legend_title="Player",
-            )
-            if y_col == "Winrate":
-                bar_fig.update_layout(yaxis_tickformat=".0%")
-            if not bar_fig.data:
-                bar_fig = empty_fig
-        if map_stat_type == "winrate":
-            map_stat_output = dbc.Row(dbc.Col(dcc.Graph(figure=bar_fig), width=12))
-        else:
-            pie_fig = go.Figure()
-            pie_data_col = None
-            if map_stat_type == "gamemode":
-                pie_data_col = "Gamemode"
-            elif map_stat_type == "attackdef":
-                pie_data_col = "Attack Def"
-            if pie_data_col:
-                pie_data = main_df.copy()
-                if pie_data_col == "Attack Def":
-                    pie_data = pie_data[pie_data["Attack Def"].isin(attack_def_modes)]
-                pie_data = (
-                    pie_data.groupby(pie_data_col).size().reset_index(name="Games")
-                )
-                if not pie_data.empty:
-                    pie_fig = px.pie(
-                        pie_data,
-                        names=pie_data_col,
-                        values="Games",
-                        title=f"Distribution {pie_data_col}",
-                    )
-                    pie_fig.update_traces(
-                        hovertemplate="<b>%{label}</b><br>Games: %{value}<br>Share: %{percent}<extra></extra>"
+                        pie_fig.update_traces(
+                            hovertemplate="<b>%{label}</b><br>Games: %{value}<br>Share: %{percent}<extra></extra>"
+                        )
+                    else:
+                        pie_fig = empty_fig
+                if map_stat_type == "plays":
+                    map_stat_output = dbc.Row(
+                        [dbc.Col(dcc.Graph(figure=bar_fig), width=12)]
                     )
                 else:
-                    pie_fig = empty_fig
-            if map_stat_type == "plays":
-                map_stat_output = dbc.Row(
-                    [dbc.Col(dcc.Graph(figure=bar_fig), width=12)]
-                )
-            else:
-                map_stat_output = dbc.Row(
-                    [
-                        dbc.Col(dcc.Graph(figure=bar_fig), width=7),
-                        dbc.Col(dcc.Graph(figure=pie_fig), width=5),
-                    ]
-                )
+                    map_stat_output = dbc.Row(
+                        [
+                            dbc.Col(dcc.Graph(figure=bar_fig), width=7),
+                            dbc.Col(dcc.Graph(figure=pie_fig), width=5),
+                        ]
+                    )
 
-        def create_comparison_fig(stat_type, group_col):
-            fig = go.Figure()
-            y_col = "Winrate" if stat_type == "winrate" else "Games"
-            for name, df_to_plot in dataframes.items():
-                if not df_to_plot.empty:
-                    if y_col == "Winrate":
-                        stats = calculate_winrate(df_to_plot, group_col)
-                        stats = stats[stats["Games"] >= min_games]
-                        if not stats.empty:
-                            fig.add_trace(
-                                go.Bar(
-                                    x=stats[group_col],
-                                    y=stats[y_col],
-                                    name=name,
-                                    customdata=stats[["Games"]],
-                                    hovertemplate="<b>%{x}</b><br>Winrate: %{y:.1%}<br>Games: %{customdata[0]}<extra></extra>",
-                                )
-                            )
-                    else:
-                        stats = (
-                            df_to_plot.groupby(group_col)
-                            .size()
-                            .reset_index(name="Games")
-                            .sort_values("Games", ascending=False)
-                        )
-                        if not stats.empty:
-                            fig.add_trace(
-                                go.Bar(
-                                    x=stats[group_col],
-                                    y=stats[y_col],
-                                    name=name,
-                                    hovertemplate="<b>%{x}</b><br>Games: %{y}<extra></extra>",
-                                )
-                            )
-            fig.update_layout(
-                title=f"{stat_type.title()} by {group_col} {title_suffix}",
-                barmode="group",
-                yaxis_title=y_col,
-                legend_title="Player",
+        hero_fig = role_fig = no_update
+        if "hero" in parts:
+            hero_fig = comparison_output(
+                "hero",
+                hero_stat_type,
+                "Hero",
+                "Winrate" if hero_stat_type == "winrate" else "Games",
+            )
+        if "role" in parts:
+            role_fig = comparison_output(
+                "role",
+                role_stat_type,
+                "Role",
+                "Winrate" if role_stat_type == "winrate" else "Games",
             )
-            if y_col == "Winrate":
-                fig.update_layout(yaxis_tickformat=".0%")
-            return fig if fig.data else empty_fig
 
-        hero_fig = create_comparison_fig(hero_stat_type, "Hero")
-        role_fig = create_comparison_fig(role_stat_type, "Role")
-        heatmap_fig = empty_fig
-        if not main_df.empty:
-            try:
-                pivot = main_df.pivot_table(
-                    index="Role",
-                    columns="Map",
-                    values="Win Lose",
-                    aggfunc=lambda x: (x == "Win").sum() / len(x)
-                    if len(x) > 0
-                    else 0,
-                )
-                if not pivot.empty:
+        heatmap_fig = no_update
+        if "heatmap" in parts:
+            heatmap_fig = empty_fig
+            pivot = results["heatmap"]
+            if not pivot.empty:
+                try:
                     heatmap_fig = px.imshow(
                         pivot,
                         text_auto=".0%",
@@ -684,73 +1319,144 @@ def register_callbacks(app):
                     heatmap_fig.update_traces(
                         hovertemplate="<b>Map: %{x}</b><br><b>Role: %{y}</b><br><b>Winrate: %{z: .1%}</b><extra></extra>"
                     )
-            except Exception:
-                pass
-        winrate_fig = go.Figure()
-        for name, df_to_plot in dataframes.items():
-            if not df_to_plot.empty and "Date" in df_to_plot.columns:
-                time_data = df_to_plot.dropna(subset=["Date"]).copy()
-                time_data.sort_values("Date", inplace=True, ascending=True)
-                if hero_filter:
-                    time_data = time_data[time_data["Hero"] == hero_filter]
-                if not time_data.empty:
-                    time_data["Win"] = (time_data["Win Lose"] == "Win").astype(int)
-                    time_data["GameNum"] = range(1, len(time_data) + 1)
-                    time_data["CumulativeWinrate"] = (
-                        time_data["Win"].cumsum() / time_data["GameNum"]
-                    )
-                    winrate_fig.add_trace(
-                        go.Scatter(
-                            x=time_data["GameNum"],
-                            y=time_data["CumulativeWinrate"],
-                            mode="lines",
-                            name=name,
-                        )
+                except Exception:
+                    pass
+
+        winrate_fig = streaks_output = no_update
+        if "trend" in parts:
+            trend_traces = {}
+            streak_items = []
+            for name in players:
+                time_data, streak = results[("trend", name)]
+                if time_data.empty:
+                    continue
+                trend_traces[name] = _trend_trace(name, time_data, trend_mode)
+                current = streak["current"]
+                streak_items.append(
+                    html.Div(
+                        [
+                            html.Span(f"{name}: ", className="fw-bold"),
+                            f"Longest win streak {streak['longest_win']} • "
+                            f"Longest loss streak {streak['longest_loss']} • ",
+                            html.Span(
+                                f"Current: {abs(current)} {'W' if current > 0 else 'L'}",
+                                className="text-success" if current > 0 else "text-danger",
+                            ),
+                        ]
                     )
-        winrate_fig.update_layout(
-            title=f"Winrate History {title_suffix}",
-            yaxis_tickformat=".0%",
-            yaxis_title="Winrate",
-            xaxis_title="Game Number",
-            legend_title="Player",
-        )
-        winrate_fig.update_traces(
-            hovertemplate="<b>Game Number: %{x}</b><br><b>Winrate: %{y: .1%}</b><extra></extra>"
-        )
-        if not winrate_fig.data:
-            winrate_fig = empty_fig
-
-        hero_options = []
-        if not main_df.empty:
-            heroes = sorted(main_df["Hero"].dropna().unique())
-            for hero in heroes:
-                hero_options.append(
-                    {
-                        "label": html.Div(
-                            [
-                                html.Img(
-                                    src=get_hero_image_url(hero),
-                                    style={
-                                        "height": "25px",
-                                        "marginRight": "10px",
-                                        "borderRadius": "50%",
-                                    },
-                                ),
-                                html.Span(hero),
-                            ],
-                            style={"display": "flex", "alignItems": "center"},
-                        ),
-                        "value": hero,
-                    }
                 )
+            trend_title = {
+                "rolling": f"Rolling Winrate (last {rolling_window(trend_window)} games)",
+                "session": "Winrate per Session",
+            }.get(trend_mode, "Winrate History")
+            trend_title = f"{trend_title} {title_suffix}"
+            trace_names["trend"] = list(trend_traces)
+            if change:
+                winrate_fig = patched_figure("trend", trend_title, trend_traces)
+            if not isinstance(winrate_fig, Patch):
+                winrate_fig = go.Figure()
+                for trace in trend_traces.values():
+                    winrate_fig.add_trace(trace)
+                winrate_fig.update_layout(
+                    title=trend_title,
+                    yaxis_tickformat=".0%",
+                    yaxis_title="Winrate",
+                    xaxis_title="Date" if trend_mode == "session" else "Game Number",
+                    legend_title="Player",
+                )
+                if not winrate_fig.data:
+                    winrate_fig = empty_fig
+            streaks_output = html.Small(streak_items, className="text-muted")
+
+        hero_options = no_update
+        if "options" in parts:
+            hero_options = []
+            if not main_df.empty:
+                hero_options = get_hero_options(sorted(main_df["Hero"].dropna().unique()))
 
         return (
             map_stat_output,
             hero_fig,
             role_fig,
             heatmap_fig,
-            stats_header,
+            stats_header if not change else no_update,
             stats_container,
             winrate_fig,
             hero_options,
+            streaks_output,
+            {**view, "traces": trace_names},
         )
+
+    @app.callback(
+        Output("winrate-over-time", "figure", allow_duplicate=True),
+        Input("winrate-over-time", "relayoutData"),
+        State("graph-traces", "data"),
+        State("session-key", "data"),
+        prevent_initial_call=True,
+    )
+    def zoom_trend(relayout, rendered, session):
+        # Only the downsampled points are sent, zooming in fetches the ones
+        # inside the new range (at full resolution once they fit the budget)
+        if not relayout or not rendered or not rendered["traces"].get("trend"):
+            raise PreventUpdate
+        x_range = _relayout_range(relayout, "xaxis")
+        if x_range is None:
+            raise PreventUpdate
+        player, season, month, year, *_, team, trend_mode, trend_window, _, dates = (
+            rendered["view"]
+        )
+        # The figure is rendered again anyway once a new data version arrives
+        if rendered["version"] != get_source(team).version:
+            raise PreventUpdate
+        dates = tuple(dates) if dates else None
+        if x_range != "auto":
+            convert = pd.Timestamp if trend_mode == "session" else float
+            x_range = [convert(x) for x in x_range]
+
+        output = Patch()
+        for i, name in enumerate(rendered["traces"]["trend"]):
+            time_data, _ = get_cached(
+                trend_key(
+                    name,
+                    season,
+                    month,
+                    year,
+                    rendered["hero_filter"],
+                    trend_mode,
+                    trend_window,
+                    dates,
+                ),
+                lambda name=name: trend_series(
+                    filter_matches(
+                        name,
+                        season,
+                        month,
+                        year,
+                        source=team,
+                        dates=dates,
+                        session=session,
+                    ),
+                    rendered["hero_filter"],
+                    trend_mode,
+                    trend_window,
+                ),
+                source=team,
+                season=season,
+            )
+            trace = _trend_trace(
+                name, time_data, trend_mode, None if x_range == "auto" else x_range
+            )
+            # Encoded like in a full figure (typed arrays instead of lists)
+            trace = go.Figure([trace]).to_dict()["data"][0]
+            for key in ["x", "y", "customdata"]:
+                if key in trace:
+                    output["data"][i][key] = trace[key]
+        for axis in ["xaxis", "yaxis"]:
+            axis_range = _relayout_range(relayout, axis)
+            if axis_range == "auto":
+                output["layout"][axis]["autorange"] = True
+            elif axis_range is not None:
+                output["layout"][axis]["range"] = axis_range
+                output["layout"][axis]["autorange"] = False
+        return output
+
@@ -1,54 +1,1720 @@
+import glob
+import hashlib
+import importlib
+import itertools
+import os
+import pickle
+import re
+import sys
+import threading
+import time
+import uuid
+import weakref
+from collections import Counter, OrderedDict
+import numpy as np
 import pandas as pd
 import requests
 from io import StringIO
 import constants
+from aggregates import period_key, precompute_period
+from model import train_model
+from storage import SQLiteStore
+from utils import (
+    build_time_index,
+    create_hero_option,
+    filter_history,
+    insert_time_index,
+    period_rows,
+    player_matches,
+)
+from validation import (
+    canonicalize,
+    exclude_dirty,
+    format_report,
+    merge_reports,
+    name_key,
+    validate,
+)
 
-df = pd.DataFrame()
+CHUNK_SIZE = getattr(constants, "chunk_size", 50_000)
 
-def load_data(use_local=True):
+# "pandas" queries the match frame, "sqlite" runs the filters and history pages
+# against a local database (the match frame is kept in memory either way)
+STORAGE_BACKEND = getattr(constants, "storage_backend", "pandas")
+
+# Closed seasons are frozen into snapshots persisted here (None = memory only)
+SNAPSHOT_DIR = getattr(constants, "snapshot_dir", "snapshots")
+# Bump when the snapshot contents change, so existing files are rebuilt
+SNAPSHOT_FORMAT = 3
+
+# After every (re)load the most requested views (at most WARMUP_VIEWS) are
+# precomputed in the background, within a time and memory budget
+WARMUP_VIEWS = getattr(constants, "warmup_views", 20)
+WARMUP_SECONDS = getattr(constants, "warmup_seconds", 10)
+WARMUP_MEMORY_MB = getattr(constants, "warmup_memory_mb", 64)
+# Views counted per source; the least requested half is forgotten beyond it
+VIEW_COUNTS_LIMIT = 1000
+
+# Filtered frames of the current view of every browser session, so sibling
+# callbacks reuse them; dropped SESSION_TTL seconds after their last use and
+# least recently used first above SESSION_MEMORY_MB (all sessions together)
+SESSION_TTL = getattr(constants, "session_ttl", 300)
+SESSION_MEMORY_MB = getattr(constants, "session_memory_mb", 256)
+
+# Results computed on request (other filters and rankings, synergy, API
+# response bodies), least recently used first evicted above
+# AGGREGATE_MEMORY_MB (all sources together). Only the precomputed tables
+# of the warm-up and the snapshots are kept with a data version.
+AGGREGATE_MEMORY_MB = getattr(constants, "aggregate_memory_mb", 128)
+
+# Date range dropdown: relative presets (value -> (label, days)) and the
+# "since patch" entries from constants.patch_dates ({name: "YYYY-MM-DD"})
+DATE_PRESETS = {
+    "last7": ("Last 7 days", 7),
+    "last30": ("Last 30 days", 30),
+    "last90": ("Last 90 days", 90),
+}
+PATCH_DATES = getattr(constants, "patch_dates", {})
+
+# Alias -> canonical spelling, applied on top of the automatic canonicalization
+HERO_ALIASES = getattr(constants, "hero_aliases", {})
+MAP_ALIASES = getattr(constants, "map_aliases", {})
+# Heroes/maps newer than the lists in validation.py
+KNOWN_HEROES = getattr(constants, "known_heroes", [])
+KNOWN_MAPS = getattr(constants, "known_maps", [])
+
+# constants.py is checked for changes this often (seconds, 0 = never) and
+# reloaded without a restart, see reload_config
+CONFIG_POLL_SECONDS = getattr(constants, "config_poll_seconds", 5)
+
+# Hero option components only depend on the asset files, so all sources share them
+_hero_options = {}
+
+# Notified whenever a source gets a new data version
+_version_changed = threading.Condition()
+
+# (session, source, version, key) -> (value, bytes, expiry), least recently
+# used first, which is also the order of expiry
+_session_cache = OrderedDict()
+_session_bytes = 0
+_session_lock = threading.Lock()
+
+# (source, scope, key) -> (value, bytes), least recently used first
+_aggregate_cache = OrderedDict()
+_aggregate_bytes = 0
+_aggregate_lock = threading.Lock()
+
+# Serializes scheduled refreshes and configuration reloads
+_reload_lock = threading.Lock()
+_refresh_thread = None
+
+# Numbers the store files of this process (see DataSource._new_store)
+_store_numbers = itertools.count(1)
+
+# Data versions of all sources, so a version is never reused in the process,
+# not even by a source that replaced another one of the same name
+_versions = itertools.count(1)
+
+
+def _normalize_chunk(chunk):
+    """
+    Cleans up column names and coerces the Attack Def, Date and Match ID
+    columns of a raw sheet or archive chunk.
+    """
+    chunk.columns = chunk.columns.str.strip()
+
+    if "Attack Def" in chunk.columns and not pd.api.types.is_numeric_dtype(
+        chunk["Attack Def"]
+    ):
+        chunk["Attack Def"] = chunk["Attack Def"].str.strip()
+    if "Date" in chunk.columns:
+        chunk["Date"] = pd.to_datetime(chunk["Date"], errors="coerce")
+    if "Match ID" in chunk.columns:
+        chunk["Match ID"] = pd.to_numeric(chunk["Match ID"], errors="coerce")
+    return chunk
+
+
+def iter_archive_chunks(path, chunksize=CHUNK_SIZE):
+    """
+    Yields normalized chunks of a CSV archive (path, URL or file object),
+    so only one chunk of raw text is parsed at a time.
+    """
+    with pd.read_csv(path, chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield _normalize_chunk(chunk)
+
+
+class DataState:
+    """
+    One data version of a source: its matches, the roster they were
+    prepared for and everything derived from them. A state is built in full
+    before it is published (one assignment to DataSource.state) and is not
+    changed afterwards, only its caches fill up, so a reader holding a state
+    never sees parts of two versions.
+    """
+
+    __slots__ = (
+        "version",
+        "previous_version",
+        "players",
+        "df",
+        "timeline",
+        "options",
+        "cache",
+        "quality",
+        "live_season",
+        "snapshots",
+        "season_fingerprints",
+        "changed_seasons",
+        "store",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"DataState.{name} is read-only, use replace()")
+
+    def replace(self, **fields):
+        """
+        Returns a copy of the state with the given fields replaced.
+        """
+        return DataState(**{**{n: getattr(self, n) for n in self.__slots__}, **fields})
+
+
+def _empty_state(players):
+    return DataState(
+        version=0,
+        previous_version=None,
+        players=list(players),
+        df=pd.DataFrame(),
+        timeline=None,
+        options={},
+        cache={},
+        quality={},
+        live_season=None,
+        snapshots={},
+        season_fingerprints={},
+        changed_seasons=None,
+        store=None,
+    )
+
+
+def _state_field(name):
+    """A read-only DataSource attribute of the current state."""
+    return property(lambda self: getattr(self.state, name))
+
+
+class DataSource:
     """
-    Loads data and performs a definitive sort by 'Match ID' descending.
-    This ensures the most recent game is always at the top.
+    A named match sheet with its own roster, archives and caches. The loaded
+    data is the current DataState; loaders build the next one aside and
+    publish it at once.
     """
-    global df
-    if use_local:
+
+    version = _state_field("version")
+    players = _state_field("players")
+    df = _state_field("df")
+    timeline = _state_field("timeline")
+    quality = _state_field("quality")
+    live_season = _state_field("live_season")
+    snapshots = _state_field("snapshots")
+    season_fingerprints = _state_field("season_fingerprints")
+    changed_seasons = _state_field("changed_seasons")
+    _options = _state_field("options")
+    _cache = _state_field("cache")
+
+    def __init__(
+        self,
+        name,
+        url,
+        players,
+        local_file="local.xlsx",
+        archives=None,
+        refresh_minutes=None,
+        store=None,
+    ):
+        self.name = name
+        self.url = url
+        self.local_file = local_file
+        self.archives = list(archives or [])
+        self.refresh_minutes = refresh_minutes
+        # The configured store, every state gets a database file of its own
+        # next to it (see _new_store)
+        self.store = store
+        self.state = _empty_state(players)
+        self.last_refresh = None
+        # Raw rows, only touched by the loaders
+        self._sheet_df = pd.DataFrame()
+        # (path, chunksize) of the imported archives, read again on a rebuild
+        self._archive_paths = []
+        # Serializes the loaders: load, ingest_archives and set_players
+        self._load_lock = threading.RLock()
+        # Guards the caches of states the warm-up thread still fills
+        self._cache_lock = threading.Lock()
+        self.view_counts = Counter()
+        self._views_lock = threading.Lock()
+        self.model = None
+        self._model_lock = threading.Lock()
+
+    def load(self, use_local=True):
+        """
+        Loads data and performs a definitive sort by 'Match ID' descending.
+        This ensures the most recent game is always at the top.
+        """
+        with self._load_lock:
+            if use_local:
+                try:
+                    self._sheet_df = pd.read_excel(self.local_file, engine="openpyxl")
+                    print(f"[{self.name}] Loaded data from {self.local_file}")
+                except Exception as e:
+                    print(f"[{self.name}] Error loading local file: {e}")
+                    self._sheet_df = pd.DataFrame()
+            else:
+                try:
+                    response = requests.get(self.url)
+                    response.raise_for_status()
+                    self._sheet_df = pd.read_csv(StringIO(response.text))
+                    self._sheet_df.to_excel(
+                        self.local_file, index=False, engine="openpyxl"
+                    )
+                    print(f"[{self.name}] Successfully downloaded and saved as Excel!")
+                except Exception as e:
+                    print(f"[{self.name}] Error downloading data: {e}")
+                self.last_refresh = time.time()
+
+            if not self._sheet_df.empty:
+                self._sheet_df = _normalize_chunk(self._sheet_df)
+            self._rebuild()
+
+    def ingest_archives(self, paths=None, chunksize=CHUNK_SIZE):
+        """
+        Streams CSV match archives (the configured ones by default) into the
+        dataset chunk by chunk. Every chunk is merged into the next state as
+        soon as it is parsed, only one raw chunk is held at a time and no
+        chunk is kept once merged. A refresh of the sheet reads the archives
+        again.
+        """
+        if paths is None:
+            paths = self.archives
+        elif isinstance(paths, str):
+            paths = [paths]
+        with self._load_lock:
+            previous = self.state
+            state, rows = previous, 0
+            for path in paths:
+                self._archive_paths.append((path, chunksize))
+                for chunk in self._read_archive(path, chunksize):
+                    rows += len(chunk)
+                    if state is not None:
+                        state = self._insert_chunk(state, previous, chunk)
+            if rows == 0:
+                return
+            print(f"[{self.name}] Imported {rows} rows from {len(paths)} archive(s).")
+            if state is None:
+                self._rebuild()
+                return
+            for line in format_report(state.quality["issues"]):
+                print(f"[{self.name}] Data quality: {line}")
+            state = state.replace(
+                version=next(_versions), previous_version=previous.version
+            )
+            self._publish(state.replace(**self._snapshot_fields(state, previous)))
+
+    def _read_archive(self, path, chunksize):
+        """
+        Yields the normalized chunks of an archive, none after an error.
+        """
+        try:
+            if hasattr(path, "seek"):
+                path.seek(0)
+            yield from iter_archive_chunks(path, chunksize)
+        except Exception as e:
+            print(f"[{self.name}] Error importing archive {path}: {e}")
+
+    def _insert_chunk(self, state, previous, chunk):
+        """
+        Returns the state with an archive chunk merged in. Only the chunk is
+        canonicalized, validated and indexed, the loaded rows keep their
+        order and are moved back in the match frame, the time index and the
+        store. Cached views of periods without a match in the chunk are
+        kept. Returns None if Match IDs of the chunk fall among the loaded
+        ones (or are missing).
+        """
+        players, df = state.players, state.df
+        if df.empty:
+            return self._prepared_state(state, chunk)
+        if (
+            state.timeline is None
+            or "Match ID" not in df.columns
+            or "Match ID" not in chunk.columns
+        ):
+            return None
+        known_maps = list(df["Map"].dropna().unique()) if "Map" in df.columns else []
+        chunk, aliases = canonicalize(
+            chunk,
+            players,
+            HERO_ALIASES,
+            MAP_ALIASES,
+            KNOWN_HEROES + state.options["heroes"].get("ALL", []),
+            KNOWN_MAPS + known_maps,
+        )
+        duplicates = chunk.duplicated()
+        dropped = int(duplicates.sum())
+        chunk = chunk[~duplicates]
+        ids = chunk["Match ID"]
+        if chunk.empty:
+            return state
+        if ids.isna().any():
+            return None
+
+        # The frame is sorted by Match ID (descending), the chunk goes where
+        # its Match IDs belong if no loaded match falls in between
+        loaded = -df["Match ID"].to_numpy(dtype=float)
+        position = int(np.searchsorted(loaded, -ids.max(), "left"))
+        if position != np.searchsorted(loaded, -ids.min(), "right"):
+            return None
+        count = len(chunk)
+        chunk = chunk.sort_values("Match ID", ascending=False)
+        chunk.index = range(position, position + count)
+
+        store = state.store
+        if store is not None:
+            if store is previous.store:
+                store = self._new_store(df, players, store)
+            try:
+                store.insert(chunk, players, position)
+            except Exception as e:
+                print(f"[{self.name}] Error writing {store.path}: {e}")
+                return None
+
+        timeline = state.timeline
+        frame = timeline["frame"]
+        labels = frame.index.to_numpy()
+        frame = frame.set_axis(np.where(labels >= position, labels + count, labels))
+        decided = int(
+            np.searchsorted(-frame["Match ID"].to_numpy(dtype=float), -ids.max(), "left")
+        )
+        timeline = insert_time_index(
+            dict(timeline, frame=frame), exclude_dirty(chunk, players), decided
+        )
+
+        quality = state.quality
+        report = validate(chunk, players, KNOWN_HEROES, KNOWN_MAPS)
+        touched = self._chunk_periods(chunk)
+        return state.replace(
+            df=pd.concat(
+                [df.iloc[:position], chunk, df.iloc[position:]], ignore_index=True
+            ),
+            timeline=timeline,
+            options=self._merge_options(state.options, chunk, players),
+            cache={
+                k: v
+                for k, v in self._cached_items(state)
+                if not self._touches(k, touched)
+            },
+            quality={
+                "rows": quality["rows"] + count,
+                "dropped_duplicates": quality["dropped_duplicates"] + dropped,
+                "aliases": {
+                    kind: {**quality["aliases"].get(kind, {}), **applied}
+                    for kind, applied in aliases.items()
+                },
+                "issues": merge_reports(quality["issues"], report),
+            },
+            store=store,
+        )
+
+    @staticmethod
+    def _chunk_periods(chunk):
+        """
+        Returns the seasons, years, months and (year, month) pairs a chunk
+        has matches in.
+        """
+        def values(col):
+            return set(chunk[col].dropna()) if col in chunk.columns else set()
+
+        years = (
+            pd.to_numeric(chunk["Year"], errors="coerce")
+            if "Year" in chunk.columns
+            else pd.Series(dtype=float)
+        )
+        months = chunk["Month"] if "Month" in chunk.columns else pd.Series(dtype=object)
+        return {
+            "season": values("Season"),
+            "year": {int(y) for y in years.dropna()},
+            "month": values("Month"),
+            "year_month": {
+                (int(y), m) for y, m in zip(years, months) if pd.notna(y)
+            },
+        }
+
+    @staticmethod
+    def _touches(key, periods):
+        """
+        Returns True if a cached view's period has a match in periods (all
+        time and date ranges always do).
+        """
+        season, month, year = key[2:5]
+        if season is not None:
+            return isinstance(season, tuple) or season in periods["season"]
+        if year is not None and month is not None:
+            return (int(year), month) in periods["year_month"]
+        if year is not None:
+            return int(year) in periods["year"]
+        if month is not None:
+            return month in periods["month"]
+        return True
+
+    def _rebuild(self):
+        """
+        Builds the match frame from the sheet, merges the imported archives
+        into it chunk by chunk and publishes a new state with everything
+        derived from it. Callers hold _load_lock.
+        """
+        previous = self.state
+        state = self._prepared_state(previous, self._sheet_df)
+        for path, chunksize in self._archive_paths:
+            for chunk in self._read_archive(path, chunksize):
+                state = self._insert_chunk(state, previous, chunk)
+                if state is None:
+                    break
+            if state is None:
+                break
+        if state is None:
+            # Archive rows fall among the loaded ones, the whole frame has to
+            # be sorted and checked for duplicates
+            frames = [self._sheet_df] + [
+                chunk
+                for path, chunksize in self._archive_paths
+                for chunk in self._read_archive(path, chunksize)
+            ]
+            frames = [f for f in frames if not f.empty]
+            combined = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            state = self._prepared_state(previous, combined)
+        for line in format_report(state.quality["issues"]):
+            print(f"[{self.name}] Data quality: {line}")
+        state = state.replace(
+            version=next(_versions), previous_version=previous.version
+        )
+        # Closed seasons are frozen from the new state's matches
+        self._publish(state.replace(**self._snapshot_fields(state, previous)))
+
+    def _prepared_state(self, state, combined):
+        """
+        Returns state with combined as its matches: canonicalized, without
+        duplicate rows, sorted by Match ID and with the time index, options,
+        quality report and store built from them. The version and snapshots
+        are left to the caller.
+        """
+        players = state.players
+        aliases, dropped = {"hero": {}, "map": {}}, 0
+        if not combined.empty:
+            combined, aliases = canonicalize(
+                combined,
+                players,
+                HERO_ALIASES,
+                MAP_ALIASES,
+                KNOWN_HEROES,
+                KNOWN_MAPS,
+            )
+            # The same match in the sheet and an archive would count twice
+            duplicates = combined.duplicated()
+            dropped = int(duplicates.sum())
+            if dropped:
+                combined = combined[~duplicates]
+                print(f"[{self.name}] Dropped {dropped} duplicate rows.")
+            if "Match ID" in combined.columns:
+                combined = combined.sort_values("Match ID", ascending=False)
+                combined.reset_index(drop=True, inplace=True)
+                print(f"[{self.name}] DataFrame sorted by Match ID (descending).")
+            else:
+                print(
+                    f"[{self.name}] Warning: 'Match ID' column not found. "
+                    "History may not be in order."
+                )
+
+        report = validate(combined, players, KNOWN_HEROES, KNOWN_MAPS)
+        return state.replace(
+            df=combined,
+            # Statistics leave out the rows the report lists as excluded
+            timeline=build_time_index(exclude_dirty(combined, players)),
+            options=self._build_options(combined, players),
+            cache={},
+            quality={
+                "rows": len(combined),
+                "dropped_duplicates": dropped,
+                "aliases": aliases,
+                "issues": report,
+            },
+            store=self._new_store(combined, players),
+        )
+
+    def _publish(self, state):
+        """
+        Makes state the current one with a single assignment, then wakes the
+        event streams and starts the warm-up and model training of the new
+        version in the background.
+        """
+        self.state = state
+        with _version_changed:
+            _version_changed.notify_all()
+        if state.df.empty:
+            return
+        if WARMUP_VIEWS and WARMUP_SECONDS:
+            threading.Thread(target=self._warm_up, args=(state,), daemon=True).start()
+        threading.Thread(target=self.win_model, daemon=True).start()
+
+    def _new_store(self, df, players, base=None, added=(), removed=()):
+        """
+        Writes the matches of a new state into a database file of its own
+        next to the configured store, so the store of the published state is
+        not touched while requests read it. The file is removed once no state
+        uses the store anymore. With a base store, a copy of it only gets the
+        roster change (added and removed players). Returns None without a
+        configured store or if writing fails.
+        """
+        if self.store is None:
+            return None
+        root = os.path.splitext(self.store.path)[0]
+        path = f"{root}.{os.getpid()}.{next(_store_numbers)}.sqlite"
         try:
-            df = pd.read_excel("local.xlsx", engine="openpyxl")
-            print("Loaded data from local.xlsx")
+            if base is None:
+                store = SQLiteStore(path)
+                store.write(df, players)
+            else:
+                store = base.copy(path)
+                store.write_players(df, added, removed)
         except Exception as e:
-            print(f"Error loading local file: {e}")
-            df = pd.DataFrame()
+            print(f"[{self.name}] Error writing {path}: {e}")
+            _remove_file(path)
+            return None
+        weakref.finalize(store, _remove_file, path)
+        return store
+
+    def win_model(self):
+        """
+        Returns the win-probability model of the current data version,
+        training it on first access. Training starts from the previous
+        version's model, which is reused as is if no match changed.
+        """
+        with self._model_lock:
+            state = self.state
+            version, timeline = state.version, state.timeline
+            df = timeline["frame"] if timeline is not None else pd.DataFrame()
+            previous = self.model
+            if previous is not None and previous["version"] == version:
+                return previous
+            if (
+                previous is not None
+                and previous["version"] == state.previous_version
+                and state.changed_seasons == []
+            ):
+                model = dict(previous, version=version)
+            else:
+                start = time.perf_counter()
+                model = train_model(df, state.players, previous)
+                model["version"] = version
+                print(
+                    f"[{self.name}] Trained win model on {model['matches']} matches "
+                    f"({len(model['labels'])} features, {model['iterations']} steps) "
+                    f"in {time.perf_counter() - start:.1f}s."
+                )
+            self.model = model
+            return model
+
+    def record_view(self, player, season=None, month=None, year=None):
+        """
+        Counts a request of a player's filter period, the warm-up after the
+        next refresh starts with the most requested ones.
+        """
+        if season:
+            month = year = None
+        with self._views_lock:
+            self.view_counts[(player, season, month, year)] += 1
+            if len(self.view_counts) > VIEW_COUNTS_LIMIT:
+                kept = self.view_counts.most_common(VIEW_COUNTS_LIMIT // 2)
+                self.view_counts = Counter(dict(kept))
+
+    def set_players(self, players):
+        """
+        Switches to a new roster without reloading the data. Only what
+        depends on the roster is rebuilt: the added players' hero spellings
+        and stored appearances, the hero options, the quality report and the
+        aggregates of the whole roster. Cached views and snapshots of the
+        players that stay are kept. Returns False if nothing changed.
+        """
+        players = list(players)
+        with self._load_lock:
+            state = self.state
+            if players == state.players:
+                return False
+            start = time.perf_counter()
+            added = [p for p in players if p not in state.players]
+            removed = [p for p in state.players if p not in players]
+            kept = set(players) - set(added)
+
+            df, timeline = state.df, state.timeline
+            aliases = state.quality.get("aliases", {"hero": {}, "map": {}})
+            applied = {}
+            if added and not df.empty:
+                df, applied = self._canonicalize_players(df, added, state.options)
+                aliases = dict(aliases, hero={**aliases["hero"], **applied})
+                if timeline is not None:
+                    # Same rows (duplicates are already gone), with the added
+                    # players' hero spellings and dirty appearances
+                    frame = df.loc[timeline["frame"].index]
+                    timeline = dict(timeline, frame=exclude_dirty(frame, players))
+            store = state.store
+            if store is not None and (added or removed):
+                store = self._new_store(df, players, store, added, removed)
+            # The added players' matches are queried from the new frame
+            new = state.replace(
+                version=next(_versions),
+                previous_version=state.version,
+                players=players,
+                df=df,
+                timeline=timeline,
+                store=store,
+            )
+
+            fingerprints = state.season_fingerprints
+            if fingerprints:
+                fingerprints = self._fingerprints(df, players)
+            snapshots, reused = {}, 0
+            for season, snapshot in state.snapshots.items():
+                matches = {p: m for p, m in snapshot["matches"].items() if p in kept}
+                if applied:
+                    # The kept players' match frames carry all players' columns
+                    matches = {
+                        p: self._respell(m, added, applied) for p, m in matches.items()
+                    }
+                cache = {
+                    k: v
+                    for k, v in snapshot["cache"].items()
+                    if _cached_player(k) in kept
+                }
+                reused += len(cache)
+                for p in added:
+                    matches[p] = self._query_matches(new, p, season)
+                    cache.update(precompute_period(matches[p], p, season))
+                snapshots[season] = {
+                    "fingerprint": fingerprints[season],
+                    "matches": matches,
+                    "cache": cache,
+                }
+                self._save_snapshot(season, snapshots[season])
+            cache = {
+                k: v for k, v in self._cached_items(state) if _cached_player(k) in kept
+            }
+            if applied:
+                # Warmed-up match frames carry the added players' columns as well
+                cache = {
+                    k: self._respell(v, added, applied)
+                    if isinstance(v, pd.DataFrame)
+                    else v
+                    for k, v in cache.items()
+                }
+
+            report = validate(df, players, KNOWN_HEROES, KNOWN_MAPS)
+            heroes = self._hero_lists(df, players, state.options.get("heroes"))
+            self._publish(
+                new.replace(
+                    options=dict(state.options, heroes=heroes),
+                    cache=cache,
+                    quality=dict(state.quality, aliases=aliases, issues=report),
+                    snapshots=snapshots,
+                    season_fingerprints=fingerprints,
+                    # Every view may show another roster
+                    changed_seasons=None,
+                )
+            )
+            print(
+                f"[{self.name}] Roster changed (+{len(added)}/-{len(removed)} "
+                f"players), kept {reused + len(cache)} cached aggregate(s), "
+                f"in {time.perf_counter() - start:.1f}s."
+            )
+        return True
+
+    @staticmethod
+    def _respell(frame, players, aliases):
+        """
+        Returns a frame with the alias spellings in the players' hero columns
+        replaced.
+        """
+        cols = [f"{p} Hero" for p in players if f"{p} Hero" in frame.columns]
+        return frame.replace({col: aliases for col in cols}) if cols else frame
+
+    def _canonicalize_players(self, df, added, options):
+        """
+        Canonicalizes the hero names of added players. Spellings of a hero
+        already in the data (the hero options) are mapped to its spelling
+        there. Returns the frame and the applied alias map.
+        """
+        hero_cols = [f"{p} Hero" for p in added if f"{p} Hero" in df.columns]
+        if not hero_cols:
+            return df, {}
+        known = {name_key(h): h for h in options.get("heroes", {}).get("ALL", [])}
+        aliases = dict(HERO_ALIASES)
+        for value in pd.unique(df[hero_cols].to_numpy().ravel()):
+            if isinstance(value, str) and value not in aliases:
+                canonical = known.get(name_key(value))
+                if canonical is not None and canonical != value:
+                    aliases[value] = canonical
+        heroes, applied = canonicalize(
+            df[hero_cols], added, aliases, known_heroes=KNOWN_HEROES
+        )
+        changed = [col for col in hero_cols if not heroes[col].equals(df[col])]
+        if changed:
+            df = df.assign(**{col: heroes[col] for col in changed})
+        return df, applied["hero"]
+
+    def _warm_views(self, state):
+        """
+        Returns the (player, season, month, year) views of a state to warm
+        up: the most requested ones first, then every player's all-time and
+        live season view. Closed seasons are already precomputed in their
+        snapshots. The counts are halved, so later warm-ups follow recent
+        requests.
+        """
+        with self._views_lock:
+            views = [view for view, _ in self.view_counts.most_common()]
+            self.view_counts = Counter(
+                {view: n // 2 for view, n in self.view_counts.items() if n > 1}
+            )
+        views += [
+            (p, season, None, None)
+            for season in [None, state.live_season]
+            for p in state.players
+        ]
+        views = [
+            view
+            for view in dict.fromkeys(views)
+            if view[0] in state.players and view[1] not in state.snapshots
+        ]
+        return views[:WARMUP_VIEWS]
+
+    def _warm_up(self, state):
+        """
+        Precomputes the filtered matches and aggregates of the most requested
+        views into the cache of a state. Stops when WARMUP_SECONDS or
+        WARMUP_MEMORY_MB are used up or a newer state was published.
+        """
+        start = time.perf_counter()
+        budget = WARMUP_MEMORY_MB * 2**20
+        cache = state.cache
+        used = warmed = 0
+        for player, season, month, year in self._warm_views(state):
+            if time.perf_counter() - start > WARMUP_SECONDS:
+                break
+            # Still warm, e.g. after a roster change
+            if period_key("matches", player, season, month, year) in cache:
+                continue
+            matches = self._query_matches(state, player, season, month, year)
+            tables = precompute_period(matches, player, season, month, year)
+            tables[period_key("matches", player, season, month, year)] = matches
+            if self.state is not state:
+                return
+            tables = {k: v for k, v in tables.items() if k not in cache}
+            size = sum(_table_bytes(v) for v in tables.values())
+            if used + size > budget:
+                break
+            with self._cache_lock:
+                cache.update(tables)
+            used += size
+            warmed += 1
+        print(
+            f"[{self.name}] Warmed up {warmed} view(s) in "
+            f"{time.perf_counter() - start:.1f}s ({used / 2**20:.1f} MB)."
+        )
+
+    def _cached_items(self, state):
+        """
+        Returns the (key, table) pairs of a state's cache as a list, taken
+        while no warm-up adds to it.
+        """
+        with self._cache_lock:
+            return list(state.cache.items())
+
+    def _snapshot_fields(self, state, previous):
+        """
+        Freezes every season of a state but the live one into a snapshot
+        holding the players' filtered matches and their precomputed
+        aggregates. A snapshot is kept across refreshes and restarts as long
+        as the rows of its season do not change. Returns the live_season,
+        snapshots, season_fingerprints and changed_seasons (since the
+        previous state, None if unknown) of the state.
+        """
+        df = state.df
+        fields = {
+            "live_season": None,
+            "snapshots": {},
+            "season_fingerprints": {},
+            "changed_seasons": None,
+        }
+        if df.empty or "Season" not in df.columns or "Match ID" not in df.columns:
+            return fields
+        ids = df["Match ID"]
+        live_season = df.loc[ids.idxmax(), "Season"] if ids.notna().any() else None
+        if pd.isna(live_season):
+            return fields
+
+        fingerprints = self._fingerprints(df, state.players)
+        snapshots, frozen = {}, []
+        for season, fingerprint in fingerprints.items():
+            if season == live_season:
+                continue
+            snapshot = previous.snapshots.get(season)
+            if snapshot is None or snapshot["fingerprint"] != fingerprint:
+                snapshot = self._load_snapshot(season, fingerprint)
+            if snapshot is None:
+                snapshot = self._freeze_season(state, season, fingerprint)
+                frozen.append(season)
+            snapshots[season] = snapshot
+        if frozen:
+            print(f"[{self.name}] Froze {len(frozen)} closed season(s).")
+        before = previous.season_fingerprints
+        return {
+            "live_season": live_season,
+            "snapshots": snapshots,
+            "season_fingerprints": fingerprints,
+            "changed_seasons": sorted(
+                (
+                    s
+                    for s in fingerprints.keys() | before.keys()
+                    if fingerprints.get(s) != before.get(s)
+                ),
+                key=str,
+            ),
+        }
+
+    @staticmethod
+    def _fingerprints(df, players):
+        """
+        Returns {season: fingerprint} of the rows of every season and the
+        roster they were frozen for.
+        """
+        # Columns of players off the roster don't show up in any view
+        off_roster = [
+            col
+            for col in df.columns
+            if col.endswith((" Hero", " Role")) and col[:-5] not in players
+        ]
+        row_hashes = pd.util.hash_pandas_object(
+            df.drop(columns=off_roster), index=False
+        ).to_numpy()
+        fingerprints = {}
+        for season, rows in df.groupby("Season").indices.items():
+            digest = hashlib.md5(row_hashes[rows].tobytes())
+            digest.update(repr((SNAPSHOT_FORMAT, players)).encode())
+            fingerprints[season] = digest.hexdigest()
+        return fingerprints
+
+    def _freeze_season(self, state, season, fingerprint):
+        matches, cache = {}, {}
+        for p in state.players:
+            matches[p] = self._query_matches(state, p, season)
+            cache.update(precompute_period(matches[p], p, season))
+        snapshot = {"fingerprint": fingerprint, "matches": matches, "cache": cache}
+        self._save_snapshot(season, snapshot)
+        return snapshot
+
+    def _snapshot_path(self, season):
+        return os.path.join(
+            SNAPSHOT_DIR, f"{_slugify(self.name)}__{_slugify(str(season))}.pkl"
+        )
+
+    def _load_snapshot(self, season, fingerprint):
+        if not SNAPSHOT_DIR:
+            return None
+        path = self._snapshot_path(season)
+        try:
+            with open(path, "rb") as f:
+                snapshot = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[{self.name}] Error reading snapshot {path}: {e}")
+            return None
+        if snapshot.get("fingerprint") != fingerprint:
+            return None
+        return snapshot
+
+    def _save_snapshot(self, season, snapshot):
+        if not SNAPSHOT_DIR:
+            return
+        path = self._snapshot_path(season)
+        try:
+            os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+            with open(f"{path}.tmp", "wb") as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(f"{path}.tmp", path)
+        except Exception as e:
+            print(f"[{self.name}] Error writing snapshot {path}: {e}")
+
+    def _build_options(self, df, players):
+        """
+        Precomputes every dropdown option list for the freshly loaded data, so
+        the option callbacks only have to look them up.
+        """
+        options = {"season": [], "month": [], "year": [], "heroes": {}}
+        if df.empty:
+            return options
+        if "Season" in df.columns:
+            options["season"] = [
+                {"label": s, "value": s}
+                for s in sorted(df["Season"].dropna().unique(), reverse=True)
+            ]
+        if "Month" in df.columns:
+            options["month"] = [
+                {"label": m, "value": m} for m in sorted(df["Month"].dropna().unique())
+            ]
+        if "Year" in df.columns:
+            options["year"] = [
+                {"label": str(int(y)), "value": int(y)}
+                for y in sorted(df["Year"].dropna().unique())
+            ]
+
+        options["heroes"] = self._hero_lists(df, players)
+        return options
+
+    def _merge_options(self, options, df, players):
+        """
+        Returns the dropdown options with those of the matches in df added.
+        """
+        added = self._build_options(df, players)
+        merged = {}
+        for name in ["season", "month", "year"]:
+            values = {o["value"]: o for o in options[name] + added[name]}
+            merged[name] = [values[v] for v in sorted(values, reverse=name == "season")]
+        merged["heroes"] = {
+            p: sorted(set(options["heroes"].get(p, [])) | set(added["heroes"].get(p, [])))
+            for p in dict.fromkeys(list(options["heroes"]) + list(added["heroes"]))
+        }
+        return merged
+
+    def _hero_lists(self, df, players, previous=None):
+        """
+        Returns {player: sorted heroes played} of the players and "ALL" for
+        the whole roster. Lists of players in previous are reused as they are.
+        """
+        previous = previous or {}
+        lists, all_heroes = {}, set()
+        for p in players:
+            if p in previous:
+                lists[p] = previous[p]
+            else:
+                hero_col = f"{p} Hero"
+                if hero_col not in df.columns:
+                    continue
+                lists[p] = sorted(
+                    df[hero_col][
+                        df[hero_col].notna() & (df[hero_col] != "not present")
+                    ].unique()
+                )
+            all_heroes.update(lists[p])
+        lists["ALL"] = sorted(all_heroes)
+
+        # filter_data strips hero names, so label the stripped spelling as well
+        labelled = all_heroes | {h.strip() for h in all_heroes if isinstance(h, str)}
+        for hero in labelled - _hero_options.keys():
+            _hero_options[hero] = create_hero_option(hero)
+        return lists
+
+    def _cache_for(self, state, season):
+        """
+        Returns the precomputed tables of a view (those of its snapshot for a
+        closed season) and the scope of its on-request aggregates: the data
+        version, or the snapshot's fingerprint, which outlives refreshes that
+        left the season alone.
+        """
+        snapshot = state.snapshots.get(season)
+        if snapshot is None:
+            return state.cache, state.version
+        return snapshot["cache"], snapshot["fingerprint"]
+
+    def get_cached(self, key, builder, season=None, state=None):
+        """
+        Returns the aggregate cached under key for a state (the current one
+        by default). Precomputed tables are served as they are, anything
+        else is computed by builder() on first access and kept in the
+        memory-bounded cache of on-request results.
+        """
+        tables, scope = self._cache_for(state or self.state, season)
+        if key in tables:
+            return tables[key]
+        return _lru_cached((self.name, scope) + tuple(key), builder)
+
+    def get_response(self, key, builder, state=None):
+        """
+        Returns the API response body cached under key for a state (the
+        current one by default), calling builder() on first access. Bodies
+        are kept in the memory-bounded cache of on-request results.
+        """
+        state = state or self.state
+        return _lru_cached((self.name, state.version) + tuple(key), builder)
+
+    def filter_matches(
+        self, player, season=None, month=None, year=None, dates=None, state=None
+    ):
+        """
+        Returns the player's decided matches for the given filters, one row
+        per match with the player's Hero and Role. A (start, end) date range
+        overrides season, month and year.
+        """
+        state = state or self.state
+        snapshot = None if dates else state.snapshots.get(season)
+        if snapshot is not None:
+            return snapshot["matches"].get(player, pd.DataFrame())
+        # Views warmed up after a refresh keep their filtered matches
+        warmed = state.cache.get(
+            period_key("matches", player, season, month, year, dates=dates)
+        )
+        if warmed is not None:
+            return warmed
+        return self._query_matches(state, player, season, month, year, dates)
+
+    def _query_matches(
+        self, state, player, season=None, month=None, year=None, dates=None
+    ):
+        if state.store is not None:
+            return state.store.filter_data(player, season, month, year, dates)
+        return player_matches(
+            self.period_matches(season, month, year, dates, state), player
+        )
+
+    def period_matches(
+        self, season=None, month=None, year=None, dates=None, state=None
+    ):
+        """
+        Returns the decided matches of a period (all players). The rows come
+        from the time index as a slice wherever possible, no column is scanned.
+        """
+        timeline = (state or self.state).timeline
+        if timeline is None:
+            return pd.DataFrame()
+        rows = period_rows(timeline, season, month, year, dates)
+        return timeline["frame"].iloc[rows]
+
+    def history_page(self, player=None, hero=None, count=10, offset=0, state=None):
+        """
+        Returns count matches of the match history tab, most recent first,
+        skipping the first offset matches.
+        """
+        state = state or self.state
+        if state.store is not None:
+            return state.store.history_page(
+                state.players, player, hero, limit=count, offset=offset
+            )
+        history = filter_history(state.df, state.players, player, hero)
+        return history.iloc[offset : offset + count]
+
+    def iter_history(self, player=None, hero=None, chunksize=CHUNK_SIZE):
+        """
+        Yields the filtered match history in chunks of chunksize matches, in
+        the order of the match history tab, all from the same state.
+        """
+        state = self.state
+        if state.store is not None:
+            offset = 0
+            while True:
+                chunk = state.store.history_page(
+                    state.players, player, hero, limit=chunksize, offset=offset
+                )
+                if chunk.empty:
+                    return
+                yield chunk
+                offset += chunksize
+        history = filter_history(state.df, state.players, player, hero)
+        for start in range(0, len(history), chunksize):
+            yield history.iloc[start : start + chunksize]
+
+    def peek_cached(self, key, season=None, state=None):
+        """
+        Returns the aggregate cached under key for a state (the current one
+        by default), None if it has not been computed yet.
+        """
+        tables, scope = self._cache_for(state or self.state, season)
+        if key in tables:
+            return tables[key]
+        return _lru_peek((self.name, scope) + tuple(key))
+
+    def refresh_due(self, now):
+        """
+        Returns True if the source has a refresh schedule that has elapsed.
+        """
+        if not self.refresh_minutes:
+            return False
+        if self.last_refresh is None:
+            return True
+        return now - self.last_refresh >= self.refresh_minutes * 60
+
+
+def _table_bytes(value):
+    """
+    Approximate memory footprint of a cached aggregate in bytes.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        # Not deep: the strings are shared with the full match frame
+        return int(np.sum(value.memory_usage()))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_table_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_table_bytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def _lru_cached(key, builder):
+    """
+    Returns the value cached under key in the on-request cache, calling
+    builder() on first access. Least recently used values are evicted once
+    the cache exceeds AGGREGATE_MEMORY_MB.
+    """
+    global _aggregate_bytes
+    value = _lru_peek(key)
+    if value is not None:
+        return value
+    value = builder()
+    size = _table_bytes(value)
+    with _aggregate_lock:
+        if key not in _aggregate_cache:
+            _aggregate_cache[key] = (value, size)
+            _aggregate_bytes += size
+        limit = AGGREGATE_MEMORY_MB * 2**20
+        while _aggregate_bytes > limit and _aggregate_cache:
+            _, (_, evicted) = _aggregate_cache.popitem(last=False)
+            _aggregate_bytes -= evicted
+    return value
+
+
+def _lru_peek(key):
+    """
+    Returns the value cached under key in the on-request cache, None if
+    there is none.
+    """
+    with _aggregate_lock:
+        entry = _aggregate_cache.get(key)
+        if entry is None:
+            return None
+        _aggregate_cache.move_to_end(key)
+        return entry[0]
+
+
+def _cached_player(key):
+    """
+    Returns the player a cached aggregate belongs to, None if it covers the
+    whole roster (compositions, co-occurrence).
+    """
+    if key[0] in ("compositions", "co_occurrence"):
+        return None
+    return key[1]
+
+
+def _slugify(name):
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+def _source_configs():
+    """
+    Returns {name: DataSource arguments} of constants.sources, falling back
+    to the single constants.url / constants.players sheet.
+    """
+    configured = getattr(constants, "sources", None)
+    if not configured:
+        return {
+            "default": {
+                "url": constants.url,
+                "players": constants.players,
+                "local_file": "local.xlsx",
+                "archives": getattr(constants, "archives", []),
+                "refresh_minutes": getattr(constants, "refresh_minutes", None),
+            }
+        }
+    return {
+        name: {
+            "url": cfg["url"],
+            "players": cfg["players"],
+            "local_file": cfg.get("local_file", f"local_{_slugify(name)}.xlsx"),
+            "archives": cfg.get("archives", []),
+            "refresh_minutes": cfg.get("refresh_minutes"),
+        }
+        for name, cfg in configured.items()
+    }
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _process_running(pid):
+    if os.name != "posix":
+        # No harmless check elsewhere, the files are kept
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _remove_stale_stores(path):
+    """
+    Removes the per-state database files next to a store path (see
+    DataSource._new_store) that processes no longer running left behind.
+    """
+    root = os.path.splitext(path)[0]
+    for stale in glob.glob(f"{glob.escape(root)}.*.*.sqlite"):
+        pid = stale[len(root) + 1 :].split(".")[0]
+        if pid.isdigit() and not _process_running(int(pid)):
+            _remove_file(stale)
+
+
+def _make_source(name, config):
+    store = None
+    if STORAGE_BACKEND == "sqlite":
+        store = SQLiteStore(os.path.splitext(config["local_file"])[0] + ".sqlite")
+        _remove_stale_stores(store.path)
+    return DataSource(name, store=store, **config)
+
+
+def _configure_sources():
+    """
+    Builds the data sources from constants.py.
+    """
+    return {name: _make_source(name, cfg) for name, cfg in _source_configs().items()}
+
+
+_sources = _configure_sources()
+
+
+def get_source(source=None):
+    """
+    Returns the named data source, or the first configured one.
+    """
+    if source in _sources:
+        return _sources[source]
+    return next(iter(_sources.values()))
+
+
+def get_source_names():
+    """
+    Returns the names of all configured data sources.
+    """
+    return list(_sources)
+
+
+def load_data(use_local=True, source=None):
+    """
+    Loads one data source, or all of them if none is given.
+    """
+    targets = [get_source(source)] if source else list(_sources.values())
+    for target in targets:
+        target.load(use_local)
+
+
+def ingest_archives(paths=None, chunksize=CHUNK_SIZE, source=None):
+    """
+    Streams CSV archives into a data source. Without paths, every source
+    imports its configured archives.
+    """
+    if paths is None and source is None:
+        for target in _sources.values():
+            target.ingest_archives(chunksize=chunksize)
     else:
+        get_source(source).ingest_archives(paths, chunksize)
+
+
+def _refresh_loop(interval):
+    while True:
+        time.sleep(interval)
+        now = time.time()
+        for target in list(_sources.values()):
+            if target.refresh_due(now):
+                with _reload_lock:
+                    target.load(use_local=False)
+
+
+def start_refresh_scheduler(interval=60):
+    """
+    Starts a background thread that reloads every source whose
+    refresh_minutes have elapsed. Does nothing if no source has a schedule.
+    """
+    global _refresh_thread
+    if not any(s.refresh_minutes for s in _sources.values()):
+        return None
+    now = time.time()
+    for target in _sources.values():
+        if target.last_refresh is None:
+            target.last_refresh = now
+    if _refresh_thread is None:
+        _refresh_thread = threading.Thread(
+            target=_refresh_loop, args=(interval,), daemon=True
+        )
+        _refresh_thread.start()
+    return _refresh_thread
+
+
+def _reload_settings():
+    """
+    Re-reads the settings that apply without a restart. The storage
+    backend, snapshot directory, chunk size and aggregation settings are
+    only read at startup.
+    """
+    global WARMUP_VIEWS, WARMUP_SECONDS, WARMUP_MEMORY_MB
+    global SESSION_TTL, SESSION_MEMORY_MB, AGGREGATE_MEMORY_MB, PATCH_DATES
+    global HERO_ALIASES, MAP_ALIASES, KNOWN_HEROES, KNOWN_MAPS
+    WARMUP_VIEWS = getattr(constants, "warmup_views", 20)
+    WARMUP_SECONDS = getattr(constants, "warmup_seconds", 10)
+    WARMUP_MEMORY_MB = getattr(constants, "warmup_memory_mb", 64)
+    SESSION_TTL = getattr(constants, "session_ttl", 300)
+    SESSION_MEMORY_MB = getattr(constants, "session_memory_mb", 256)
+    AGGREGATE_MEMORY_MB = getattr(constants, "aggregate_memory_mb", 128)
+    PATCH_DATES = getattr(constants, "patch_dates", {})
+    HERO_ALIASES = getattr(constants, "hero_aliases", {})
+    MAP_ALIASES = getattr(constants, "map_aliases", {})
+    KNOWN_HEROES = getattr(constants, "known_heroes", [])
+    KNOWN_MAPS = getattr(constants, "known_maps", [])
+
+
+def reload_config():
+    """
+    Re-reads constants.py and applies it to the running process. A changed
+    roster is swapped in with DataSource.set_players, keeping the warm
+    caches of everything else; urls, archives and refresh schedules apply
+    from the next load. Sources are added (loaded from their local file)
+    or removed. Returns the names of the sources with a new data version.
+    """
+    global _sources
+    with _reload_lock:
         try:
-            response = requests.get(constants.url)
-            response.raise_for_status()
-            df = pd.read_csv(StringIO(response.text))
-            df.to_excel("local.xlsx", index=False, engine="openpyxl")
-            print("Successfully downloaded and saved as Excel!")
+            importlib.reload(constants)
+            configs = _source_configs()
         except Exception as e:
-            print(f"Error downloading data: {e}")
-            if "df" not in globals():
-                df = pd.DataFrame()
+            print(f"Error reloading constants.py, keeping the old configuration: {e}")
+            return []
+        _reload_settings()
+        sources, changed = {}, []
+        for name, cfg in configs.items():
+            target = _sources.get(name)
+            if target is None or target.local_file != cfg["local_file"]:
+                target = _make_source(name, cfg)
+                target.load(use_local=True)
+                target.ingest_archives()
+                target.last_refresh = time.time()
+                changed.append(name)
+            else:
+                target.url = cfg["url"]
+                target.refresh_minutes = cfg["refresh_minutes"]
+                # Archives already imported stay until the next restart
+                new_archives = [a for a in cfg["archives"] if a not in target.archives]
+                target.archives = list(cfg["archives"])
+                if target.set_players(cfg["players"]):
+                    changed.append(name)
+                if new_archives:
+                    target.ingest_archives(new_archives)
+                    changed.append(name)
+            sources[name] = target
+        removed = [name for name in _sources if name not in sources]
+        _sources = sources
+    with _version_changed:
+        _version_changed.notify_all()
+    start_refresh_scheduler()
+    print(
+        f"Reloaded constants.py: {len(sources)} source(s), "
+        f"changed: {', '.join(dict.fromkeys(changed)) or 'none'}, "
+        f"removed: {', '.join(removed) or 'none'}."
+    )
+    return list(dict.fromkeys(changed))
+
+
+def _config_watch_loop(path, interval):
+    mtime = os.path.getmtime(path)
+    while True:
+        time.sleep(interval)
+        try:
+            current = os.path.getmtime(path)
+        except OSError:
+            continue
+        if current != mtime:
+            mtime = current
+            reload_config()
+
+
+def start_config_watcher(interval=None):
+    """
+    Starts a background thread that calls reload_config whenever
+    constants.py changes. Every worker process watches the file itself, so
+    none of them has to be restarted.
+    """
+    interval = CONFIG_POLL_SECONDS if interval is None else interval
+    path = getattr(constants, "__file__", None)
+    if not interval or not path:
+        return None
+    thread = threading.Thread(
+        target=_config_watch_loop, args=(path, interval), daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def get_data_version(source=None):
+    """
+    Returns the data version of a source. Versions are drawn from one
+    counter of the process, so they only grow, even when reload_config
+    replaces a source.
+    """
+    return get_source(source).version
+
 
-    if not df.empty:
-        df.columns = df.columns.str.strip()
+def get_data_versions():
+    """
+    Returns the current {source: data version} of all sources.
+    """
+    return {name: s.version for name, s in _sources.items()}
+
+
+def wait_for_new_version(versions, timeout=None):
+    """
+    Blocks until a source has another data version than in versions (as
+    returned by get_data_versions) or the timeout is over. Returns the
+    current versions.
+    """
+    with _version_changed:
+        _version_changed.wait_for(lambda: get_data_versions() != versions, timeout)
+    return get_data_versions()
+
+
+def get_update_event(source=None):
+    """
+    Returns the data version of a source, the version it followed and the
+    seasons whose matches changed since then (None if every view may have
+    changed).
+    """
+    target = get_source(source)
+    state = target.state
+    return {
+        "team": target.name,
+        "version": state.version,
+        "previous": state.previous_version,
+        "seasons": state.changed_seasons,
+    }
+
+
+def record_view(player, season=None, month=None, year=None, source=None):
+    """
+    Counts a request of a player's filter period for the cache warm-up.
+    """
+    get_source(source).record_view(player, season, month, year)
 
-        if "Attack Def" in df.columns:
-            df["Attack Def"] = df["Attack Def"].str.strip()
-        if "Date" in df.columns:
-            df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
 
-        if "Match ID" in df.columns:
-            df["Match ID"] = pd.to_numeric(df["Match ID"], errors="coerce")
-            df.sort_values("Match ID", ascending=False, inplace=True)
-            df.reset_index(drop=True, inplace=True)
-            print("DataFrame sorted by Match ID (descending).")
-        else:
-            print("Warning: 'Match ID' column not found. History may not be in order.")
+def new_session_key():
+    """
+    Returns a fresh key for the session cache of a browser session.
+    """
+    return uuid.uuid4().hex
+
+
+def _evict_sessions(now):
+    global _session_bytes
+    limit = SESSION_MEMORY_MB * 1024 * 1024
+    while _session_cache:
+        _, (_, size, expiry) = next(iter(_session_cache.items()))
+        if expiry > now and _session_bytes <= limit:
+            return
+        _session_cache.popitem(last=False)
+        _session_bytes -= size
+
+
+def get_session_cached(session, key, builder, source=None):
+    """
+    Returns the frame a callback of the same browser session cached under
+    key for the current data version of a source, calling builder(state)
+    with that version's state on first access. Without a session key
+    nothing is cached.
+    """
+    global _session_bytes
+    target = get_source(source)
+    state = target.state
+    if not session:
+        return builder(state)
+    full_key = (session, target.name, state.version) + tuple(key)
+    now = time.monotonic()
+    with _session_lock:
+        entry = _session_cache.pop(full_key, None)
+        if entry is not None:
+            _session_cache[full_key] = (entry[0], entry[1], now + SESSION_TTL)
+            _evict_sessions(now)
+            return entry[0]
+    value = builder(state)
+    size = _table_bytes(value)
+    with _session_lock:
+        if full_key not in _session_cache:
+            _session_cache[full_key] = (value, size, now + SESSION_TTL)
+            _session_bytes += size
+        _evict_sessions(now)
+    return value
+
+
+def get_win_model(source=None):
+    """
+    Returns the win-probability model of the current data version of a source.
+    """
+    return get_source(source).win_model()
+
+
+def get_players(source=None):
+    """
+    Returns the roster of a data source.
+    """
+    return get_source(source).players
+
+
+def get_cached(key, builder, source=None, season=None):
+    """
+    Returns the aggregate cached under key for the current data version of
+    a source, calling builder() to compute it on first access. Pass the
+    season of season-filtered aggregates, so closed seasons keep them.
+    """
+    return get_source(source).get_cached(key, builder, season)
+
+
+def peek_cached(key, source=None, season=None):
+    """
+    Returns the aggregate cached under key for a source, None if it has not
+    been computed yet.
+    """
+    return get_source(source).peek_cached(key, season)
+
+
+def get_filter_options(source=None):
+    """
+    Returns the precomputed season, month and year dropdown options.
+    """
+    options = get_source(source)._options
+    return options.get("season", []), options.get("month", []), options.get("year", [])
+
+
+def get_player_heroes(player, source=None):
+    """
+    Returns the sorted heroes a player has played ("ALL" for the whole roster).
+    """
+    return get_source(source)._options.get("heroes", {}).get(player, [])
+
+
+def get_hero_options(heroes):
+    """
+    Returns the precomputed dropdown options (portrait + name) for the given heroes.
+    """
+    return [
+        _hero_options[h] if h in _hero_options else create_hero_option(h)
+        for h in heroes
+    ]
+
+
+def filter_matches(
+    player, season=None, month=None, year=None, source=None, dates=None, session=None
+):
+    """
+    Returns a player's filtered matches from the active storage backend,
+    shared by the callbacks of a session.
+    """
+    target = get_source(source)
+    return get_session_cached(
+        session,
+        period_key("matches", player, season, month, year, dates=dates),
+        lambda state: target.filter_matches(
+            player, season, month, year, dates, state=state
+        ),
+        source,
+    )
+
+
+def get_period_matches(
+    season=None, month=None, year=None, dates=None, source=None, session=None
+):
+    """
+    Returns the decided matches of a period of a source, for all players.
+    """
+    target = get_source(source)
+    return get_session_cached(
+        session,
+        period_key("period", None, season, month, year, dates=dates),
+        lambda state: target.period_matches(season, month, year, dates, state),
+        source,
+    )
+
+
+def get_date_range_options():
+    """
+    Returns the options of the date range dropdown.
+    """
+    options = [
+        {"label": label, "value": value} for value, (label, _) in DATE_PRESETS.items()
+    ]
+    options += [
+        {"label": f"Since {name}", "value": f"patch:{name}"} for name in PATCH_DATES
+    ]
+    options.append({"label": "Custom range", "value": "custom"})
+    return options
+
+
+def resolve_date_range(preset, start=None, end=None):
+    """
+    Returns the (start, end) ISO days of a date range dropdown value (either
+    may be None for an open end), or None if no range is selected.
+    """
+    if preset in DATE_PRESETS:
+        today = pd.Timestamp.now().normalize()
+        first = today - pd.Timedelta(days=DATE_PRESETS[preset][1] - 1)
+        return first.date().isoformat(), today.date().isoformat()
+    if preset and preset.startswith("patch:") and preset[6:] in PATCH_DATES:
+        return pd.Timestamp(PATCH_DATES[preset[6:]]).date().isoformat(), None
+    if preset == "custom" and (start or end):
+        return (start[:10] if start else None), (end[:10] if end else None)
+    return None
+
+
+def get_history_page(player=None, hero=None, count=10, source=None, session=None):
+    """
+    Returns the first count matches of the filtered match history. The
+    filtered history is kept for the session, so "load more" only slices it.
+    """
+    target = get_source(source)
+    if not session or target.state.store is not None:
+        return target.history_page(player, hero, count)
+    history = get_session_cached(
+        session,
+        ("history", player, hero),
+        lambda state: filter_history(state.df, state.players, player, hero),
+        source,
+    )
+    return history.iloc[:count]
+
+
+def iter_history(player=None, hero=None, chunksize=CHUNK_SIZE, source=None):
+    """
+    Yields the filtered match history of a source in chunks.
+    """
+    return get_source(source).iter_history(player, hero, chunksize)
+
+
+def get_quality_report(source=None):
+    """
+    Returns the data-quality report of the last load of a source.
+    """
+    return get_source(source).quality
+
 
-def get_data():
+def get_data(source=None):
     """
     Returns the loaded dataframe.
     """
-    global df
-    return df
+    return get_source(source).df
@@ -0,0 +1,80 @@
+import io
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional, without it Parquet is not offered
+    pa = pq = None
+
+# Dataset value -> label of the export dropdown
+EXPORT_DATASETS = {
+    "Hero": "Hero Winrates",
+    "Role": "Role Winrates",
+    "Map": "Map Winrates",
+    "Gamemode": "Gamemode Winrates",
+    "Attack Def": "Attack/Defense Winrates",
+    "heatmap": "Role x Map Heatmap",
+    "history": "Match History",
+}
+
+
+def get_export_formats():
+    """
+    Returns the dropdown options of the available export formats.
+    """
+    formats = [{"label": "CSV", "value": "csv"}, {"label": "Excel", "value": "xlsx"}]
+    if pq is not None:
+        formats.append({"label": "Parquet", "value": "parquet"})
+    return formats
+
+
+def csv_chunks(chunks):
+    """
+    Yields the CSV text of each frame, with the header only in the first one.
+    """
+    for i, chunk in enumerate(chunks):
+        yield chunk.to_csv(index=False, header=i == 0)
+
+
+def write_export(chunks, fmt, sheet_name="Export"):
+    """
+    Writes the frames one after another into a single CSV, Excel or Parquet
+    file and returns its bytes. Only one chunk is converted at a time.
+    """
+    buffer = io.BytesIO()
+    if fmt == "xlsx":
+        with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+            startrow = 0
+            for chunk in chunks:
+                chunk.to_excel(
+                    writer,
+                    sheet_name=sheet_name,
+                    index=False,
+                    header=startrow == 0,
+                    startrow=startrow,
+                )
+                startrow += len(chunk) + (startrow == 0)
+            if startrow == 0:
+                pd.DataFrame().to_excel(writer, sheet_name=sheet_name)
+    elif fmt == "parquet":
+        if pq is None:
+            raise ValueError("Parquet export requires pyarrow")
+        sink = pa.BufferOutputStream()
+        writer = None
+        for chunk in chunks:
+            if writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                writer = pq.ParquetWriter(sink, table.schema)
+            else:
+                table = pa.Table.from_pandas(
+                    chunk, schema=writer.schema, preserve_index=False
+                )
+            writer.write_table(table)
+        if writer is not None:
+            writer.close()
+        return sink.getvalue().to_pybytes()
+    else:
+        for text in csv_chunks(chunks):
+            buffer.write(text.encode("utf-8"))
+    return buffer.getvalue()
@@ -1,11 +1,17 @@
 import dash_bootstrap_components as dbc
 from dash import dcc, html
-import constants
 import re
 from utils import get_map_image_url, get_hero_image_url
+from data import (
+    get_date_range_options,
+    get_players,
+    get_source_names,
+    new_session_key,
+)
+from export import EXPORT_DATASETS, get_export_formats
 import pandas as pd
 
-def generate_history_layout_simple(games_df):
+def generate_history_layout_simple(games_df, players):
     if games_df.empty:
         return [dbc.Alert("No match history available.", color="info")]
 
@@ -30,7 +36,7 @@ def generate_history_layout_simple(games_df):
         map_name = game.get("Map", "Unknown Map")
         gamemode = game.get("Gamemode", "")
         att_def = game.get("Attack Def")
-        map_image_url = get_map_image_url(map_name)
+        map_image_url = get_map_image_url(map_name, "banner")
         date_str = (
             game["Date"].strftime("%d.%m.%Y")
             if pd.notna(game.get("Date"))
@@ -48,11 +54,11 @@ def generate_history_layout_simple(games_df):
        
         # --- REVISED PLAYER LIST SECTION ---
         player_list_items = []
-        for p in constants.players:
+        for p in players:
             hero = game.get(f"{p} Hero")
             if pd.notna(hero) and hero != "not present":
                 role = game.get(f"{p} Role", "N/A")
-                hero_image_url = get_hero_image_url(hero)
+                hero_image_url = get_hero_image_url(hero, "avatar")
 
                 player_list_items.append(
                     dbc.ListGroupItem(
@@ -150,9 +156,19 @@ def generate_history_layout_simple(games_df):
 
 
 def get_layout():
+    players = get_players()
+    sources = get_source_names()
     return dbc.Container(
     [
         dcc.Store(id="history-display-count-store", data={"count": 10}),
+        # Key of this page's filtered frames in the server-side session cache
+        dcc.Store(id="session-key", data=new_session_key()),
+        # Filters and trace names behind the current graphs, for patching them
+        dcc.Store(id="graph-traces"),
+        # Data versions pushed by /api/events (see assets/live_updates.js)
+        dcc.Store(id="data-event"),
+        # Bumped for a new version that left the selected season unchanged
+        dcc.Store(id="live-refresh"),
         dbc.Row(
             [
                 dbc.Col(
@@ -176,6 +192,8 @@ def get_layout():
             align="center",
             className="mb-3",
         ),
+        # Data-quality issues of the selected team's data, if any
+        html.Div(id="data-quality-alert"),
         dbc.Row(
             [
                 dbc.Col(
@@ -187,14 +205,34 @@ def get_layout():
                                 ),
                                 dbc.CardBody(
                                     [
+                                        html.Div(
+                                            [
+                                                dbc.Label("Select Team:"),
+                                                dcc.Dropdown(
+                                                    id="team-dropdown",
+                                                    options=[
+                                                        {"label": t, "value": t}
+                                                        for t in sources
+                                                    ],
+                                                    value=sources[0],
+                                                    clearable=False,
+                                                    className="mb-3",
+                                                ),
+                                            ],
+                                            style=(
+                                                None
+                                                if len(sources) > 1
+                                                else {"display": "none"}
+                                            ),
+                                        ),
                                         dbc.Label("Select Player:"),
                                         dcc.Dropdown(
                                             id="player-dropdown",
                                             options=[
                                                 {"label": p, "value": p}
-                                                for p in constants.players
+                                                for p in players
                                             ],
-                                            value=constants.players[0],
+                                            value=players[0],
                                             clearable=False,
                                             className="mb-3",
                                         ),
@@ -221,6 +259,26 @@ def get_layout():
                                             className="mb-3",
                                             clearable=True,
                                         ),
+                                        dbc.Label(
+                                            "Date range (overwrites Season/Year/Month):"
+                                        ),
+                                        dcc.Dropdown(
+                                            id="date-range-dropdown",
+                                            options=get_date_range_options(),
+                                            placeholder="(not selected)",
+                                            className="mb-3",
+                                            clearable=True,
+                                        ),
+                                        html.Div(
+                                            dcc.DatePickerRange(
+                                                id="date-range-picker",
+                                                display_format="DD.MM.YYYY",
+                                                clearable=True,
+                                                className="mb-3",
+                                            ),
+                                            id="date-range-picker-container",
+                                            style={"display": "none"},
+                                        ),
                                         dbc.Label("Minimum number of games:"),
                                         dcc.Slider(
                                             id="min-games-slider",
@@ -245,6 +303,12 @@ def get_layout():
                                             className="text-muted",
                                             style={"fontSize": "0.85em"},
                                         ),
+                                        dbc.Switch(
+                                            id="rank-by-confidence",
+                                            label="Rank by confidence (Wilson lower bound)",
+                                            value=False,
+                                            className="mt-2",
+                                        ),
                                         html.Hr(),
                                         html.Div(
                                             id="compare-switches-container",
@@ -254,7 +318,47 @@ def get_layout():
                                 ),
                             ],
                             className="mb-4",
-                        )
+                        ),
+                        dbc.Card(
+                            [
+                                dbc.CardHeader(
+                                    "Export", className="bg-primary text-white"
+                                ),
+                                dbc.CardBody(
+                                    [
+                                        dcc.Dropdown(
+                                            id="export-dataset",
+                                            options=[
+                                                {"label": label, "value": value}
+                                                for value, label in EXPORT_DATASETS.items()
+                                            ],
+                                            value="Hero",
+                                            clearable=False,
+                                            className="mb-2",
+                                        ),
+                                        dbc.RadioItems(
+                                            id="export-format",
+                                            options=get_export_formats(),
+                                            value="csv",
+                                            inline=True,
+                                            className="mb-2",
+                                        ),
+                                        dbc.Button(
+                                            "Download",
+                                            id="export-button",
+                                            color="secondary",
+                                            className="w-100",
+                                        ),
+                                        html.Small(
+                                            "Uses the filters above, Match History uses the filters of its tab.",
+                                            className="text-muted",
+                                        ),
+                                        dcc.Download(id="export-download"),
+                                    ]
+                                ),
+                            ],
+                            className="mb-4",
+                        ),
                     ],
                     width=3,
                 ),
@@ -378,13 +482,145 @@ def get_layout():
                                     label="Winrate History",
                                     tab_id="tab-trend",
                                     children=[
-                                        dbc.Label("Filter Hero (optional):"),
-                                        dcc.Dropdown(
-                                            id="hero-filter-dropdown",
-                                            placeholder="No hero selected",
-                                            className="mb-3",
+                                        dbc.Row(
+                                            [
+                                                dbc.Col(
+                                                    [
+                                                        dbc.Label(
+                                                            "Filter Hero (optional):"
+                                                        ),
+                                                        dcc.Dropdown(
+                                                            id="hero-filter-dropdown",
+                                                            placeholder="No hero selected",
+                                                            className="mb-3",
+                                                        ),
+                                                    ],
+                                                    width=6,
+                                                ),
+                                                dbc.Col(
+                                                    [
+                                                        dbc.Label("Show:"),
+                                                        dcc.Dropdown(
+                                                            id="trend-mode",
+                                                            value="cumulative",
+                                                            clearable=False,
+                                                            className="mb-3",
+                                                            options=[
+                                                                {
+                                                                    "label": "Cumulative Winrate",
+                                                                    "value": "cumulative",
+                                                                },
+                                                                {
+                                                                    "label": "Rolling Winrate",
+                                                                    "value": "rolling",
+                                                                },
+                                                                {
+                                                                    "label": "Winrate per Session",
+                                                                    "value": "session",
+                                                                },
+                                                            ],
+                                                        ),
+                                                    ],
+                                                    width=3,
+                                                ),
+                                                dbc.Col(
+                                                    [
+                                                        dbc.Label("Last N Games:"),
+                                                        dbc.Input(
+                                                            id="trend-window",
+                                                            type="number",
+                                                            min=2,
+                                                            step=1,
+                                                            value=20,
+                                                            className="mb-3",
+                                                        ),
+                                                    ],
+                                                    id="trend-window-container",
+                                                    width=3,
+                                                ),
+                                            ]
                                         ),
                                         dcc.Graph(id="winrate-over-time"),
+                                        html.Div(id="trend-streaks", className="mt-2"),
+                                    ],
+                                ),
+                                dbc.Tab(
+                                    label="Synergy",
+                                    tab_id="tab-synergy",
+                                    children=[
+                                        dbc.Row(
+                                            [
+                                                dbc.Col(
+                                                    dcc.Dropdown(
+                                                        id="synergy-view",
+                                                        value="duo",
+                                                        clearable=False,
+                                                        style={
+                                                            "width": "100%",
+                                                            "margin-bottom": "20px",
+                                                        },
+                                                        options=[
+                                                            {
+                                                                "label": "Hero Duos",
+                                                                "value": "duo",
+                                                            },
+                                                            {
+                                                                "label": "Team Compositions",
+                                                                "value": "composition",
+                                                            },
+                                                        ],
+                                                    ),
+                                                    width=4,
+                                                ),
+                                                dbc.Col(
+                                                    dcc.Dropdown(
+                                                        id="synergy-partner-dropdown",
+                                                        placeholder="Select teammate",
+                                                        clearable=False,
+                                                        style={
+                                                            "width": "100%",
+                                                            "margin-bottom": "20px",
+                                                        },
+                                                    ),
+                                                    width=4,
+                                                ),
+                                            ]
+                                        ),
+                                        html.Div(id="synergy-container"),
+                                    ],
+                                ),
+                                dbc.Tab(
+                                    label="Win Probability",
+                                    tab_id="tab-whatif",
+                                    children=[
+                                        dbc.Row(
+                                            [
+                                                dbc.Col(
+                                                    [
+                                                        dbc.Label("Map:"),
+                                                        dcc.Dropdown(
+                                                            id="whatif-map",
+                                                            placeholder="Any map",
+                                                            className="mb-3",
+                                                        ),
+                                                    ],
+                                                    width=4,
+                                                ),
+                                                dbc.Col(
+                                                    [
+                                                        dbc.Label("Attack/Defense:"),
+                                                        dcc.Dropdown(
+                                                            id="whatif-side",
+                                                            placeholder="Any side",
+                                                            className="mb-3",
+                                                        ),
+                                                    ],
+                                                    width=4,
+                                                ),
+                                            ]
+                                        ),
+                                        dbc.Row(id="whatif-hero-container"),
+                                        html.Div(id="whatif-result", className="mt-3"),
                                     ],
                                 ),
                                 dbc.Tab(
@@ -399,7 +635,7 @@ def get_layout():
                                                             dbc.Label("Filter Player:"),
                                                             dcc.Dropdown(
                                                                 id='player-dropdown-match-history',
-                                                                options=[{'label': 'All Players', 'value': 'ALL'}] + [{'label': player, 'value': player} for player in constants.players],
+                                                                options=[{'label': 'All Players', 'value': 'ALL'}] + [{'label': player, 'value': player} for player in players],
                                                                 value='ALL',
                                                                 clearable=False,
                                                             ),
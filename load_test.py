@@ -0,0 +1,297 @@
+"""
+Load test for the dashboard's Dash callback endpoint.
+
+Usage: python load_test.py [--url URL] [--matches 5000]
+                           [--concurrency 1,2,4,8,16] [--duration 20]
+
+Every virtual user replays a browser session as POSTs to
+/_dash-update-component: the initial page load, player switches, season
+filters, compare toggles and history "load more" clicks. The callbacks are
+looked up in /_dash-dependencies and the component values start from
+/_dash-layout, so the requests match what the browser sends.
+
+Without --url the app is started in-process on synthetic match data
+(written to a temporary directory, the configured files are not touched). For every concurrency level the script
+prints the throughput plus p50/p95/p99 latency and error rate per callback.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import requests
+
+# Output (first one of the callback) -> name in the report
+CALLBACKS = {
+    "season-dropdown.options": "filter_options",
+    "compare-switches-container.children": "compare_switches",
+    "map-stat-container.children": "update_all_graphs",
+    "history-list-container.children": "history",
+}
+
+# Interaction -> relative frequency
+ACTIONS = {
+    "switch_player": 3,
+    "season_filter": 3,
+    "toggle_compare": 2,
+    "load_more_history": 2,
+}
+
+
+def synthetic_matches(players, matches, seed=0):
+    """
+    Generates a match sheet in the format of the Google Sheet.
+    """
+    from aggregates import ATTACK_DEF_MODES
+    from validation import KNOWN_HEROES, KNOWN_MAPS, ROLES
+
+    rng = np.random.default_rng(seed)
+    days = np.sort(rng.uniform(0, 900, matches))
+    dates = pd.Timestamp("2023-01-01") + pd.to_timedelta(days, unit="D")
+    maps = np.array(KNOWN_MAPS, dtype=object)
+    gamemodes = np.array(["Control", "Escort", "Hybrid", "Push", "Flashpoint"])
+    map_modes = dict(zip(KNOWN_MAPS, rng.choice(gamemodes, len(KNOWN_MAPS))))
+    df = pd.DataFrame(
+        {
+            "Match ID": np.arange(1, matches + 1),
+            "Date": dates,
+            # A new season every nine weeks
+            "Season": [f"Season {1 + int(d // 63)}" for d in days],
+            "Year": dates.year,
+            "Month": dates.month_name(),
+            "Map": rng.choice(maps, matches),
+            "Attack Def": rng.choice(ATTACK_DEF_MODES + ["Push"], matches),
+            "Win Lose": rng.choice(["Win", "Lose", "Draw"], matches, p=[0.48, 0.47, 0.05]),
+        }
+    )
+    df.insert(6, "Gamemode", df["Map"].map(map_modes))
+    heroes = np.array(KNOWN_HEROES, dtype=object)
+    for p in players:
+        present = rng.random(matches) < 0.85
+        df[f"{p} Role"] = np.where(present, rng.choice(ROLES, matches), "not present")
+        # Each player sticks to a small hero pool, like real players do
+        pool = rng.choice(heroes, 8, replace=False)
+        df[f"{p} Hero"] = np.where(present, rng.choice(pool, matches), "not present")
+    return df
+
+
+def start_local_server(matches):
+    """
+    Starts the app in a background thread on synthetic data and returns its URL.
+    """
+    import logging
+    import os
+    import tempfile
+    from werkzeug.serving import make_server
+    import data
+    from storage import SQLiteStore
+
+    # Importing app loads every source and starts the refresh scheduler and
+    # the config watcher, so the sources are pointed at synthetic sheets in a
+    # temporary directory first, without snapshots, schedules or watcher
+    tmp_dir = tempfile.mkdtemp(prefix="ow_load_test_")
+    data.SNAPSHOT_DIR = None
+    data.CONFIG_POLL_SECONDS = 0
+    for name in data.get_source_names():
+        source = data.get_source(name)
+        source.refresh_minutes = None
+        source.archives = []
+        source.local_file = os.path.join(tmp_dir, f"{name}.xlsx")
+        synthetic_matches(source.players, matches).to_excel(
+            source.local_file, index=False, engine="openpyxl"
+        )
+        if source.store is not None:
+            source.store = SQLiteStore(os.path.join(tmp_dir, f"{name}.sqlite"))
+
+    import app as dashboard
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, dashboard.server, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def _split_outputs(output):
+    """Splits a (multi-)output string of /_dash-dependencies into (id, prop)."""
+    parts = output[2:-2].split("...") if output.startswith("..") else [output]
+    return [tuple(part.rsplit(".", 1)) for part in parts]
+
+
+def _collect_values(node, values):
+    """Collects the initial (id, prop) -> value of every component in the layout."""
+    if isinstance(node, list):
+        for child in node:
+            _collect_values(child, values)
+    elif isinstance(node, dict):
+        props = node.get("props", {})
+        if isinstance(props.get("id"), str):
+            for prop, value in props.items():
+                values[(props["id"], prop)] = value
+        for value in props.values():
+            _collect_values(value, values)
+
+
+class Session:
+    """
+    One virtual user: holds the component values like the browser does and
+    fires the callbacks an interaction triggers.
+    """
+
+    def __init__(self, url, dependencies, layout_values, records, rng):
+        self.url = url
+        self.http = requests.Session()
+        self.dependencies = dependencies
+        self.values = dict(layout_values)
+        # Every browser gets its own key for the server-side session cache
+        self.values[("session-key", "data")] = uuid.uuid4().hex
+        self.compare = {}
+        self.records = records
+        self.rng = rng
+
+    def _prop(self, component_id, prop):
+        if component_id.startswith("{"):
+            # compare-switch pattern (ALL): one entry per rendered switch
+            pattern = json.loads(component_id)
+            return [
+                {
+                    "id": {"type": pattern["type"], "player": p},
+                    "property": prop,
+                    "value": is_on if prop == "value" else {"type": pattern["type"], "player": p},
+                }
+                for p, is_on in self.compare.items()
+            ]
+        return {"id": component_id, "property": prop, "value": self.values.get((component_id, prop))}
+
+    def fire(self, name, trigger):
+        dep = self.dependencies[name]
+        outputs = _split_outputs(dep["output"])
+        body = {
+            "output": dep["output"],
+            "outputs": [{"id": i, "property": p} for i, p in outputs]
+            if len(outputs) > 1
+            else {"id": outputs[0][0], "property": outputs[0][1]},
+            "inputs": [self._prop(i["id"], i["property"]) for i in dep["inputs"]],
+            "state": [self._prop(s["id"], s["property"]) for s in dep["state"]],
+            "changedPropIds": [trigger],
+        }
+        start = time.perf_counter()
+        try:
+            response = self.http.post(f"{self.url}/_dash-update-component", json=body, timeout=60)
+            ok = response.status_code in (200, 204)
+        except requests.RequestException:
+            response, ok = None, False
+        self.records.append((name, time.perf_counter() - start, ok))
+        if ok and response.status_code == 200:
+            for component_id, props in response.json()["response"].items():
+                for prop, value in props.items():
+                    self.values[(component_id, prop)] = value
+
+    def _options(self, component_id):
+        return [o["value"] for o in self.values.get((component_id, "options")) or []]
+
+    def start(self):
+        self.fire("filter_options", "team-dropdown.value")
+        self._switch_to(self.values[("player-dropdown", "value")])
+
+    def _switch_to(self, player):
+        self.values[("player-dropdown", "value")] = player
+        self.fire("compare_switches", "player-dropdown.value")
+        self.compare = {p: False for p in self._options("player-dropdown") if p != player}
+        self.fire("update_all_graphs", "player-dropdown.value")
+
+    def act(self, action):
+        if action == "switch_player":
+            self._switch_to(self.rng.choice(self._options("player-dropdown")))
+        elif action == "season_filter":
+            seasons = self._options("season-dropdown") + [None]
+            self.values[("season-dropdown", "value")] = self.rng.choice(seasons)
+            self.fire("update_all_graphs", "season-dropdown.value")
+        elif action == "toggle_compare" and self.compare:
+            p = self.rng.choice(list(self.compare))
+            self.compare[p] = not self.compare[p]
+            trigger = json.dumps({"player": p, "type": "compare-switch"}, separators=(",", ":"))
+            self.fire("update_all_graphs", f"{trigger}.value")
+        elif action == "load_more_history":
+            clicks = self.values.get(("load-more-history-button", "n_clicks")) or 0
+            self.values[("load-more-history-button", "n_clicks")] = clicks + 1
+            self.fire("history", "load-more-history-button.n_clicks")
+
+
+def run_level(url, dependencies, layout_values, concurrency, duration, seed):
+    """
+    Runs concurrency virtual users for duration seconds and returns the
+    (callback, latency, ok) records and the wall time.
+    """
+    records = []
+    stop = time.perf_counter() + duration
+    actions, weights = list(ACTIONS), list(ACTIONS.values())
+
+    def user(i):
+        rng = random.Random(seed + i)
+        session = Session(url, dependencies, layout_values, records, rng)
+        session.start()
+        while time.perf_counter() < stop:
+            session.act(rng.choices(actions, weights)[0])
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return records, time.perf_counter() - start
+
+
+def report(concurrency, records, elapsed):
+    frame = pd.DataFrame(records, columns=["callback", "latency", "ok"])
+    print(
+        f"\n=== {concurrency} concurrent user(s): {len(frame)} requests in "
+        f"{elapsed:.1f}s, {len(frame) / elapsed:.1f} req/s ==="
+    )
+    rows = []
+    for name, group in frame.groupby("callback"):
+        ms = group["latency"].to_numpy() * 1000
+        rows.append(
+            {
+                "callback": name,
+                "requests": len(group),
+                "p50 ms": np.percentile(ms, 50),
+                "p95 ms": np.percentile(ms, 95),
+                "p99 ms": np.percentile(ms, 99),
+                "errors %": 100 * (1 - group["ok"].mean()),
+            }
+        )
+    print(pd.DataFrame(rows).to_string(index=False, float_format="{:.1f}".format))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="running dashboard (default: start one on synthetic data)")
+    parser.add_argument("--matches", type=int, default=5000, help="synthetic matches per team")
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="comma separated user counts")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per level")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    url = args.url.rstrip("/") if args.url else start_local_server(args.matches)
+    dependencies = {}
+    for dep in requests.get(f"{url}/_dash-dependencies", timeout=30).json():
+        name = CALLBACKS.get("{}.{}".format(*_split_outputs(dep["output"])[0]))
+        if name:
+            dependencies[name] = dep
+    layout_values = {}
+    _collect_values(requests.get(f"{url}/_dash-layout", timeout=30).json(), layout_values)
+
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        records, elapsed = run_level(
+            url, dependencies, layout_values, concurrency, args.duration, args.seed
+        )
+        report(concurrency, records, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import numpy as np
+import pandas as pd
+
+# Ridge penalty of the weights (the intercept is not penalized)
+L2 = 1.0
+MAX_ITERATIONS = 25
+# Newton steps stop once no weight moves by more than this
+TOLERANCE = 1e-4
+CONTEXT_COLUMNS = ["Map", "Gamemode", "Attack Def"]
+INTERCEPT = ("Intercept", None)
+
+
+def _factorize(values):
+    """
+    Returns (codes, uniques) of a column with the values stripped, -1 for
+    missing or empty ones. Only the distinct values are stripped.
+    """
+    codes, uniques = pd.factorize(values)
+    names = pd.Series(uniques, dtype="string").str.strip()
+    valid = (names.notna() & (names != "")).to_numpy()
+    merged, stripped = pd.factorize(names.where(valid))
+    return np.where(codes >= 0, merged[np.maximum(codes, 0)], -1), stripped
+
+
+def _feature_codes(df, players):
+    """
+    Returns {column: (codes, values)} of the map/mode columns and every
+    player's hero and role, -1 where a match has no feature of that column
+    (a player's hero and role only count if they were present, like in
+    synergy._present_heroes).
+    """
+    features = {}
+    for col in CONTEXT_COLUMNS:
+        if col in df.columns:
+            features[col] = _factorize(df[col])
+    for p in players:
+        hero_col, role_col = f"{p} Hero", f"{p} Role"
+        if hero_col not in df.columns or role_col not in df.columns:
+            continue
+        heroes, hero_values = _factorize(df[hero_col])
+        roles, role_values = _factorize(df[role_col])
+        absent = np.asarray(role_values == "not present")
+        present = (heroes >= 0) & (roles >= 0)
+        present[present] = ~absent[roles[present]]
+        features[hero_col] = (np.where(present, heroes, -1), hero_values)
+        features[role_col] = (np.where(present, roles, -1), role_values)
+    return features
+
+
+def _most_common(keys, values, key_names, value_names):
+    """
+    Returns {key: its most common value} over the matches where both are set.
+    """
+    both = (keys >= 0) & (values >= 0)
+    pairs = pd.DataFrame({"key": keys[both], "value": values[both]})
+    counts = pairs.groupby(["key", "value"]).size()
+    if counts.empty:
+        return {}
+    best = counts.sort_values(ascending=False, kind="stable").groupby(level=0).head(1)
+    return {key_names[k]: value_names[v] for k, v in best.index}
+
+
+def encode(features, labels=None):
+    """
+    Encodes the matches as the ids of their active one-hot features, one
+    column per input column (-1 where it is missing, column 0 is the
+    intercept). Features missing from labels (a list of (column, value))
+    are appended to it, so the ids of a previous model stay valid.
+    """
+    labels = list(labels or [INTERCEPT])
+    lookup = {label: i for i, label in enumerate(labels)}
+    n = len(next(iter(features.values()))[0]) if features else 0
+    columns = [np.zeros(n, dtype=np.int64)]
+    for col, (codes, values) in features.items():
+        ids = np.full(len(values), -1, dtype=np.int64)
+        # Values only seen where the feature is masked (e.g. "not present")
+        used = np.bincount(codes[codes >= 0], minlength=len(values)) > 0
+        for i in np.flatnonzero(used):
+            label = (col, str(values[i]))
+            if label not in lookup:
+                lookup[label] = len(labels)
+                labels.append(label)
+            ids[i] = lookup[label]
+        columns.append(np.where(codes >= 0, ids[np.maximum(codes, 0)], -1))
+    return np.column_stack(columns), labels
+
+
+def _log_loss(z, y, w, penalty):
+    loss = np.logaddexp(0, z) - y * z
+    return loss.sum() + 0.5 * np.sum(penalty * w * w)
+
+
+def fit(codes, y, n_features, weights=None, l2=L2):
+    """
+    Fits an L2-regularized logistic regression on one-hot codes with
+    Newton's method and returns (weights, iterations). The Hessian is
+    accumulated with one bincount per pair of input columns. Warm-started
+    from weights (e.g. the previous data version), a refit with a few new
+    matches needs one or two steps.
+    """
+    n, k = codes.shape
+    # Missing features point at an extra, always-zero weight
+    idx = np.where(codes >= 0, codes, n_features)
+    w = np.zeros(n_features + 1)
+    if weights is not None:
+        w[: len(weights)] = weights
+    penalty = np.full(n_features + 1, l2)
+    penalty[0] = penalty[n_features] = 0
+    size = n_features + 1
+    z = w[idx].sum(axis=1)
+    loss = _log_loss(z, y, w, penalty)
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        p = 1 / (1 + np.exp(-z))
+        r = np.broadcast_to((p - y)[:, None], idx.shape)
+        # bincount of no matches is an int array, the sum makes it float
+        gradient = penalty * w + np.bincount(
+            idx.ravel(), weights=r.ravel(), minlength=size
+        )
+        d = p * (1 - p)
+        hessian = np.zeros(size * size)
+        for a in range(k):
+            for b in range(a, k):
+                pair = np.bincount(idx[:, a] * size + idx[:, b], weights=d, minlength=size * size)
+                hessian += pair
+                if a != b:
+                    hessian += pair.reshape(size, size).T.ravel()
+        hessian = hessian.reshape(size, size)[:n_features, :n_features]
+        step = np.zeros(size)
+        step[:n_features] = np.linalg.solve(
+            hessian + np.diag(penalty[:n_features]), gradient[:n_features]
+        )
+        # Halve the step while it does not decrease the loss
+        for _ in range(10):
+            candidate = w - step
+            z_candidate = candidate[idx].sum(axis=1)
+            candidate_loss = _log_loss(z_candidate, y, candidate, penalty)
+            if candidate_loss <= loss + 1e-9:
+                break
+            step /= 2
+        w, z, loss = candidate, z_candidate, candidate_loss
+        if np.abs(step).max() < TOLERANCE:
+            break
+    return w[:n_features], iteration
+
+
+def train_model(df, players, previous=None):
+    """
+    Trains the win-probability model on the decided matches. Features and
+    weights of a previous model are reused, so retraining after a refresh
+    only adds the new values and refines the weights. Without decided
+    matches the model only has the intercept and predicts 50%.
+    """
+    if df.empty or "Win Lose" not in df.columns:
+        decided = pd.DataFrame()
+    else:
+        decided = df[df["Win Lose"].isin(["Win", "Lose"])]
+    if decided.empty:
+        return {
+            "labels": [INTERCEPT],
+            "lookup": {INTERCEPT: 0},
+            "weights": np.zeros(1),
+            "gamemodes": {},
+            "roles": {},
+            "matches": 0,
+            "winrate": 0.0,
+            "iterations": 0,
+        }
+    features = _feature_codes(decided, players)
+    codes, labels = encode(features, previous["labels"] if previous else None)
+    y = (decided["Win Lose"] == "Win").to_numpy(dtype=float)
+    weights, iterations = fit(
+        codes, y, len(labels), previous["weights"] if previous else None
+    )
+    # What-if inputs only name the map and the heroes, their mode and the
+    # roles are filled in with the most common ones
+    gamemodes = {}
+    if "Map" in features and "Gamemode" in features:
+        gamemodes = _most_common(
+            features["Map"][0],
+            features["Gamemode"][0],
+            features["Map"][1],
+            features["Gamemode"][1],
+        )
+    roles = {}
+    for p in players:
+        if f"{p} Hero" in features:
+            heroes, hero_values = features[f"{p} Hero"]
+            role_codes, role_values = features[f"{p} Role"]
+            for hero, role in _most_common(
+                heroes, role_codes, hero_values, role_values
+            ).items():
+                roles[(p, hero)] = role
+    return {
+        "labels": labels,
+        "lookup": {label: i for i, label in enumerate(labels)},
+        "weights": weights,
+        "gamemodes": gamemodes,
+        "roles": roles,
+        "matches": len(decided),
+        "winrate": float(y.mean()) if len(y) else 0.0,
+        "iterations": iterations,
+    }
+
+
+def predict_win(model, map_name=None, side=None, heroes=None):
+    """
+    Returns the win probability of a what-if setup: the map (its mode is
+    implied), optionally the attack/defense side, and {player: hero} of the
+    players taking part. Inputs the model has never seen count as neutral.
+    Also returns each known feature's contribution to the log-odds.
+    Inference is a handful of dict lookups, well below a millisecond.
+    """
+    features = []
+    if map_name:
+        features.append(("Map", map_name))
+        if map_name in model["gamemodes"]:
+            features.append(("Gamemode", model["gamemodes"][map_name]))
+    if side:
+        features.append(("Attack Def", side))
+    for player, hero in (heroes or {}).items():
+        if hero:
+            features.append((f"{player} Hero", hero))
+            role = model["roles"].get((player, hero))
+            if role:
+                features.append((f"{player} Role", role))
+    weights = model["weights"]
+    contributions = [
+        (f"{col}: {value}", weights[model["lookup"][(col, value)]])
+        for col, value in features
+        if (col, value) in model["lookup"]
+    ]
+    intercept = weights[0] if len(weights) else 0.0
+    log_odds = intercept + sum(c for _, c in contributions)
+    return {
+        "winrate": float(1 / (1 + np.exp(-log_odds))),
+        "contributions": contributions,
+    }
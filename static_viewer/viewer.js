@@ -0,0 +1,171 @@
+// Static viewer of the bundles written by build_static.py. Every filter
+// change loads (at most) one JSON file and renders it in the browser.
+(function () {
+    const bundles = new Map();
+    const el = (id) => document.getElementById(id);
+    const percent = (v) => (v === null ? "-" : `${Math.round(v * 100)}%`);
+    let index = null;
+
+    function fillSelect(select, options, keep) {
+        const current = keep ? select.value : null;
+        select.innerHTML = "";
+        for (const { label, value } of options) {
+            select.add(new Option(label, value));
+        }
+        if (current && options.some((o) => o.value === current)) {
+            select.value = current;
+        }
+    }
+
+    function team() {
+        return index.teams.find((t) => t.slug === el("team").value);
+    }
+
+    function player() {
+        return team().players.find((p) => p.slug === el("player").value);
+    }
+
+    function updatePlayers() {
+        const players = team().players.map((p) => ({ label: p.name, value: p.slug }));
+        fillSelect(el("player"), players, true);
+        updatePeriods();
+    }
+
+    function updatePeriods() {
+        const available = new Set(player().periods);
+        const periods = team()
+            .periods.filter((p) => available.has(p.slug))
+            .map((p) => ({ label: p.label, value: p.slug }));
+        fillSelect(el("period"), periods, true);
+        render();
+    }
+
+    function loadBundle() {
+        const url = `data/${team().slug}/${player().slug}/${el("period").value}.json`;
+        if (!bundles.has(url)) {
+            bundles.set(url, fetch(url).then((r) => r.json()));
+        }
+        return bundles.get(url);
+    }
+
+    function renderSummary(bundle) {
+        const s = bundle.summary;
+        el("summary").innerHTML = [
+            ["Total Games", s.total, ""],
+            ["Wins", s.wins, "win"],
+            ["Losses", s.losses, "loss"],
+            ["Winrate", percent(s.winrate), ""],
+        ]
+            .map(
+                ([title, value, cls]) =>
+                    `<div class="card"><div class="muted">${title}</div><div class="value ${cls}">${value}</div></div>`
+            )
+            .join("");
+        const best = (col) => {
+            const top = s[col].best_winrate[0];
+            return top ? `${top.name} (${percent(top.winrate)}, ${top.games} games)` : "-";
+        };
+        el("best").textContent =
+            `Best hero: ${best("Hero")} • Best map: ${best("Map")} ` +
+            `(at least ${bundle.min_games} games)`;
+    }
+
+    function renderStat(bundle) {
+        const column = el("column").value;
+        const table = bundle.tables[column];
+        const minGames = Math.max(parseInt(el("min-games").value, 10) || 1, 1);
+        let rows = table.names.map((name, i) => ({
+            name,
+            games: table.games[i],
+            winrate: table.winrate[i],
+        }));
+        let trace;
+        if (el("stat").value === "winrate") {
+            // Already sorted by winrate, only the minimum is applied here
+            rows = rows.filter((r) => r.games >= minGames);
+            trace = {
+                type: "bar",
+                x: rows.map((r) => r.name),
+                y: rows.map((r) => r.winrate),
+                customdata: rows.map((r) => r.games),
+                hovertemplate: "<b>%{x}</b><br>Winrate: %{y:.1%}<br>Games: %{customdata}<extra></extra>",
+            };
+        } else {
+            rows.sort((a, b) => b.games - a.games);
+            trace = {
+                type: "bar",
+                x: rows.map((r) => r.name),
+                y: rows.map((r) => r.games),
+                hovertemplate: "<b>%{x}</b><br>Games: %{y}<extra></extra>",
+            };
+        }
+        const isWinrate = el("stat").value === "winrate";
+        Plotly.react("stat-graph", [trace], {
+            title: { text: `${isWinrate ? "Winrate" : "Games"} by ${column} (${bundle.player})` },
+            yaxis: { tickformat: isWinrate ? ".0%" : "" },
+        });
+    }
+
+    function renderHeatmap(bundle) {
+        const h = bundle.heatmap;
+        Plotly.react(
+            "heatmap",
+            [{ type: "heatmap", z: h.winrate, x: h.maps, y: h.roles, colorscale: "RdYlGn", zmin: 0, zmax: 1 }],
+            { title: { text: `Winrate by Role and Map (${bundle.player})` } }
+        );
+    }
+
+    function renderTrend(bundle) {
+        const t = bundle.trend;
+        Plotly.react(
+            "trend",
+            [{
+                type: t.x.length > 1500 ? "scattergl" : "scatter",
+                mode: "lines",
+                x: t.x,
+                y: t.y,
+                name: bundle.player,
+                hovertemplate: "<b>Game Number: %{x}</b><br><b>Winrate: %{y:.1%}</b><extra></extra>",
+            }],
+            {
+                title: { text: `Winrate History (${bundle.player})` },
+                xaxis: { title: { text: "Game Number" } },
+                yaxis: { title: { text: "Winrate" }, tickformat: ".0%" },
+            }
+        );
+        const s = t.streaks;
+        el("streaks").textContent =
+            `Longest win streak ${s.longest_win} • Longest loss streak ${s.longest_loss} • ` +
+            `Current: ${Math.abs(s.current)} ${s.current > 0 ? "W" : "L"}`;
+    }
+
+    function render() {
+        if (!el("period").value) {
+            return;
+        }
+        loadBundle().then((bundle) => {
+            renderSummary(bundle);
+            renderStat(bundle);
+            renderHeatmap(bundle);
+            renderTrend(bundle);
+        });
+    }
+
+    fetch("data/index.json")
+        .then((r) => r.json())
+        .then((data) => {
+            index = data;
+            fillSelect(el("team"), index.teams.map((t) => ({ label: t.name, value: t.slug })));
+            el("team-field").style.display = index.teams.length > 1 ? "" : "none";
+            el("footer").textContent =
+                "Static export: " + index.teams.map((t) => `${t.name} (data version ${t.version})`).join(", ");
+            el("team").addEventListener("change", updatePlayers);
+            el("player").addEventListener("change", updatePeriods);
+            el("period").addEventListener("change", render);
+            for (const id of ["column", "stat", "min-games"]) {
+                // Only re-render, the bundle is already loaded
+                el(id).addEventListener("change", () => loadBundle().then(renderStat));
+            }
+            updatePlayers();
+        });
+})();
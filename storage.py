@@ -0,0 +1,345 @@
+import os
+import sqlite3
+from urllib.request import pathname2url
+import pandas as pd
+from utils import WINRATE_COLUMNS, add_confidence, sort_winrates
+from validation import ROLES
+
+# DataFrame column -> matches table column
+MATCH_COLUMNS = {
+    "Match ID": "match_id",
+    "Date": "date",
+    "Season": "season",
+    "Year": "year",
+    "Month": "month",
+    "Map": "map",
+    "Gamemode": "gamemode",
+    "Attack Def": "attack_def",
+    "Win Lose": "win_lose",
+}
+
+SCHEMA = """
+CREATE TABLE matches (
+    row_id INTEGER PRIMARY KEY,
+    match_id INTEGER,
+    date TEXT,
+    season TEXT,
+    year INTEGER,
+    month TEXT,
+    map TEXT,
+    gamemode TEXT,
+    attack_def TEXT,
+    win_lose TEXT,
+    excluded INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE appearances (
+    row_id INTEGER NOT NULL REFERENCES matches(row_id),
+    player TEXT NOT NULL,
+    hero TEXT,
+    role TEXT
+);
+CREATE INDEX idx_appearances_player ON appearances(player, row_id);
+CREATE INDEX idx_appearances_hero ON appearances(hero, player);
+CREATE INDEX idx_matches_map ON matches(map);
+CREATE INDEX idx_matches_season ON matches(season);
+CREATE INDEX idx_matches_date ON matches(date);
+CREATE INDEX idx_matches_year_month ON matches(year, month);
+"""
+
+# Columns of the filtered frame, named like utils.filter_data names them
+FILTERED_SELECT = """
+SELECT m.row_id, m.match_id AS "Match ID", m.date AS "Date",
+       m.season AS "Season", m.year AS "Year", m.month AS "Month",
+       m.map AS "Map", m.gamemode AS "Gamemode", m.attack_def AS "Attack Def",
+       m.win_lose AS "Win Lose", TRIM(a.hero) AS "Hero", TRIM(a.role) AS "Role"
+FROM matches m JOIN appearances a ON a.row_id = m.row_id
+"""
+
+GROUP_COLUMNS = {
+    "Hero": '"Hero"',
+    "Role": '"Role"',
+    "Map": '"Map"',
+    "Gamemode": '"Gamemode"',
+    "Attack Def": '"Attack Def"',
+}
+
+
+def _appearances(df, players):
+    """
+    Returns the appearances table rows (one per match a player has a hero
+    or role in) of the given players, None if there are none.
+    """
+    parts = []
+    for p in players:
+        hero_col, role_col = f"{p} Hero", f"{p} Role"
+        if hero_col not in df.columns and role_col not in df.columns:
+            continue
+        part = pd.DataFrame(
+            {
+                "row_id": range(len(df)),
+                "player": p,
+                "hero": df[hero_col].to_numpy() if hero_col in df.columns else None,
+                "role": df[role_col].to_numpy() if role_col in df.columns else None,
+            }
+        )
+        parts.append(part[part["hero"].notna() | part["role"].notna()])
+    return pd.concat(parts, ignore_index=True) if parts else None
+
+
+def _match_rows(df, start=0):
+    """
+    Returns the matches table rows of the frame, numbered from start.
+    """
+    matches = pd.DataFrame(index=df.index)
+    for frame_col, table_col in MATCH_COLUMNS.items():
+        matches[table_col] = df[frame_col] if frame_col in df.columns else None
+    matches["year"] = pd.to_numeric(matches["year"], errors="coerce").astype("Int64")
+    matches["date"] = pd.to_datetime(matches["date"], errors="coerce").dt.strftime(
+        "%Y-%m-%d %H:%M:%S"
+    )
+    matches.insert(0, "row_id", range(start, start + len(matches)))
+    # Rows sharing a Match ID stay in the history but not in statistics
+    ids = matches["match_id"]
+    matches["excluded"] = (ids.notna() & ids.duplicated(keep=False)).astype(int)
+    return matches
+
+
+class SQLiteStore:
+    """
+    Keeps the matches of a data source in a normalized SQLite database, so
+    filtering, winrates and history pages run as indexed queries. The store
+    serves queries next to the match frame, it does not replace it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+    def write(self, df, players):
+        """
+        Replaces the stored matches with the given frame. The database is
+        built next to the old one and swapped in atomically.
+        """
+        tmp_path = f"{self.path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        matches = _match_rows(df)
+        appearances = _appearances(df, players)
+        with sqlite3.connect(tmp_path) as conn:
+            conn.executescript(SCHEMA)
+            matches.to_sql("matches", conn, if_exists="append", index=False)
+            if appearances is not None:
+                appearances.to_sql("appearances", conn, if_exists="append", index=False)
+        os.replace(tmp_path, self.path)
+
+    def copy(self, path):
+        """
+        Returns a store at path holding a copy of this database, written
+        next to it and moved into place atomically.
+        """
+        tmp_path = f"{path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        with self._connect() as source, sqlite3.connect(tmp_path) as target:
+            source.backup(target)
+        os.replace(tmp_path, path)
+        return SQLiteStore(path)
+
+    def insert(self, df, players, position):
+        """
+        Inserts the matches of df before the stored row at position (after
+        the last one for the row count), the rows after it move back. The
+        Match IDs of df must not be stored yet.
+        """
+        matches = _match_rows(df, position)
+        appearances = _appearances(df, players)
+        with self._connect() as conn:
+            # Through negative ids, so no row id is taken twice on the way
+            conn.execute(
+                "UPDATE matches SET row_id = -row_id - 1 - ? WHERE row_id >= ?",
+                (len(df), position),
+            )
+            conn.execute("UPDATE matches SET row_id = -row_id - 1 WHERE row_id < 0")
+            conn.execute(
+                "UPDATE appearances SET row_id = row_id + ? WHERE row_id >= ?",
+                (len(df), position),
+            )
+            matches.to_sql("matches", conn, if_exists="append", index=False)
+            if appearances is not None:
+                appearances["row_id"] += position
+                appearances.to_sql("appearances", conn, if_exists="append", index=False)
+
+    def write_players(self, df, added, removed):
+        """
+        Updates the appearances after a roster change: the removed players'
+        rows are deleted and the added players' rows inserted, the matches
+        table is left as it is. df must be the frame the store was written
+        from (same rows in the same order).
+        """
+        appearances = _appearances(df, added)
+        with self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM appearances WHERE player = ?",
+                [(p,) for p in list(added) + list(removed)],
+            )
+            if appearances is not None:
+                appearances.to_sql("appearances", conn, if_exists="append", index=False)
+
+    def _query(self, sql, params=()):
+        # Read-only, so a database that was removed is not recreated empty
+        uri = f"file:{pathname2url(os.path.abspath(self.path))}?mode=ro"
+        with sqlite3.connect(uri, uri=True) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    @staticmethod
+    def _filtered_sql(player, season=None, month=None, year=None, dates=None):
+        """
+        Builds the query behind filter_data: one row per decided match the
+        player took part in, leaving out what validation.exclude_dirty does.
+        """
+        roles = ", ".join(f"'{r}'" for r in ROLES)
+        where = [
+            "a.player = ?",
+            "m.win_lose IN ('Win', 'Lose')",
+            "m.excluded = 0",
+            f"TRIM(a.role) IN ({roles})",
+            "a.hero IS NOT NULL",
+            "TRIM(a.hero) NOT IN ('', 'not present')",
+        ]
+        params = [player]
+        if dates:
+            # (start, end) inclusive days, dates are stored as sortable text
+            start, end = dates
+            if start:
+                where.append("m.date >= ?")
+                params.append(str(pd.Timestamp(start)))
+            if end:
+                where.append("m.date < ?")
+                params.append(str(pd.Timestamp(end).normalize() + pd.Timedelta(days=1)))
+        elif season:
+            where.append("m.season = ?")
+            params.append(season)
+        else:
+            if year is not None:
+                where.append("m.year = ?")
+                params.append(int(year))
+            if month is not None:
+                where.append("m.month = ?")
+                params.append(month)
+        return FILTERED_SELECT + " WHERE " + " AND ".join(where), params
+
+    def filter_data(self, player, season=None, month=None, year=None, dates=None):
+        """
+        SQL counterpart of utils.filter_data.
+        """
+        sql, params = self._filtered_sql(player, season, month, year, dates)
+        data = self._query(sql + " ORDER BY m.row_id", params)
+        if data.empty:
+            return pd.DataFrame()
+        data["Date"] = pd.to_datetime(data["Date"], errors="coerce")
+        return data.set_index("row_id").rename_axis(None)
+
+    def calculate_winrate(
+        self,
+        player,
+        group_col,
+        season=None,
+        month=None,
+        year=None,
+        rank_by="winrate",
+        dates=None,
+    ):
+        """
+        SQL counterpart of utils.calculate_winrate on the filtered matches.
+        """
+        columns = [group_col] + WINRATE_COLUMNS
+        if group_col not in GROUP_COLUMNS:
+            return pd.DataFrame(columns=columns)
+        sql, params = self._filtered_sql(player, season, month, year, dates)
+        col = GROUP_COLUMNS[group_col]
+        stats = self._query(
+            f"""
+            SELECT TRIM({col}) AS "{group_col}",
+                   SUM("Win Lose" = 'Win') AS "Win",
+                   SUM("Win Lose" = 'Lose') AS "Lose"
+            FROM ({sql})
+            WHERE {col} IS NOT NULL AND TRIM({col}) != ''
+            GROUP BY TRIM({col})
+            """,
+            params,
+        )
+        if stats.empty:
+            return pd.DataFrame(columns=columns)
+        stats["Games"] = stats["Win"] + stats["Lose"]
+        stats["Winrate"] = stats["Win"] / stats["Games"]
+        return sort_winrates(add_confidence(stats), rank_by)
+
+    def heatmap_matrix(self, player, season=None, month=None, year=None, dates=None):
+        """
+        Role x Map winrate matrix of the filtered matches.
+        """
+        sql, params = self._filtered_sql(player, season, month, year, dates)
+        cells = self._query(
+            f"""
+            SELECT "Role", "Map", AVG("Win Lose" = 'Win') AS "Winrate"
+            FROM ({sql})
+            WHERE "Map" IS NOT NULL
+            GROUP BY "Role", "Map"
+            """,
+            params,
+        )
+        if cells.empty:
+            return pd.DataFrame()
+        return cells.pivot(index="Role", columns="Map", values="Winrate")
+
+    def history_page(self, players, player=None, hero=None, limit=10, offset=0):
+        """
+        Returns one page of the match history in the sheet's wide format,
+        most recent first, filtered like the match history tab.
+        """
+        where, params = [], []
+        if player and player != "ALL":
+            condition = (
+                "a.player = ? AND a.hero IS NOT NULL AND a.hero != 'not present'"
+            )
+            params.append(player)
+            if hero:
+                condition += " AND a.hero = ?"
+                params.append(hero)
+            where.append(
+                f"EXISTS (SELECT 1 FROM appearances a WHERE a.row_id = m.row_id AND {condition})"
+            )
+        elif hero:
+            where.append(
+                "EXISTS (SELECT 1 FROM appearances a WHERE a.row_id = m.row_id AND a.hero = ?)"
+            )
+            params.append(hero)
+
+        select = ", ".join(
+            f'm.{table_col} AS "{frame_col}"'
+            for frame_col, table_col in MATCH_COLUMNS.items()
+        )
+        sql = f"SELECT m.row_id, {select} FROM matches m"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY m.row_id LIMIT ? OFFSET ?"
+        page = self._query(sql, params + [limit, offset])
+        if page.empty:
+            return pd.DataFrame()
+        page["Date"] = pd.to_datetime(page["Date"], errors="coerce")
+
+        row_ids = page["row_id"].tolist()
+        placeholders = ", ".join("?" * len(row_ids))
+        appearances = self._query(
+            f"SELECT row_id, player, hero, role FROM appearances WHERE row_id IN ({placeholders})",
+            row_ids,
+        )
+        page = page.set_index("row_id")
+        for p in players:
+            rows = appearances[appearances["player"] == p].set_index("row_id")
+            page[f"{p} Hero"] = rows["hero"].reindex(page.index)
+            page[f"{p} Role"] = rows["role"].reindex(page.index)
+        return page.rename_axis(None)
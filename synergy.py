@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy import sparse
+except ImportError:  # scipy is optional, dense matrices work for small rosters
+    sparse = None
+
+
+def _present_heroes(df, player):
+    """
+    Returns the player's stripped hero per match, NaN where they did not play
+    (same rules as utils.filter_data).
+    """
+    hero_col, role_col = f"{player} Hero", f"{player} Role"
+    if hero_col not in df.columns or role_col not in df.columns:
+        return None
+    heroes = df[hero_col].astype("string").str.strip()
+    present = (
+        df[role_col].notna()
+        & (df[role_col] != "not present")
+        & heroes.notna()
+        & (heroes != "")
+    )
+    return heroes.where(present)
+
+
+def _one_hot(df, players):
+    """
+    Builds the match x (player, hero) indicator matrix with one block of
+    columns per player, and the (player, hero) label of each column.
+    """
+    n = len(df)
+    blocks, labels = [], []
+    for p in players:
+        heroes = _present_heroes(df, p)
+        if heroes is None:
+            continue
+        codes, uniques = pd.factorize(heroes, sort=True)
+        rows = np.flatnonzero(codes >= 0)
+        if sparse is not None:
+            block = sparse.csr_matrix(
+                (np.ones(len(rows)), (rows, codes[rows])), shape=(n, len(uniques))
+            )
+        else:
+            block = np.zeros((n, len(uniques)))
+            block[rows, codes[rows]] = 1
+        blocks.append(block)
+        labels.extend((p, h) for h in uniques)
+    if not blocks:
+        return np.zeros((n, 0)), labels
+    if sparse is not None:
+        return sparse.hstack(blocks).tocsr(), labels
+    return np.hstack(blocks), labels
+
+
+def co_occurrence(df, players):
+    """
+    Returns the games and wins matrices over all (player, hero) pairs, i.e.
+    how often two player/hero picks appeared in the same match and how often
+    those matches were won, plus the column labels.
+    """
+    x, labels = _one_hot(df, players)
+    wins = (df["Win Lose"] == "Win").to_numpy(dtype=float)
+    if sparse is not None:
+        games = (x.T @ x).toarray()
+        won = (x.T @ sparse.diags(wins) @ x).toarray()
+    else:
+        games = x.T @ x
+        won = x.T @ (x * wins[:, None])
+    return {
+        "games": games.astype(int),
+        "wins": won.astype(int),
+        "labels": pd.MultiIndex.from_tuples(labels, names=["Player", "Hero"]),
+    }
+
+
+def duo_stats(matrices, player_a, player_b):
+    """
+    Returns games, wins and winrate for every (player A hero, player B hero)
+    combination the two players actually played together.
+    """
+    columns = [f"{player_a} Hero", f"{player_b} Hero", "Games", "Win", "Winrate"]
+    labels = matrices["labels"]
+    if player_a == player_b or len(labels) == 0:
+        return pd.DataFrame(columns=columns)
+    players = labels.get_level_values("Player")
+    idx_a = np.flatnonzero(players == player_a)
+    idx_b = np.flatnonzero(players == player_b)
+    games = matrices["games"][np.ix_(idx_a, idx_b)]
+    won = matrices["wins"][np.ix_(idx_a, idx_b)]
+    ia, ib = np.nonzero(games)
+    heroes = labels.get_level_values("Hero")
+    stats = pd.DataFrame(
+        {
+            columns[0]: heroes[idx_a[ia]],
+            columns[1]: heroes[idx_b[ib]],
+            "Games": games[ia, ib],
+            "Win": won[ia, ib],
+        }
+    )
+    stats["Winrate"] = stats["Win"] / stats["Games"]
+    return stats.sort_values(["Winrate", "Games"], ascending=False)
+
+
+def composition_stats(df, players):
+    """
+    Returns games, wins and winrate per full team composition (which hero
+    every present roster player was on). Each match is one row of hero
+    codes, so grouping is a single np.unique over the rows, however many
+    players and heroes there are.
+    """
+    columns = ["Composition", "Players", "Games", "Win", "Winrate"]
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+    codes, digits = [], []
+    for p in players:
+        heroes = _present_heroes(df, p)
+        if heroes is None:
+            continue
+        hero_codes, uniques = pd.factorize(heroes, sort=True)
+        # 0 = not present, 1..n = hero
+        codes.append(hero_codes + 1)
+        digits.append((p, uniques))
+    if not codes:
+        return pd.DataFrame(columns=columns)
+
+    # Last player first, so the groups are ordered by the last player's hero
+    unique_rows, inverse = np.unique(
+        np.column_stack(codes[::-1]), axis=0, return_inverse=True
+    )
+    inverse = inverse.reshape(-1)
+    games = np.bincount(inverse)
+    won = np.bincount(
+        inverse, weights=(df["Win Lose"] == "Win").to_numpy(dtype=float)
+    ).astype(int)
+
+    parts = []
+    for i, (p, uniques) in enumerate(digits):
+        code = unique_rows[:, len(digits) - 1 - i]
+        names = np.concatenate([[""], np.asarray(uniques, dtype=object)])[code]
+        parts.append(np.where(code > 0, p + ": " + names.astype(str), ""))
+    compositions = [" / ".join(filter(None, row)) for row in zip(*parts)]
+    stats = pd.DataFrame(
+        {
+            "Composition": compositions,
+            "Players": np.sum([part != "" for part in parts], axis=0),
+            "Games": games,
+            "Win": won,
+        }
+    )
+    stats = stats[stats["Players"] > 0]
+    stats["Winrate"] = stats["Win"] / stats["Games"]
+    return stats.sort_values(["Winrate", "Games"], ascending=False)
@@ -1,10 +1,75 @@
+import json
 import os
 import re
+import unicodedata
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 import dash_bootstrap_components as dbc
 from dash import html
 
-def get_map_image_url(map_name):
+ASSET_MANIFEST_PATH = os.path.join("assets", "build", "manifest.json")
+
+
+def _load_asset_manifest():
+    """
+    Loads the thumbnail manifest written by build_assets.py, if it exists.
+    """
+    try:
+        with open(ASSET_MANIFEST_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+_asset_manifest = _load_asset_manifest()
+
+
+def _asset_variant(kind, asset_path, size):
+    """
+    Returns the built thumbnail of an asset for a render context ("icon",
+    "avatar", "card", "banner"), or the original image if none was built.
+    """
+    if size is None:
+        return asset_path
+    stem = os.path.splitext(os.path.basename(asset_path))[0]
+    return _asset_manifest.get(kind, {}).get(stem, {}).get(size, asset_path)
+
+
+@lru_cache(maxsize=None)
+def get_map_image_url(map_name, size=None):
+    """
+    Returns the URL of a map's image, as the thumbnail for the given render
+    context if one was built.
+    """
+    return _asset_variant("maps", _find_map_image(map_name), size)
+
+
+@lru_cache(maxsize=None)
+def get_hero_image_url(hero_name, size=None):
+    """
+    Returns the URL of a hero's portrait, as the thumbnail for the given
+    render context if one was built.
+    """
+    return _asset_variant("heroes", _find_hero_image(hero_name), size)
+
+
+def get_hero_sprite_class(hero_name):
+    """
+    Returns the CSS class of a hero's icon in the sprite sheet, or None if
+    no sprite sheet was built.
+    """
+    stem = os.path.splitext(os.path.basename(_find_hero_image(hero_name)))[0]
+    return _asset_manifest.get("hero_sprites", {}).get(stem)
+
+
+def _fold_accents(name):
+    """Returns name without accents ("torbjörn" -> "torbjorn")."""
+    return unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+
+
+@lru_cache(maxsize=None)
+def _find_map_image(map_name):
     """
     Generates a URL for a map's background image.
     Assumes images are in 'assets/maps/' and named like 'map_name.png'.
@@ -13,21 +78,23 @@ def get_map_image_url(map_name):
         return "/assets/maps/default.jpg"  # Fallback for non-string input
 
     # Clean the map name to create a valid filename
-    # e.g., "King's Row" -> "kings_row"
+    # e.g., "King's Row" -> "kings_row", "Esperança" -> "esperanca"
     cleaned_name = map_name.lower().replace(" ", "_").replace("'", "")
 
-    for ext in [".jpg", ".png"]:
-        image_filename = f"{cleaned_name}{ext}"
-        asset_path = f"/assets/maps/{image_filename}"
-        local_path = os.path.join("assets", "maps", image_filename)
+    for name in dict.fromkeys([cleaned_name, _fold_accents(cleaned_name)]):
+        for ext in [".jpg", ".png"]:
+            image_filename = f"{name}{ext}"
+            asset_path = f"/assets/maps/{image_filename}"
+            local_path = os.path.join("assets", "maps", image_filename)
 
-        if os.path.exists(local_path):
-            return asset_path
+            if os.path.exists(local_path):
+                return asset_path
 
     return "/assets/maps/default.png"
 
 
-def get_hero_image_url(hero_name):
+@lru_cache(maxsize=None)
+def _find_hero_image(hero_name):
     """
     Generates a URL for a hero's portrait with more robust, flexible checking.
     It tries multiple common filename variations and checks for both .png and .jpg.
@@ -47,7 +114,7 @@ def get_hero_image_url(hero_name):
     potential_names.append(cleaned_base.replace(" ", ""))
 
     # 3. Add aggressive cleaning as a final fallback (removes all non-letters/numbers)
-    potential_names.append(re.sub(r"[^a-z0-9]", "", base_name))
+    potential_names.append(re.sub(r"[^a-z0-9]", "", _fold_accents(base_name)))
 
     # Remove any duplicate names that may have been generated
     potential_names = list(set(potential_names))
@@ -107,9 +174,11 @@ def create_stat_card(title, image_url, main_text, sub_text):
     )
 
 
-def filter_data(df, player, season=None, month=None, year=None):
-    if df.empty:
-        return pd.DataFrame()
+def filter_period(df, season=None, month=None, year=None):
+    """
+    Keeps the decided (Win/Lose) matches of the selected season, or of the
+    selected year/month if no season is given.
+    """
     temp = df[df["Win Lose"].isin(["Win", "Lose"])].copy()
     if season:
         temp = temp[temp["Season"] == season]
@@ -118,6 +187,157 @@ def filter_data(df, player, season=None, month=None, year=None):
             temp = temp[pd.to_numeric(temp["Year"], errors="coerce") == int(year)]
         if month is not None:
             temp = temp[temp["Month"] == month]
+    return temp
+
+
+def _rows(positions):
+    """A slice if the sorted row positions are contiguous, else the positions."""
+    if len(positions) and positions[-1] - positions[0] + 1 == len(positions):
+        return slice(int(positions[0]), int(positions[-1]) + 1)
+    return positions
+
+
+def build_time_index(df):
+    """
+    Indexes the decided (Win/Lose) matches for period filters: the rows of
+    every season, year, month and year/month, and the order to binary
+    search dates in. Resolved with period_rows.
+    """
+    if df.empty or "Win Lose" not in df.columns:
+        return None
+    frame = df[df["Win Lose"].isin(["Win", "Lose"])]
+    periods = {}
+    if "Season" in frame.columns:
+        for season, rows in frame.groupby("Season").indices.items():
+            periods[("season", season)] = _rows(rows)
+    if "Year" in frame.columns and "Month" in frame.columns:
+        years = pd.to_numeric(frame["Year"], errors="coerce")
+        for year, rows in frame.groupby(years).indices.items():
+            periods[("year", int(year))] = _rows(rows)
+        for month, rows in frame.groupby("Month").indices.items():
+            periods[("month", month)] = _rows(rows)
+        for (year, month), rows in frame.groupby([years, frame["Month"]]).indices.items():
+            periods[("year_month", int(year), month)] = _rows(rows)
+
+    dates = np.array([], dtype="datetime64[ns]")
+    if "Date" in frame.columns:
+        dates = pd.to_datetime(frame["Date"], errors="coerce").to_numpy("datetime64[ns]")
+    # Rows without a date can't be in any date range
+    dated = np.flatnonzero(~np.isnat(dates))
+    order = dated[np.argsort(dates[dated], kind="stable")]
+    return {
+        "frame": frame,
+        "periods": periods,
+        "order": order,
+        "sorted_dates": dates[order],
+        # Newest first like the match frame: date ranges are contiguous rows
+        "contiguous": len(dated) == len(dates)
+        and bool(np.all(np.diff(dates.view("i8")) <= 0)),
+    }
+
+
+def _positions(rows, length):
+    """The row positions of a period_rows result on a frame of length rows."""
+    if isinstance(rows, slice):
+        return np.arange(*rows.indices(length))
+    return rows
+
+
+def insert_time_index(index, df, position):
+    """
+    Returns the time index with the decided matches of df inserted into its
+    frame before row position. Only df is grouped, the rows already indexed
+    are shifted. df must be sorted like the frame and carry the labels its
+    rows get in the match frame.
+    """
+    added = build_time_index(df)
+    if added is None or added["frame"].empty:
+        return index
+    frame, count = index["frame"], len(added["frame"])
+    periods = {}
+    for key in index["periods"].keys() | added["periods"].keys():
+        rows = index["periods"].get(key, slice(0, 0))
+        if key not in added["periods"]:
+            if isinstance(rows, slice) and rows.stop <= position:
+                periods[key] = rows
+                continue
+            rows = _positions(rows, len(frame))
+            periods[key] = _rows(np.where(rows >= position, rows + count, rows))
+            continue
+        rows = _positions(rows, len(frame))
+        new_rows = _positions(added["periods"][key], count) + position
+        periods[key] = _rows(
+            np.concatenate(
+                [rows[rows < position], new_rows, rows[rows >= position] + count]
+            )
+        )
+
+    # Both orders are sorted by date, a stable sort merges them
+    order = index["order"]
+    order = np.concatenate(
+        [np.where(order >= position, order + count, order), added["order"] + position]
+    )
+    dates = np.concatenate([index["sorted_dates"], added["sorted_dates"]])
+    merged = np.argsort(dates, kind="stable")
+    frame = pd.concat([frame.iloc[:position], added["frame"], frame.iloc[position:]])
+    contiguous = False
+    if index["contiguous"] and added["contiguous"] and len(order) == len(frame):
+        # Still newest first if the dates on both sides of the chunk agree
+        around = pd.to_datetime(
+            frame["Date"].iloc[max(position - 1, 0) : position + count + 1],
+            errors="coerce",
+        ).to_numpy("datetime64[ns]")
+        contiguous = bool(np.all(np.diff(around.view("i8")) <= 0))
+    return {
+        "frame": frame,
+        "periods": periods,
+        "order": order[merged],
+        "sorted_dates": dates[merged],
+        "contiguous": contiguous,
+    }
+
+
+def period_rows(index, season=None, month=None, year=None, dates=None):
+    """
+    Row positions (a slice where possible) of the index frame's matches in
+    a period. A (start, end) date range (inclusive days, either may be None)
+    overrides the season, which overrides year/month.
+    """
+    if dates:
+        start, end = dates
+        sorted_dates = index["sorted_dates"]
+        lo, hi = 0, len(sorted_dates)
+        if start:
+            lo = sorted_dates.searchsorted(np.datetime64(pd.Timestamp(start)), "left")
+        if end:
+            day_after = pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+            hi = sorted_dates.searchsorted(np.datetime64(day_after), "left")
+        if hi <= lo:
+            return slice(0, 0)
+        if index["contiguous"]:
+            # Dates descend along the frame, so order is reversed and the range
+            # covers len(frame) - hi .. len(frame) - lo
+            n = len(index["frame"])
+            return slice(n - hi, n - lo)
+        return np.sort(index["order"][lo:hi])
+    if season:
+        key = ("season", season)
+    elif year is not None and month is not None:
+        key = ("year_month", int(year), month)
+    elif year is not None:
+        key = ("year", int(year))
+    elif month is not None:
+        key = ("month", month)
+    else:
+        return slice(None)
+    return index["periods"].get(key, slice(0, 0))
+
+
+def player_matches(temp, player):
+    """
+    Keeps the matches of a period the player took part in, with their Hero
+    and Role as columns.
+    """
     role_col, hero_col = f"{player} Role", f"{player} Hero"
     if role_col not in temp.columns or hero_col not in temp.columns:
         return pd.DataFrame()
@@ -128,13 +348,70 @@ def filter_data(df, player, season=None, month=None, year=None):
     return temp[temp["Hero"].notna() & (temp["Hero"] != "")]
 
 
-def calculate_winrate(data, group_col):
+def filter_data(df, player, season=None, month=None, year=None):
+    if df.empty:
+        return pd.DataFrame()
+    return player_matches(filter_period(df, season, month, year), player)
+
+
+def filter_history(df, players, player=None, hero=None):
+    """
+    Filters the match history by player and/or hero, keeping all columns.
+    """
+    if df.empty:
+        return df
+
+    # Filter by player
+    if player and player != "ALL":
+        player_hero_col = f"{player} Hero"
+        if player_hero_col in df.columns:
+            # Filter for games the player participated in
+            df = df[df[player_hero_col].notna() & (df[player_hero_col] != "not present")]
+
+            # Filter by hero for that specific player
+            if hero:
+                df = df[df[player_hero_col] == hero]
+
+    # If a hero is selected but no specific player, filter for any player playing that hero
+    elif hero:
+        hero_cols = [f"{p} Hero" for p in players if f"{p} Hero" in df.columns]
+        # True if any of the hero columns for a row equals the hero
+        df = df[df[hero_cols].eq(hero).any(axis=1)]
+    return df
+
+
+WINRATE_COLUMNS = ["Win", "Lose", "Winrate", "Games", "WinrateLow", "WinrateHigh"]
+
+
+def wilson_interval(wins, games, z=1.96):
+    """
+    Wilson score interval of the winrate for arrays of wins and games
+    (95% by default). Groups with no games get the interval [0, 1].
+    """
+    wins = np.asarray(wins, dtype=float)
+    games = np.asarray(games, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = wins / games
+        denominator = 1 + z**2 / games
+        center = (p + z**2 / (2 * games)) / denominator
+        margin = z * np.sqrt(p * (1 - p) / games + z**2 / (4 * games**2)) / denominator
+    low = np.where(games > 0, center - margin, 0.0)
+    high = np.where(games > 0, center + margin, 1.0)
+    return np.clip(low, 0, 1), np.clip(high, 0, 1)
+
+
+def calculate_winrate(data, group_col, rank_by="winrate"):
+    """
+    Wins, losses and winrate per group, with the Wilson confidence interval
+    of the winrate. rank_by="lower_bound" sorts by the interval's lower
+    bound, so small samples no longer outrank consistent results.
+    """
     if data.empty or not isinstance(group_col, str) or group_col not in data.columns:
-        return pd.DataFrame(columns=[group_col, "Win", "Lose", "Winrate", "Games"])
-    data[group_col] = data[group_col].astype(str).str.strip()
+        return pd.DataFrame(columns=[group_col] + WINRATE_COLUMNS)
+    data = data.assign(**{group_col: data[group_col].astype(str).str.strip()})
     data = data[data[group_col].notna() & (data[group_col] != "")]
     if data.empty:
-        return pd.DataFrame(columns=[group_col, "Win", "Lose", "Winrate", "Games"])
+        return pd.DataFrame(columns=[group_col] + WINRATE_COLUMNS)
     grouped = data.groupby([group_col, "Win Lose"]).size().unstack(fill_value=0)
     if "Win" not in grouped:
         grouped["Win"] = 0
@@ -142,4 +419,108 @@ def calculate_winrate(data, group_col):
         grouped["Lose"] = 0
     grouped["Games"] = grouped["Win"] + grouped["Lose"]
     grouped["Winrate"] = grouped["Win"] / grouped["Games"]
-    return grouped.reset_index().sort_values("Winrate", ascending=False)
+    return sort_winrates(add_confidence(grouped.reset_index()), rank_by)
+
+
+def add_confidence(stats):
+    """
+    Adds the WinrateLow/WinrateHigh Wilson bounds to a table with Win and
+    Games columns.
+    """
+    low, high = wilson_interval(stats["Win"], stats["Games"])
+    return stats.assign(WinrateLow=low, WinrateHigh=high)
+
+
+def sort_winrates(stats, rank_by="winrate"):
+    """
+    Sorts a winrate table by raw winrate or by its Wilson lower bound.
+    """
+    if rank_by == "lower_bound":
+        return stats.sort_values(["WinrateLow", "Games"], ascending=False)
+    return stats.sort_values("Winrate", ascending=False)
+
+
+def _hero_icon(hero):
+    """
+    Small round hero icon, taken from the sprite sheet when one was built.
+    """
+    style = {"marginRight": "10px", "borderRadius": "50%"}
+    sprite_class = get_hero_sprite_class(hero)
+    if sprite_class:
+        return html.Span(className=f"hero-sprite {sprite_class}", style=style)
+    return html.Img(
+        src=get_hero_image_url(hero, "icon"), style={"height": "25px", **style}
+    )
+
+
+def create_hero_option(hero):
+    """
+    Creates a dropdown option showing the hero's portrait next to its name.
+    """
+    return {
+        "label": html.Div(
+            [_hero_icon(hero), html.Span(hero)],
+            style={"display": "flex", "alignItems": "center"},
+        ),
+        "value": hero,
+    }
+
+
+def _group_records(values, wins, min_games, top_k, rank_by):
+    """
+    Counts games and wins per distinct value with a single bincount and
+    returns the top_k most played and the top_k best winrate groups.
+    """
+    values = pd.Series(values).astype("string").str.strip()
+    valid = (values.notna() & (values != "")).to_numpy()
+    codes, names = pd.factorize(values[valid], sort=True)
+    if len(names) == 0:
+        return {"most_played": [], "best_winrate": []}
+    games = np.bincount(codes, minlength=len(names))
+    won = np.bincount(codes, weights=wins[valid], minlength=len(names)).astype(int)
+    winrate = won / games
+    winrate_low, _ = wilson_interval(won, games)
+    names = np.asarray(names, dtype=object)
+
+    def records(order):
+        return [
+            {
+                "name": names[i],
+                "games": int(games[i]),
+                "wins": int(won[i]),
+                "winrate": float(winrate[i]),
+                "winrate_low": float(winrate_low[i]),
+            }
+            for i in order[:top_k]
+        ]
+
+    # Ties are broken by name, matching Series.mode()
+    most_played = np.lexsort((np.arange(len(names)), -games))
+    eligible = np.flatnonzero(games >= min_games)
+    score = winrate_low if rank_by == "lower_bound" else winrate
+    best = eligible[np.lexsort((eligible, -games[eligible], -score[eligible]))]
+    return {"most_played": records(most_played), "best_winrate": records(best)}
+
+
+def summarize_matches(data, min_games=1, top_k=3, rank_by="winrate"):
+    """
+    Computes the overall totals and the "best of" hero/map statistics of a
+    filtered frame in one pass. Missing data yields empty record lists
+    instead of raising.
+    """
+    summary = {"total": 0, "wins": 0, "losses": 0, "winrate": 0.0}
+    if data.empty:
+        for col in ["Hero", "Map"]:
+            summary[col] = {"most_played": [], "best_winrate": []}
+        return summary
+    wins = (data["Win Lose"] == "Win").to_numpy(dtype=float)
+    summary["total"] = len(data)
+    summary["wins"] = int(wins.sum())
+    summary["losses"] = summary["total"] - summary["wins"]
+    summary["winrate"] = summary["wins"] / summary["total"]
+    for col in ["Hero", "Map"]:
+        if col in data.columns:
+            summary[col] = _group_records(data[col], wins, min_games, top_k, rank_by)
+        else:
+            summary[col] = {"most_played": [], "best_winrate": []}
+    return summary
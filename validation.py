@@ -0,0 +1,251 @@
+import os
+import re
+import unicodedata
+import pandas as pd
+
+ROLES = ["Tank", "Damage", "Support"]
+RESULTS = ["Win", "Lose", "Draw"]
+
+# Images of the known heroes and maps, named like the sheets spell them
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+# Names the file name doesn't spell in title case
+HERO_SPELLINGS = {"dva": "D.Va", "junkerqueen": "Junker Queen", "lucio": "Lúcio"}
+MAP_SPELLINGS = {"kings_row": "King's Row", "throne_of_anubis": "Throne of Anubis"}
+
+
+def _asset_names(folder, spellings):
+    """
+    Returns the names of the images in assets/<folder>, from their file
+    names ("blizzard_world.png" -> "Blizzard World") unless spellings has them.
+    """
+    try:
+        filenames = sorted(os.listdir(os.path.join(ASSETS_DIR, folder)))
+    except OSError:
+        return []
+    names = []
+    for filename in filenames:
+        stem, ext = os.path.splitext(filename)
+        if ext.lower() in (".png", ".jpg", ".jpeg") and not stem.startswith("default"):
+            names.append(spellings.get(stem, stem.replace("_", " ").title()))
+    return names
+
+
+KNOWN_HEROES = _asset_names("heroes", HERO_SPELLINGS)
+KNOWN_MAPS = _asset_names("maps", MAP_SPELLINGS)
+
+SAMPLE_SIZE = 5
+
+# Issues whose rows or appearances are left out of the statistics (the match
+# history still shows them): which of two matches sharing a Match ID is right
+# is unknown, and an appearance without a valid role or a hero can't be
+# counted for any role or hero. Only decided (Win/Lose) matches are counted
+# anyway, so rows with an invalid result are left out as well
+EXCLUDED_ISSUES = [
+    "duplicate_match_id",
+    "invalid_result",
+    "invalid_role",
+    "missing_hero",
+]
+
+
+def name_key(name):
+    """
+    Spelling-insensitive key of a hero or map name ("Lúcio", "lucio " and
+    "Lucio" share one key).
+    """
+    ascii_name = (
+        unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode()
+    )
+    return re.sub(r"[^a-z0-9]", "", ascii_name.lower())
+
+
+def build_alias_map(values, aliases=None, known=None):
+    """
+    Returns {spelling: canonical name} for the given names. Explicit aliases
+    win. Otherwise spellings sharing a name_key are mapped to the known name
+    with that key, or to the most frequent one of them if none is known.
+    """
+    aliases = dict(aliases or {})
+    counts = pd.Series(values).dropna().replace(aliases).value_counts()
+    counts = counts[counts.index.map(lambda v: isinstance(v, str))]
+    if counts.empty:
+        return aliases
+    keys = counts.index.map(name_key)
+    # value_counts is sorted by frequency, so the first spelling per key wins
+    canonical = pd.Series(counts.index, index=keys).groupby(level=0).first()
+    known_names = pd.Series(list(known or []), dtype=object)
+    known_names.index = known_names.map(name_key)
+    known_names = known_names[~known_names.index.duplicated()]
+    canonical.update(known_names)
+    spelled = pd.Series(canonical.reindex(keys).to_numpy(), index=counts.index)
+    auto = spelled[spelled.index != spelled.to_numpy()].to_dict()
+    for alias, target in aliases.items():
+        aliases[alias] = auto.get(target, target)
+    return {**auto, **aliases}
+
+
+def canonicalize(
+    df, players, hero_aliases=None, map_aliases=None, known_heroes=None, known_maps=None
+):
+    """
+    Rewrites hero and map aliases to their canonical spelling (the known
+    names of this module plus known_heroes/known_maps where one matches).
+    Returns the frame and the applied {"hero": {...}, "map": {...}} alias maps.
+    """
+    applied = {"hero": {}, "map": {}}
+    if df.empty:
+        return df, applied
+    hero_cols = [f"{p} Hero" for p in players if f"{p} Hero" in df.columns]
+    if hero_cols:
+        applied["hero"] = build_alias_map(
+            df[hero_cols].to_numpy().ravel(),
+            hero_aliases,
+            list(known_heroes or []) + KNOWN_HEROES,
+        )
+    if "Map" in df.columns:
+        applied["map"] = build_alias_map(
+            df["Map"], map_aliases, list(known_maps or []) + KNOWN_MAPS
+        )
+
+    replacements = {col: applied["hero"] for col in hero_cols}
+    if "Map" in df.columns:
+        replacements["Map"] = applied["map"]
+    replacements = {col: m for col, m in replacements.items() if m}
+    if replacements:
+        df = df.replace(replacements)
+    return df, applied
+
+
+def _sample(df, mask):
+    ids = df.loc[mask, "Match ID"] if "Match ID" in df.columns else pd.Series()
+    return [
+        int(i) if float(i).is_integer() else float(i)
+        for i in ids.dropna().head(SAMPLE_SIZE)
+    ]
+
+
+def _unknown_names(values, known):
+    """Returns the values whose name_key matches none of the known names."""
+    known_keys = {name_key(k) for k in known}
+    return {v for v in values if name_key(v) not in known_keys}
+
+
+def _distinct(frame):
+    """Returns the distinct string values of all columns of the frame."""
+    return [v for v in pd.unique(frame.to_numpy().ravel()) if isinstance(v, str)]
+
+
+def validate(df, players, known_heroes=None, known_maps=None):
+    """
+    Runs every data-quality check on the frame and returns
+    {issue: {"count": rows, "sample": [Match IDs]}} for the issues found.
+    """
+    if df.empty:
+        return {}
+    known_heroes = KNOWN_HEROES + list(known_heroes or [])
+    known_maps = KNOWN_MAPS + list(known_maps or [])
+    checks = {}
+
+    if "Match ID" in df.columns:
+        ids = df["Match ID"]
+        checks["invalid_match_id"] = ids.isna()
+        checks["duplicate_match_id"] = ids.notna() & ids.duplicated(keep=False)
+    if "Date" in df.columns:
+        checks["invalid_date"] = df["Date"].isna()
+    if "Win Lose" in df.columns:
+        checks["invalid_result"] = ~df["Win Lose"].isin(RESULTS)
+    if "Map" in df.columns:
+        unknown = _unknown_names(df["Map"].dropna().unique(), known_maps)
+        checks["unknown_map"] = df["Map"].isin(unknown)
+
+    # Every check on the player columns classifies the distinct values once
+    # and then marks the rows with a single isin
+    paired = [
+        p for p in players if f"{p} Hero" in df.columns and f"{p} Role" in df.columns
+    ]
+    heroes = df[[f"{p} Hero" for p in paired]]
+    roles = df[[f"{p} Role" for p in paired]]
+    if paired:
+        hero_names = _distinct(heroes)
+        unknown = _unknown_names(
+            [h for h in hero_names if h.strip() not in ["", "not present"]],
+            known_heroes,
+        )
+        checks["unknown_hero"] = heroes.isin(unknown).any(axis=1)
+
+        role_names = _distinct(roles)
+        invalid = [r for r in role_names if r != "not present" and r.strip() not in ROLES]
+        checks["invalid_role"] = roles.isin(invalid).any(axis=1)
+
+        blank = [h for h in hero_names if h.strip() in ["", "not present"]]
+        played = roles.isin([r for r in role_names if r.strip() in ROLES]).to_numpy()
+        no_hero = (heroes.isna() | heroes.isin(blank)).to_numpy()
+        checks["missing_hero"] = pd.Series(
+            (played & no_hero).any(axis=1), index=df.index
+        )
+
+    report = {}
+    for issue, mask in checks.items():
+        count = int(mask.sum())
+        if count:
+            report[issue] = {"count": count, "sample": _sample(df, mask)}
+    return report
+
+
+def merge_reports(report, other):
+    """
+    Returns the validate() report of two sets of rows from their reports.
+    """
+    merged = dict(report)
+    for issue, entry in other.items():
+        if issue in merged:
+            entry = {
+                "count": merged[issue]["count"] + entry["count"],
+                "sample": (merged[issue]["sample"] + entry["sample"])[:SAMPLE_SIZE],
+            }
+        merged[issue] = entry
+    return merged
+
+
+def exclude_dirty(df, players):
+    """
+    Returns the frame the statistics are computed from: matches sharing a
+    Match ID are dropped, and appearances with an invalid role or without a
+    hero are marked "not present" (the EXCLUDED_ISSUES of validate). Only
+    changed columns are copied.
+    """
+    if df.empty:
+        return df
+    if "Match ID" in df.columns:
+        ids = df["Match ID"]
+        df = df[~(ids.notna() & ids.duplicated(keep=False))]
+    masked = {}
+    for p in players:
+        hero_col, role_col = f"{p} Hero", f"{p} Role"
+        if hero_col not in df.columns or role_col not in df.columns:
+            continue
+        roles, heroes = df[role_col], df[hero_col]
+        valid_roles = [r for r in _distinct(roles.to_frame()) if r.strip() in ROLES]
+        blank = [
+            h for h in _distinct(heroes.to_frame()) if h.strip() in ["", "not present"]
+        ]
+        played = roles.notna() & (roles != "not present")
+        counted = roles.isin(valid_roles) & heroes.notna() & ~heroes.isin(blank)
+        dirty = played & ~counted
+        if dirty.any():
+            masked[role_col] = roles.mask(dirty, "not present")
+    return df.assign(**masked) if masked else df
+
+
+def format_report(report):
+    """
+    Returns one readable line per issue of a validate() report.
+    """
+    lines = []
+    for issue, entry in report.items():
+        line = f"{entry['count']} rows with {issue.replace('_', ' ')}"
+        if entry["sample"]:
+            line += f" (e.g. Match ID {', '.join(map(str, entry['sample']))})"
+        lines.append(line)
+    return lines